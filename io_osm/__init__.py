@@ -28,8 +28,7 @@ bl_info = {
     'blender': (2, 5, 7),
     'api': 36273,
     'location': 'File > Import/Export > OSM ',
-    'description': 'Import Openstreetmap XML data',
-    'warning': 'Depends on addon "Inset Polygon"!', # used for warning icon and text in addons panel
+    'description': 'Import Openstreetmap XML and PBF data',
     'category': 'Import-Export'}
 
 if "bpy" in locals():
@@ -41,39 +40,19 @@ if "bpy" in locals():
     imp.reload(osm_ops)
     
 else:
-    import bpy
-    from . import import_osm
-    from . import osm_ui
-    from . import osm_types
-    from . import osm_props
-    from . import osm_ops
+    try:
+        import bpy
+    except ImportError:
+        # worker processes spawned with Blender's bundled Python have no bpy, they only import the modules independent of Blender
+        bpy = None
+    if bpy:
+        from . import import_osm
+        from . import osm_ui
+        from . import osm_types
+        from . import osm_props
+        from . import osm_ops
 
 
-# TODO: on newer Blender builds io_utils seems to be in bpy_extras, on older ones bpy_extras does not exists. Should be removed with the official Blender release where bpy_extras is present.
-try:
-    from bpy_extras.io_utils import ImportHelper, ExportHelper
-except ImportError:
-    from io_utils import ImportHelper, ExportHelper
-
-class ImportOSM(bpy.types.Operator, ImportHelper):
-    '''Load a OSM XML file'''
-    bl_idname = "import_osm.xml"
-    bl_label = "Import OSM XML"
-
-    filepath = bpy.props.StringProperty(name="File Path", default= "")
-    filename_ext = ".osm"
-    filter_glob = bpy.props.StringProperty(default="*.osm", options={'HIDDEN'})
-    create_tag_list = bpy.props.BoolProperty(name="Create Tag list",description="Creates an internal tags.txt containing listing all tags found in the OSM-xml.",default=False)
-
-    def execute(self, context):
-        return import_osm.load(self, context, self.properties.filepath)
-
-    def draw(self,context):
-        layout = self.layout
-        row = layout.row()
-        row.prop(self,'create_tag_list')
-	
-
 # Function: menu_func
 # Adds the export option to the menu.
 #
@@ -81,7 +60,7 @@ class ImportOSM(bpy.types.Operator, ImportHelper):
 #   self - Instance to something
 #   context - The Blender context object
 def menu_func(self, context):
-    self.layout.operator(ImportOSM.bl_idname, text="OSM (.xml)")
+    self.layout.operator(osm_ops.ImportOSM.bl_idname, text="OSM (.osm/.pbf)")
 
 # Function: register
 # Registers the addon with all its classes and the menu function.
@@ -89,7 +68,6 @@ def register():
     osm_props.register_props()
     osm_ops.register_ops()
     osm_ui.register_ui()
-    bpy.utils.register_class(ImportOSM)
     bpy.types.INFO_MT_file_import.append(menu_func)
     #bpy.utils.register_module(__name__)
 
@@ -99,7 +77,6 @@ def unregister():
     osm_props.unregister_props()
     osm_ops.unregister_ops()
     osm_ui.unregister_ui()
-    bpy.utils.unregister_class(ImportOSM)
     bpy.types.INFO_MT_file_import.remove(menu_func)
     #bpy.utils.unregister_module(__name__)
 
@@ -0,0 +1,641 @@
+# Benchmarks for the parts of the importer that do not need a scene. <memory> builds the Way objects of the model, which read the
+# OSM settings of the scene, <meshWrite> needs Blender's meshes and <uvs> its mathutils module, the others also run outside of Blender.
+# Run them from Blender's Python console, e.g.:
+#   from io_osm import benchmarks
+#   benchmarks.parallelParse('/path/to/extract.osm')
+
+from time import time
+from array import array
+
+# Function: consume
+# Reads all elements of a parser and returns the number of elements and the time it took.
+def consume(parser):
+    start = time()
+    parser.readHeader()
+    num = 0
+    for element in parser.elements():
+        num+=1
+    return (num,time()-start)
+
+# Function: parallelParse
+# Parses an OSM XML file sequentially and with an increasing number of worker processes and prints how parsing scales.
+#
+# Parameters:
+#   string filepath - Path to an uncompressed OSM XML file.
+#   list workers - Worker counts to measure.
+#
+# Returns:
+#   list - (workers,seconds) tuples, 1 worker is the sequential parser.
+def parallelParse(filepath,workers = (1,2,4,8)):
+    from io_osm.osm_parser import OSMParser
+    from io_osm.osm_parallel import ParallelOSMParser
+
+    results = []
+    for num in workers:
+        if num<=1:
+            parser = OSMParser(filepath)
+        else:
+            parser = ParallelOSMParser(filepath,num)
+        (elements,seconds) = consume(parser)
+        results.append((num,seconds))
+
+    base = results[0][1]
+    print('parsed %d elements of %r' % (elements,filepath))
+    for (num,seconds) in results:
+        print('%2d workers: %8.3f sec (speedup %4.2fx)' % (num,seconds,base/seconds))
+
+    return results
+
+# Function: projection
+# Projects random coordinates with the scalar <mercX> and <mercY> functions and with the batch projection,
+# prints the timings and checks that both agree.
+#
+# Parameters:
+#   int num - Number of coordinates.
+#   tuple center - Latitude and longitude the coordinates are scattered around.
+#   float tolerance - Largest allowed difference in meters.
+#
+# Returns:
+#   float - Largest difference between scalar and batch results in meters.
+def projection(num = 1000000,center = (50.0,8.0),tolerance = 1e-6):
+    import random
+    from array import array
+    from io_osm import osm_projection
+    from io_osm.osm_projection import mercX, mercY, projectMercator
+
+    lat = array('d',[center[0]+random.uniform(-0.5,0.5) for i in range(0,num)])
+    lon = array('d',[center[1]+random.uniform(-0.5,0.5) for i in range(0,num)])
+    origin = (mercX(center[1]-0.5),mercY(center[0]-0.5))
+
+    start = time()
+    x = [mercX(lon[i])-origin[0] for i in range(0,num)]
+    y = [mercY(lat[i])-origin[1] for i in range(0,num)]
+    scalar = time()-start
+
+    start = time()
+    (batch_x,batch_y) = projectMercator(lat,lon,origin)
+    batch = time()-start
+
+    error = max(max(abs(x[i]-batch_x[i]),abs(y[i]-batch_y[i])) for i in range(0,num))
+
+    print('projected %d coordinates (%s)' % (num,'numpy' if osm_projection.numpy else 'plain Python'))
+    print('scalar: %8.3f sec' % scalar)
+    print('batch:  %8.3f sec (speedup %4.2fx)' % (batch,scalar/batch))
+    print('largest difference: %g m' % error)
+    assert error<=tolerance, 'batch projection differs from scalar projection by %g m' % error
+
+    return error
+
+# Function: writeExtract
+# Writes a synthetic OSM XML file with a grid of buildings, every tenth building has a tagged node at its center.
+# Ids and coordinates only depend on the position of a building in the grid, so extracts written with the same columns
+# and overlapping buildings contain the same elements, like adjacent extracts of a real city.
+#
+# Parameters:
+#   string filepath - Path of the file to write.
+#   int buildings - Number of buildings.
+#   int first - Position of the first building in the grid.
+#   int columns - Buildings per row of the grid, by default the grid is square.
+#
+# Returns:
+#   tuple - Number of nodes and ways written.
+def writeExtract(filepath,buildings,first = 0,columns = None):
+    from math import sqrt, ceil
+
+    if columns is None:
+        columns = int(ceil(sqrt(first+buildings)))
+    step = 0.0002
+    size = 0.0001
+    nodes = []
+    ways = []
+    # four nodes per building and a tagged one for every tenth building come before
+    id = 1+first*4+(first+9)//10
+    num_nodes = 0
+    for i in range(first,first+buildings):
+        lat = 50.0+(i//columns)*step
+        lon = 8.0+(i % columns)*step
+        refs = []
+        for (dlat,dlon) in ((0,0),(0,size),(size,size),(size,0)):
+            nodes.append('  <node id="%d" lat="%.7f" lon="%.7f" version="1"/>\n' % (id,lat+dlat,lon+dlon))
+            refs.append(id)
+            id+=1
+            num_nodes+=1
+        if i % 10==0:
+            nodes.append('  <node id="%d" lat="%.7f" lon="%.7f" version="1">\n    <tag k="amenity" v="bench"/>\n  </node>\n' % (id,lat+size/2,lon+size/2))
+            id+=1
+            num_nodes+=1
+        refs.append(refs[0])
+        way = '  <way id="%d" version="1">\n' % (i+1)
+        way+=''.join(['    <nd ref="%d"/>\n' % ref for ref in refs])
+        way+='    <tag k="building" v="yes"/>\n    <tag k="height" v="%d"/>\n  </way>\n' % (3+i % 20)
+        ways.append(way)
+
+    file = open(filepath,'w')
+    try:
+        file.write('<?xml version="1.0" encoding="UTF-8"?>\n<osm version="0.6" generator="io_osm benchmarks">\n')
+        rows = (first//columns,(first+buildings-1)//columns+1)
+        file.write('  <bounds minlat="%.7f" minlon="8.0" maxlat="%.7f" maxlon="%.7f"/>\n' % (50.0+rows[0]*step,50.0+rows[1]*step,8.0+columns*step))
+        file.writelines(nodes)
+        file.writelines(ways)
+        file.write('</osm>\n')
+    finally:
+        file.close()
+
+    return (num_nodes,buildings)
+
+# Function: memory
+# Builds the in-memory model of a synthetic extract and reports the bytes allocated per node and per way with tracemalloc.
+# Needs Blender: the model reads the OSM settings and the ways the materials of the current scene.
+#
+# Parameters:
+#   int buildings - Number of buildings in the extract.
+#   int max_node_bytes - Fails if a node takes more bytes, None only reports.
+#   int max_way_bytes - Fails if a way takes more bytes, None only reports.
+#
+# Returns:
+#   tuple - Bytes per node and bytes per way.
+def memory(buildings = 20000,max_node_bytes = None,max_way_bytes = None):
+    import os
+    import tempfile
+    import tracemalloc
+    from io_osm.osm_parser import OSMParser
+    from io_osm.osm_types import OSM, Way
+
+    (handle,filepath) = tempfile.mkstemp('.osm')
+    os.close(handle)
+    try:
+        (num_nodes,num_ways) = writeExtract(filepath,buildings)
+
+        osm = OSM(OSMParser(filepath))
+        ways = []
+        tracemalloc.start()
+        try:
+            start = tracemalloc.get_traced_memory()[0]
+            after_nodes = None
+            for element in osm.parser.elements():
+                if element.name=='node':
+                    osm.addNode(element)
+                elif element.name=='way':
+                    if after_nodes is None:
+                        osm.projectNodes()
+                        after_nodes = tracemalloc.get_traced_memory()[0]
+                    ways.append(Way(element,osm))
+            end = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+    finally:
+        os.remove(filepath)
+
+    node_bytes = (after_nodes-start)/num_nodes
+    way_bytes = (end-after_nodes)/num_ways
+
+    print('%d nodes, %d ways' % (num_nodes,num_ways))
+    print('%8.1f bytes per node' % node_bytes)
+    print('%8.1f bytes per way' % way_bytes)
+    if max_node_bytes is not None:
+        assert node_bytes<=max_node_bytes, 'nodes take %.1f bytes, more than %d' % (node_bytes,max_node_bytes)
+    if max_way_bytes is not None:
+        assert way_bytes<=max_way_bytes, 'ways take %.1f bytes, more than %d' % (way_bytes,max_way_bytes)
+
+    return (node_bytes,way_bytes)
+
+# Function: buildModel
+# Builds the node store and the node indices and tags of the ways from a parser, the part of an import which does not need Blender.
+# Nodes are projected with mercator relative to the minimum bounds, like an import with the default settings.
+#
+# Returns:
+#   tuple - The NodeStore and the list of ways as (node indices,packed tags) tuples.
+def buildModel(parser):
+    from io_osm.osm_store import NodeStore, toIds
+    from io_osm.osm_tags import TagDictionary
+    from io_osm.osm_projection import getProjection
+
+    parser.readHeader()
+    bounds = parser.bounds
+    projection = getProjection('mercator',(float(bounds['minlat'])+float(bounds['maxlat']))/2,(float(bounds['minlon'])+float(bounds['maxlon']))/2)
+    origin = projection.projectPoint(float(bounds['minlat']),float(bounds['minlon']))
+
+    store = NodeStore()
+    tags = TagDictionary()
+    ways = []
+    for element in parser.elements():
+        if element.name=='node':
+            attributes = element.attributes
+            store.add(int(attributes['id']),float(attributes['lat']),float(attributes['lon']),float(attributes.get('ele',0.0)),element.co)
+        elif element.name=='way':
+            store.project(projection,origin)
+            (refs,missing) = store.lookup(toIds(element.refs))
+            ways.append((refs,tags.pack(element.tags)))
+    store.project(projection,origin)
+    return (store,ways)
+
+# Function: merge
+# Writes two synthetic extracts overlapping by half and builds the model of each of them one after another
+# and of both merged into one, then prints the nodes and ways built and the time it took.
+#
+# Parameters:
+#   int buildings - Number of buildings per extract.
+#
+# Returns:
+#   tuple - Seconds for the separate and for the merged model.
+def merge(buildings = 20000):
+    import os
+    import tempfile
+    from math import sqrt, ceil
+    from io_osm.osm_parser import OSMParser
+    from io_osm.osm_merge import MergedParser
+
+    columns = int(ceil(sqrt(buildings)))
+    filepaths = []
+    try:
+        for first in (0,buildings//2):
+            (handle,filepath) = tempfile.mkstemp('.osm')
+            os.close(handle)
+            filepaths.append(filepath)
+            writeExtract(filepath,buildings,first,columns)
+
+        start = time()
+        nodes = 0
+        ways = 0
+        for filepath in filepaths:
+            (store,model) = buildModel(OSMParser(filepath))
+            nodes+=len(store)
+            ways+=len(model)
+        separate = time()-start
+
+        start = time()
+        parser = MergedParser([OSMParser(filepath) for filepath in filepaths])
+        (store,model) = buildModel(parser)
+        merged = time()-start
+    finally:
+        for filepath in filepaths:
+            os.remove(filepath)
+
+    print('separate: %8.3f sec, %d nodes, %d ways' % (separate,nodes,ways))
+    print('merged:   %8.3f sec, %d nodes, %d ways, %d duplicates dropped' % (merged,len(store),len(model),parser.duplicates))
+    assert len(model)==buildings+buildings//2, 'merged model has %d ways instead of %d' % (len(model),buildings+buildings//2)
+
+    return (separate,merged)
+
+# Function: writeMeshPerElement
+# Writes mesh buffers the way the geometry builders used to, one RNA access per vertex, face and UV face.
+# Reference for <meshWrite>.
+def writeMeshPerElement(data,mesh):
+    mesh.vertices.add(data.getNumVertices())
+    mesh.faces.add(data.getNumFaces())
+    for i in range(0,data.getNumVertices()):
+        mesh.vertices[i].co = data.getVertex(i)
+    for i in range(0,data.getNumFaces()):
+        face = mesh.faces[i]
+        face.vertices_raw = data.faces[i*4:i*4+4]
+        face.use_smooth = data.smooth[i]
+        face.material_index = data.material_index[i]
+    mesh.update(calc_edges=True)
+    uv_texture = mesh.uv_textures.new()
+    for i in range(0,data.getNumFaces()):
+        uv_texture.data[i].uv_raw = data.uv[i*8:i*8+8]
+
+# Function: meshWrite
+# Builds the meshes of prism shaped buildings with a flat roof and writes them to Blender meshes once per element
+# and once with <MeshData.write>, prints the timings and checks that both meshes are the same.
+#
+# Parameters:
+#   int buildings - Number of buildings.
+#   int corners - Corners of the footprint of a building.
+#
+# Returns:
+#   tuple - Seconds per element and with foreach_set.
+def meshWrite(buildings = 2000,corners = 8):
+    import bpy
+    from math import sin, cos, pi
+    from io_osm.osm_mesh import MeshData
+
+    buffers = []
+    for b in range(0,buildings):
+        data = MeshData()
+        for z in (0.0,10.0):
+            for i in range(0,corners):
+                data.addVertex((cos(2*pi*i/corners)*(5+b%7),sin(2*pi*i/corners)*(5+b%7),z))
+        for i in range(0,corners):
+            data.addFace((i,(i+1) % corners,(i+1) % corners+corners,i+corners),0,True,((0,0),(1,0),(1,1),(0,1)))
+        for i in range(1,corners-1):
+            data.addFace((corners+i+1,corners+i,corners),1,True,((0,0),(1,0),(1,1)))
+        buffers.append(data)
+
+    meshes = []
+    try:
+        start = time()
+        for data in buffers:
+            mesh = bpy.data.meshes.new('benchmark')
+            meshes.append(mesh)
+            writeMeshPerElement(data,mesh)
+        per_element = time()-start
+
+        start = time()
+        for data in buffers:
+            mesh = bpy.data.meshes.new('benchmark')
+            meshes.append(mesh)
+            data.write(mesh,False)
+        bulk = time()-start
+
+        for i in range(0,buildings):
+            a = meshes[i]
+            b = meshes[buildings+i]
+            assert [tuple(v.co) for v in a.vertices]==[tuple(v.co) for v in b.vertices], 'vertices of building %d differ' % i
+            assert [tuple(f.vertices) for f in a.faces]==[tuple(f.vertices) for f in b.faces], 'faces of building %d differ' % i
+    finally:
+        for mesh in meshes:
+            bpy.data.meshes.remove(mesh)
+
+    print('wrote %d meshes with %d vertices and %d faces each' % (buildings,buffers[0].getNumVertices(),buffers[0].getNumFaces()))
+    print('per element: %8.3f sec' % per_element)
+    print('foreach_set: %8.3f sec (speedup %4.2fx)' % (bulk,per_element/bulk))
+
+    return (per_element,bulk)
+
+# Function: stripUVsPerFace
+# Reference for <stripUVs>, computes the UVs of a strip face by face like the builders did before.
+def stripUVsPerFace(data,lengths,scale,size,along):
+    offset = 0.0
+    for i in range(0,len(lengths)):
+        length = lengths[i]*scale
+        if along=='u':
+            uv = (offset,0.0,offset+length,0.0,offset+length,size,offset,size)
+        else:
+            uv = (0.0,offset,size,offset,size,offset+length,0.0,offset+length)
+        data.uv[i*8:i*8+8] = array('f',uv)
+        offset+=length
+
+# Function: planarUVsPerFace
+# Reference for <planarUVs>, rotates every vertex of every face on its own like the builders did before.
+def planarUVsPerFace(data,first,rotation):
+    from mathutils import Vector
+    for f in range(first,data.getNumFaces()):
+        face = data.getFace(f)
+        for i in range(0,4):
+            if i<len(face):
+                co = Vector(data.getVertex(face[i]))
+                if rotation:
+                    co.rotate(rotation)
+            else:
+                co = (0.0,0.0)
+            data.uv[f*8+i*2] = co[0]
+            data.uv[f*8+i*2+1] = co[1]
+
+# Function: uvs
+# Computes the facade and roof UVs of prism shaped buildings and the UVs of roads face by face and with <osm_uv>,
+# prints the timings and checks that both give the same UVs.
+#
+# Parameters:
+#   int buildings - Number of buildings, as many roads are measured.
+#   int corners - Corners of the footprint of a building, segments of a road.
+#   float tolerance - Largest allowed difference of a UV coordinate.
+#
+# Returns:
+#   tuple - Seconds face by face and with <osm_uv>.
+def uvs(buildings = 2000,corners = 32,tolerance = 1e-4):
+    from math import sin, cos, pi
+    from mathutils import Vector
+    from io_osm import osm_uv
+    from io_osm.osm_mesh import MeshData
+
+    jobs = []
+    for b in range(0,buildings):
+        radius = 5+b%7
+        coords = [(cos(2*pi*i/corners)*radius,sin(2*pi*i/corners)*radius,0.0) for i in range(0,corners)]
+        data = MeshData()
+        for z in (0.0,10.0):
+            for co in coords:
+                data.addVertex((co[0],co[1],z))
+        for i in range(0,corners):
+            data.addFace((i,(i+1) % corners,(i+1) % corners+corners,i+corners),0,True)
+        for i in range(1,corners-1):
+            data.addFace((corners+i+1,corners+i,corners),1,True)
+        rotation = Vector((cos(b),sin(b),0.0)).to_track_quat('X','Z').to_euler()
+        jobs.append((data,coords,rotation))
+
+        road = [(i*10.0,sin(i+b)*5,(i%3)*0.5) for i in range(0,corners+1)]
+        data = MeshData()
+        for co in road:
+            data.addVertex((co[0],co[1]+3,co[2]))
+            data.addVertex((co[0],co[1]-3,co[2]))
+        for i in range(0,corners):
+            data.addFace((i*2,i*2+1,i*2+3,i*2+2),0,True)
+        jobs.append((data,road,None))
+
+    def facePerFace(data,coords,rotation):
+        if rotation:
+            # walls are vertical, so only the xy distance counts
+            lengths = [(Vector(coords[(i+1) % corners][0:2])-Vector(coords[i][0:2])).magnitude for i in range(0,corners)]
+            stripUVsPerFace(data,lengths,1/3.0,10/3.0,'u')
+            planarUVsPerFace(data,corners,rotation)
+        else:
+            lengths = [(Vector(coords[i+1])-Vector(coords[i])).magnitude for i in range(0,corners)]
+            stripUVsPerFace(data,lengths,1/3.0,1.0,'v')
+
+    def batch(data,coords,rotation):
+        if rotation:
+            osm_uv.stripUVs(data,0,osm_uv.segmentLengths(coords,True,2),1/3.0,10/3.0,'u')
+            osm_uv.planarUVs(data,corners,None,osm_uv.getRotationRows(rotation))
+        else:
+            osm_uv.stripUVs(data,0,osm_uv.segmentLengths(coords,False,3),1/3.0,1.0,'v')
+
+    start = time()
+    for job in jobs:
+        facePerFace(*job)
+    per_face = time()-start
+    reference = [job[0].uv[:] for job in jobs]
+
+    start = time()
+    for job in jobs:
+        batch(*job)
+    batched = time()-start
+
+    error = 0.0
+    for i in range(0,len(jobs)):
+        uv = jobs[i][0].uv
+        assert len(uv)==len(reference[i]), 'number of uvs of mesh %d differs' % i
+        for j in range(0,len(uv)):
+            error = max(error,abs(uv[j]-reference[i][j]))
+    assert error<=tolerance, 'uvs differ by %g' % error
+
+    print('computed uvs of %d buildings and %d roads (%s)' % (buildings,buildings,'numpy' if osm_uv.numpy else 'plain Python'))
+    print('per face: %8.3f sec' % per_face)
+    print('batched:  %8.3f sec (speedup %4.2fx)' % (batched,per_face/batched))
+    print('largest difference: %g' % error)
+
+    return (per_face,batched)
+
+# Function: geometry
+# Builds the mesh buffers of buildings, roads and areas with the geometry kernel, without Blender, and prints the timings.
+#
+# Parameters:
+#   int ways - Number of ways of every type.
+#   int corners - Corners of a building or area, nodes of a road.
+#
+# Returns:
+#   dict - Seconds by way type.
+def geometry(ways = 10000,corners = 8):
+    from math import sin, cos, pi
+    from io_osm import osm_geometry
+
+    rings = []
+    roads = []
+    for w in range(0,ways):
+        radius = 5+w%7
+        ring = [(cos(2*pi*i/corners)*radius,sin(2*pi*i/corners)*radius*(1+w%3),0.0) for i in range(0,corners)]
+        rings.append(ring+ring[0:1])
+        roads.append([(i*10.0,sin(i+w)*5,(i%3)*0.5) for i in range(0,corners)])
+    location = (0.0,0.0,0.0)
+
+    results = {}
+    faces = {}
+
+    start = time()
+    meshes = [osm_geometry.buildBuilding(ring,location,9.0,3,3.0,1) for ring in rings]
+    results['building'] = time()-start
+    faces['building'] = sum([data.getNumFaces() for data in meshes])
+
+    start = time()
+    meshes = [osm_geometry.buildTrafficway(road,location,6.0,2,2) for road in roads]
+    results['trafficway'] = time()-start
+    faces['trafficway'] = sum([data.getNumFaces() for data in meshes])
+
+    start = time()
+    meshes = [osm_geometry.buildArea(ring,location) for ring in rings]
+    results['area'] = time()-start
+    faces['area'] = sum([data.getNumFaces() for data in meshes])
+
+    print('built %d ways of every type with %d corners' % (ways,corners))
+    for type in ('building','trafficway','area'):
+        print('%-12s%8.3f sec, %8d faces, %8.0f ways/sec' % (type+':',results[type],faces[type],ways/results[type]))
+
+    return results
+
+# Function: parallelGeometry
+# Builds the mesh buffers of buildings, roads and areas with an increasing number of worker processes like <OSM.createWaysParallel>
+# and prints how building scales. The buffers are only built and sent back, uploading them needs Blender.
+#
+# Parameters:
+#   int ways - Number of ways of every type.
+#   int corners - Corners of a building or area, nodes of a road.
+#   list workers - Worker counts to measure.
+#   int batch - Ways per batch sent to a worker.
+#
+# Returns:
+#   list - (workers,seconds) tuples, 1 worker builds without worker processes.
+def parallelGeometry(ways = 10000,corners = 8,workers = (1,2,4,8),batch = 64):
+    from math import sin, cos, pi
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+    from io_osm import osm_geometry
+
+    location = (0.0,0.0,0.0)
+    jobs = []
+    for w in range(0,ways):
+        radius = 5+w%7
+        ring = [(cos(2*pi*i/corners)*radius,sin(2*pi*i/corners)*radius*(1+w%3),0.0) for i in range(0,corners)]
+        ring.append(ring[0])
+        road = [(i*10.0,sin(i+w)*5,(i%3)*0.5) for i in range(0,corners)]
+        jobs.append((osm_geometry.buildBuilding,(ring,location,9.0,3,3.0,1)))
+        jobs.append((osm_geometry.buildTrafficway,(road,location,6.0,2,2)))
+        jobs.append((osm_geometry.buildArea,(ring,location)))
+    batches = [jobs[i:i+batch] for i in range(0,len(jobs),batch)]
+
+    results = []
+    for num in workers:
+        start = time()
+        faces = 0
+        if num<=1:
+            for chunk in batches:
+                faces+=sum([data.getNumFaces() for data in osm_geometry.buildBatch(chunk)])
+        else:
+            executor = ProcessPoolExecutor(num)
+            try:
+                pending = deque()
+                for chunk in batches:
+                    pending.append(executor.submit(osm_geometry.buildBatch,chunk))
+                    if len(pending)>=num*2:
+                        faces+=sum([data.getNumFaces() for data in pending.popleft().result()])
+                while pending:
+                    faces+=sum([data.getNumFaces() for data in pending.popleft().result()])
+            finally:
+                executor.shutdown()
+        results.append((num,time()-start))
+
+    base = results[0][1]
+    print('built %d ways with %d faces in batches of %d' % (ways*3,faces,batch))
+    for (num,seconds) in results:
+        print('%2d workers: %8.3f sec (speedup %4.2fx)' % (num,seconds,base/seconds))
+
+    return results
+
+# Function: triangulation
+# Fills footprints with courtyards by triangulating all of them in a single call and prints the timing.
+# Every footprint is a star, concave unless its spikes are flat, with a square hole in the middle.
+#
+# Parameters:
+#   int polygons - Number of footprints.
+#   int corners - Corners of the outer ring.
+#   int holes - 0 fills footprints without a hole, which are also concave.
+#
+# Returns:
+#   float - Seconds.
+def triangulation(polygons = 10000,corners = 16,holes = 1):
+    from math import sin, cos, pi
+    from io_osm.osm_triangulate import triangulate
+
+    batch = []
+    for p in range(0,polygons):
+        spike = 1+(p%4)*0.25
+        outer = [(cos(2*pi*i/corners)*(10 if i%2 else 10*spike),sin(2*pi*i/corners)*(10 if i%2 else 10*spike),0.0) for i in range(0,corners)]
+        rings = [outer]
+        if holes:
+            rings.append([(-2.0,-2.0,0.0),(-2.0,2.0,0.0),(2.0,2.0,0.0),(2.0,-2.0,0.0)])
+        batch.append(rings)
+
+    start = time()
+    (triangles,offsets) = triangulate(batch)
+    seconds = time()-start
+
+    print('triangulated %d polygons with %d corners and %d holes into %d triangles' % (polygons,corners,holes,len(triangles)//3))
+    print('%8.3f sec, %8.0f polygons/sec' % (seconds,polygons/seconds))
+
+    return seconds
+
+# Function: roofs
+# Builds buildings with flat, hipped and gabled roofs with the geometry kernel and prints the timings.
+# Footprints alternate between rectangles and L-shapes, whose hipped roofs have valleys.
+#
+# Parameters:
+#   int buildings - Number of buildings of every roof shape.
+#
+# Returns:
+#   dict - Seconds by roof shape.
+def roofs(buildings = 2000):
+    from io_osm import osm_geometry
+
+    rings = []
+    for b in range(0,buildings):
+        width = 8+b%5
+        depth = 5+b%3
+        if b%2:
+            ring = [(0.0,0.0,0.0),(width,0.0,0.0),(width,depth,0.0),(0.0,depth,0.0)]
+        else:
+            ring = [(0.0,0.0,0.0),(width,0.0,0.0),(width,depth,0.0),(width/2,depth,0.0),(width/2,depth*2,0.0),(0.0,depth*2,0.0)]
+        rings.append(ring+ring[0:1])
+    location = (0.0,0.0,0.0)
+
+    results = {}
+    faces = {}
+    for shape in ('flat','hipped','gabled'):
+        start = time()
+        meshes = [osm_geometry.buildBuilding(ring,location,9.0,3,3.0,1,shape,0.5) for ring in rings]
+        results[shape] = time()-start
+        faces[shape] = sum([data.getNumFaces() for data in meshes])
+
+    print('built %d buildings of every roof shape' % buildings)
+    for shape in ('flat','hipped','gabled'):
+        print('%-8s%8.3f sec, %8d faces, %8.0f buildings/sec' % (shape+':',results[shape],faces[shape],buildings/results[shape]))
+
+    return results
@@ -1,7 +1,7 @@
 import bpy
-from xml.dom.minidom import parse,parseString
 from collections import OrderedDict
 from io_osm.helpers import Debugger
+from io_osm.osm_parser import openParser
 # TODO: support levels and multilevels.
 # TODO: collision detection must be more precise, objects have to much offset.
 
@@ -11,27 +11,69 @@ log = False
 
 debugger = Debugger()
 
-def load_osm(filepath, operator, context):
+# Function: load_osm
+# Imports an OSM file. Further files are merged with it into one import, see <MergedParser>.
+#
+# Parameters:
+#   string filepath - Path to the OSM file.
+#   operator - The import operator with the import options.
+#   context - The Blender context object
+#   list merge - Paths of further OSM files, e.g. adjacent extracts.
+def load_osm(filepath, operator, context, merge = ()):
     from io_osm.osm_types import OSM
     if debug:
         debugger.start(log)
     if debug:
         debugger.debug("OSM import started: %r..." % filepath)
-        debugger.debug("parsing xml to dom ...")
+        debugger.debug("streaming file ...")
 
     # deactive undo for better performance and less memory usage
     global_undo = context.user_preferences.edit.use_global_undo
     context.user_preferences.edit.use_global_undo = False
 
-    xml = parse(filepath)
-
-    root = xml.documentElement
+    # store import options in the scene, so rebuilds use the same ones
+    context.scene.osm.two_pass = operator.two_pass
+    context.scene.osm.use_cache = operator.use_cache
+    context.scene.osm.merge_meshes = operator.merge_meshes
+    context.scene.osm.share_meshes = operator.share_meshes
+    context.scene.osm.workers = operator.workers
+    context.scene.osm.import_types = operator.import_types
+    context.scene.osm.projection = operator.projection
+    context.scene.osm.tile_size = operator.tile_size
+    context.scene.osm.clip = operator.clip
+    if operator.clip=='box':
+        context.scene.osm.clip_lat = operator.clip_lat
+        context.scene.osm.clip_lon = operator.clip_lon
+    elif operator.clip=='scene':
+        context.scene.osm.clip_lat = context.scene.osm.geo_bounds_lat
+        context.scene.osm.clip_lon = context.scene.osm.geo_bounds_lon
+
+    parser = openParser([filepath]+list(merge),context.scene.osm.use_cache,context.scene.osm.workers)
+
+    # changes applied to a previous import do not belong to this file
+    while len(context.scene.osm.change_files)>0:
+        context.scene.osm.change_files.remove(0)
+    while len(context.scene.osm.merge_files)>0:
+        context.scene.osm.merge_files.remove(0)
+    for path in merge:
+        context.scene.osm.merge_files.add().name = path
 
     # quit edit mode if enabled and deselect all objects
     editMode(context.scene,False)
     deselectObjects(context.scene)
     
-    osm = OSM(root)
+    if operator.tile_size>0:
+        # only the chosen tile is loaded, further tiles are loaded from the scene panel
+        unload_tile(context,operator.tile)
+        osm = OSM(parser,operator.tile)
+        context.scene.osm.tile_grid = osm.getTileGrid()
+        context.scene.osm.tile = operator.tile
+    else:
+        osm = OSM(parser)
+    if operator.create_tag_list:
+        # tags are counted while streaming, before elements get rejected
+        osm.tag_counts = {}
+
     if profiler:
         import profile
         import time
@@ -42,31 +84,9 @@ def load_osm(filepath, operator, context):
     # everything went fine, so store filename
     bpy.context.scene.osm.file = filepath
 
-    xml.unlink()
-
     if operator.create_tag_list:
         tag_list = ''
-        tags = {}
-
-        # get tags in nodes
-        for id in osm.nodes:
-            node = osm.nodes[id]
-            for tag in node.tags:
-                v = 'NODE:\t'+tag+' = '+node.tags[tag].value
-                if v not in tags:
-                    tags[v] = 1
-                else:
-                    tags[v]+=1
-
-        # get tags in ways
-        for id in osm.ways['by_id']:
-            way = osm.ways['by_id'][id]
-            for tag in way.tags:
-                v = 'WAY:\t'+tag+' = '+way.tags[tag].value
-                if v not in tags:
-                    tags[v] = 1
-                else:
-                    tags[v]+=1
+        tags = osm.getTagCounts()
 
         for tag in OrderedDict(sorted(tags.items(),key=lambda t: t[1], reverse=True)):
             tag_list+="%s (%dx)\n" % (tag,tags[tag])
@@ -85,49 +105,179 @@ def rebuild_osm(filepath,context):
         debugger.start(log)
     if debug:
         debugger.debug("OSM import started: %r..." % filepath)
-        debugger.debug("parsing xml to dom ...")
+        debugger.debug("streaming file ...")
 
     # deactive undo for better performance and less memory usage
     global_undo = context.user_preferences.edit.use_global_undo
     context.user_preferences.edit.use_global_undo = False
 
-    xml = parse(filepath)
-
-    root = xml.documentElement
+    parser = openParser(getFiles(context.scene),context.scene.osm.use_cache,context.scene.osm.workers,getChangeFiles(context.scene))
 
     # quit edit mode if enabled and deselect all objects
     editMode(context.scene,False)
     deselectObjects(context.scene)
 
-    osm = OSM(root)
-    if profiler:
-        import profile
-        import time
-        profile.runctx('osm.generate(True)',{'debug':debug,'debugger':debugger,'log':log},{'osm':osm},'profile_results_'+time.strftime("%y-%m-%d-%H-%M-%S"))
+    # tiled scenes are rebuilt tile by tile, so only one loaded tile is in memory at once
+    if context.scene.osm.tile_size>0:
+        tiles = getLoadedTiles()
     else:
-        osm.generate(True)
-        
-    xml.unlink()
+        tiles = [None]
+
+    skipped = 0
+    for tile in tiles:
+        osm = OSM(parser,tile)
+        if profiler:
+            import profile
+            import time
+            profile.runctx('osm.generate(True)',{'debug':debug,'debugger':debugger,'log':log},{'osm':osm},'profile_results_'+time.strftime("%y-%m-%d-%H-%M-%S"))
+        else:
+            osm.generate(True)
+        skipped+=osm.skipped
 
     # reset undo preference
     context.user_preferences.edit.use_global_undo = global_undo
 
+    # unchanged objects are skipped
+    return skipped
+
+# Function: update_osm
+# Applies an osmChange file to the OSM objects in the scene. Only the objects affected by the changes are created again.
+# The change file is remembered, so rebuilds and tiles loaded later on include it.
+#
+# Parameters:
+#   string filepath - Path to the osmChange file.
+#   context - The Blender context object
+def update_osm(filepath,context):
+    from io_osm.osm_types import OSM
+    from io_osm.osm_change import OSMChange
+
+    # merged objects hold many ways, so the scene is rebuilt including the change, which only regenerates the objects that changed
+    if context.scene.osm.merge_meshes:
+        context.scene.osm.change_files.add().name = filepath
+        rebuild_osm(context.scene.osm.file,context)
+        return
+
+    if debug:
+        debugger.start(log)
+    if debug:
+        debugger.debug("OSM update started: %r..." % filepath)
+
+    global_undo = context.user_preferences.edit.use_global_undo
+    context.user_preferences.edit.use_global_undo = False
+
+    change = OSMChange([filepath])
+    changes = getChangeFiles(context.scene)+[filepath]
+    parser = openParser(getFiles(context.scene),context.scene.osm.use_cache,context.scene.osm.workers,changes)
+
+    editMode(context.scene,False)
+    deselectObjects(context.scene)
+
+    osm = OSM(parser)
+    osm.update(change)
+
+    context.scene.osm.change_files.add().name = filepath
+
+    context.user_preferences.edit.use_global_undo = global_undo
+
+# Function: getFiles
+# Returns the paths of the OSM files imported into the scene, the file of the scene first.
+def getFiles(scene):
+    return [scene.osm.file]+[merge_file.name for merge_file in scene.osm.merge_files]
+
+# Function: getChangeFiles
+# Returns the paths of the osmChange files applied to the scene, in the order they were applied.
+def getChangeFiles(scene):
+    return [change_file.name for change_file in scene.osm.change_files]
+
 def remove_osm(context):
-    for object in context.scene.objects:
-        if object.osm.id!='':
-            context.scene.objects.unlink(object)
-            if object.data:
-                mesh = object.data
-            else:
-                mesh = None
-            bpy.data.objects.remove(object)
-
-            if mesh:
-                bpy.data.meshes.remove(mesh)
-            
-
-def load(operator, context, filepath=""):
-    load_osm(filepath, operator, context)
+    for object in list(context.scene.objects):
+        if object.osm.id!='' or len(object.osm.parts)>0:
+            removeObject(context.scene,object)
+
+    for tile in getLoadedTiles():
+        bpy.data.groups.remove(bpy.data.groups[getTileName(tile)])
+
+def removeObject(scene,object):
+    # objects can only be removed without users, tile groups are users as well
+    for group in list(object.users_group):
+        group.objects.unlink(object)
+    scene.objects.unlink(object)
+    if object.data:
+        mesh = object.data
+    else:
+        mesh = None
+    bpy.data.objects.remove(object)
+
+    # meshes may be shared by several buildings
+    if mesh and mesh.users==0:
+        bpy.data.meshes.remove(mesh)
+
+# Function: load_tile
+# Loads a single tile of the OSM file of the scene with the import options stored in the scene.
+#
+# Parameters:
+#   context - The Blender context object
+#   tuple tile - Column and row of the tile.
+def load_tile(context,tile):
+    from io_osm.osm_types import OSM
+    filepath = context.scene.osm.file
+    if debug:
+        debugger.start(log)
+    if debug:
+        debugger.debug("OSM tile %d_%d started: %r..." % (tile[0],tile[1],filepath))
+
+    global_undo = context.user_preferences.edit.use_global_undo
+    context.user_preferences.edit.use_global_undo = False
+
+    unload_tile(context,tile)
+    parser = openParser(getFiles(context.scene),context.scene.osm.use_cache,context.scene.osm.workers,getChangeFiles(context.scene))
+
+    editMode(context.scene,False)
+    deselectObjects(context.scene)
+
+    osm = OSM(parser,tile)
+    osm.generate(False)
+
+    context.user_preferences.edit.use_global_undo = global_undo
+
+# Function: unload_tile
+# Removes the objects of a loaded tile and its group.
+#
+# Parameters:
+#   context - The Blender context object
+#   tuple tile - Column and row of the tile.
+def unload_tile(context,tile):
+    name = getTileName(tile)
+    if name in bpy.data.groups:
+        group = bpy.data.groups[name]
+        for object in list(group.objects):
+            group.objects.unlink(object)
+            if object.name in context.scene.objects:
+                removeObject(context.scene,object)
+        bpy.data.groups.remove(group)
+
+def getTileName(tile):
+    from io_osm.osm_types import TILE_GROUP
+    return TILE_GROUP % (tile[0],tile[1])
+
+# Function: getLoadedTiles
+# Returns the column and row of all loaded tiles, which are found by the names of their groups.
+def getLoadedTiles():
+    from io_osm.osm_types import TILE_GROUP
+    prefix = TILE_GROUP.split('%')[0]
+    tiles = []
+    for group in bpy.data.groups:
+        if group.name.startswith(prefix):
+            try:
+                (col,row) = group.name[len(prefix):].split('_')
+                tiles.append((int(col),int(row)))
+            except ValueError:
+                pass
+    return tiles
+
+
+def load(operator, context, filepath="", merge=()):
+    load_osm(filepath, operator, context, merge)
     return {'FINISHED'}
 
 def selectObject(scene,obj):
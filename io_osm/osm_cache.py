@@ -0,0 +1,367 @@
+import os
+import sys
+import mmap
+import struct
+import hashlib
+from array import array
+from io_osm.osm_parser import Element
+
+CACHE_EXTENSION = '.osmcache'
+CACHE_MAGIC = b'OSMC'
+CACHE_VERSION = 1
+
+# magic, version, byte order, file size, file mtime, sha1 of the file content
+HEADER = struct.Struct('=4sIcxxxqd20s')
+# typecode and item count of an array section
+SECTION = struct.Struct('=cxxxxxxxq')
+
+# order of the array sections in the cache file
+SECTIONS = (
+    ('strings','q'),('string_data','B'),('root','I'),('bounds','d'),
+    ('node_ids','q'),('node_versions','i'),('node_lat','d'),('node_lon','d'),('node_ele','d'),('node_tag_offsets','q'),('node_tags','I'),
+    ('way_ids','q'),('way_versions','i'),('way_ref_offsets','q'),('way_refs','q'),('way_tag_offsets','q'),('way_tags','I'),
+    ('relation_ids','q'),('relation_versions','i'),('relation_member_offsets','q'),('relation_member_types','B'),('relation_member_refs','q'),('relation_member_roles','I'),('relation_tag_offsets','q'),('relation_tags','I'))
+
+MEMBER_TYPES = ('node','way','relation')
+
+# caches whose content hash matched during this session, by cache path, with the stats of the file and the cache they were checked with.
+# Rebuilds, tiles and updates check the cache again, the file is only hashed again when one of them changed.
+verified = {}
+
+# Function: getCachePath
+# Returns the path of the sidecar cache of an OSM file.
+def getCachePath(filepath):
+    return filepath+CACHE_EXTENSION
+
+# Function: getFileHash
+# Returns the sha1 digest of a file's content.
+def getFileHash(filepath):
+    hash = hashlib.sha1()
+    file = open(filepath,'rb')
+    try:
+        while True:
+            data = file.read(1048576)
+            if not data:
+                break
+            hash.update(data)
+    finally:
+        file.close()
+    return hash.digest()
+
+# Function: getFileHeader
+# Returns the cache header fields identifying the current state of an OSM file.
+def getFileHeader(filepath):
+    stat = os.stat(filepath)
+    return (CACHE_MAGIC,CACHE_VERSION,sys.byteorder[0].encode('ascii'),stat.st_size,stat.st_mtime,getFileHash(filepath))
+
+
+# Class: OSMCache
+# Reads the binary sidecar cache of an OSM file. The cache is memory mapped and its arrays are used in place,
+# elements are only created while streaming and offer the same interface as the ones of <OSMParser>.
+class OSMCache():
+    # Constructor: __init__
+    #
+    # Parameters:
+    #   string filepath - Path to the OSM file (not the cache).
+    def __init__(self,filepath):
+        self.filepath = filepath
+        self.cachepath = getCachePath(filepath)
+        self.attributes = {}
+        self.bounds = None
+        self.file = None
+        self.map = None
+        self.view = None
+        self.arrays = {}
+        self.strings = []
+
+    # Method: isValid
+    # Returns True if a cache exists and matches size, modification time and content of the OSM file.
+    # The content is only hashed if size and modification time match and the cache was not verified before, see <verified>.
+    def isValid(self):
+        if not os.path.exists(self.cachepath):
+            return False
+
+        stat = os.stat(self.filepath)
+        cache_stat = os.stat(self.cachepath)
+        key = (stat.st_size,stat.st_mtime,cache_stat.st_size,cache_stat.st_mtime)
+        if verified.get(self.cachepath)==key:
+            return True
+
+        file = open(self.cachepath,'rb')
+        try:
+            header = file.read(HEADER.size)
+        finally:
+            file.close()
+
+        if len(header)!=HEADER.size:
+            return False
+
+        (magic,version,byteorder,size,mtime,hash) = HEADER.unpack(header)
+        if magic!=CACHE_MAGIC or version!=CACHE_VERSION or byteorder!=sys.byteorder[0].encode('ascii'):
+            return False
+        if size!=stat.st_size or mtime!=stat.st_mtime:
+            return False
+        if hash!=getFileHash(self.filepath):
+            return False
+        verified[self.cachepath] = key
+        return True
+
+    # Method: readHeader
+    # Maps the cache into memory and reads the root attributes and bounds.
+    def readHeader(self):
+        if self.map is None:
+            self.load()
+
+        root = self.arrays['root']
+        self.attributes = {}
+        for i in range(0,len(root),2):
+            self.attributes[self.strings[root[i]]] = self.strings[root[i+1]]
+
+        bounds = self.arrays['bounds']
+        if len(bounds)==4:
+            self.bounds = {'minlat':bounds[0],'minlon':bounds[1],'maxlat':bounds[2],'maxlon':bounds[3]}
+
+    # Method: load
+    # Maps the cache file and creates views on all array sections.
+    def load(self):
+        self.file = open(self.cachepath,'rb')
+        self.map = mmap.mmap(self.file.fileno(),0,access=mmap.ACCESS_READ)
+        self.view = view = memoryview(self.map)
+        offset = HEADER.size
+
+        self.arrays = {}
+        for (name,typecode) in SECTIONS:
+            (code,count) = SECTION.unpack_from(self.map,offset)
+            offset+=SECTION.size
+            size = count*array(typecode).itemsize
+            self.arrays[name] = view[offset:offset+size].cast(typecode)
+            offset+=size+(-size % 8)
+
+        offsets = self.arrays['strings']
+        data = self.arrays['string_data']
+        self.strings = [bytes(data[offsets[i]:offsets[i+1]]).decode('utf-8') for i in range(0,len(offsets)-1)]
+
+    # Method: close
+    # Releases the views on the array sections, the memory map and the file, so the cache can be replaced.
+    # The cache is mapped again when it is read next time.
+    def close(self):
+        for name in self.arrays:
+            self.arrays[name].release()
+        self.arrays = {}
+        if self.view is not None:
+            self.view.release()
+            self.view = None
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def getTags(self,tags,start,end):
+        strings = self.strings
+        return [(strings[tags[i]],strings[tags[i+1]]) for i in range(start*2,end*2,2)]
+
+    # Method: elements
+    # Generator over all nodes, ways and relations stored in the cache. The cache is closed when the generator ends.
+    def elements(self):
+        if self.map is None:
+            self.readHeader()
+
+        try:
+            for element in self.readElements():
+                yield element
+        finally:
+            self.close()
+
+    def readElements(self):
+        a = self.arrays
+        strings = self.strings
+
+        ids = a['node_ids']
+        versions = a['node_versions']
+        lat = a['node_lat']
+        lon = a['node_lon']
+        ele = a['node_ele']
+        tag_offsets = a['node_tag_offsets']
+        tags = a['node_tags']
+        for i in range(0,len(ids)):
+            attributes = {'id':str(ids[i]),'lat':lat[i],'lon':lon[i]}
+            if ele[i]==ele[i]: # not NaN
+                attributes['ele'] = ele[i]
+            if versions[i]:
+                attributes['version'] = str(versions[i])
+            element = Element('node',attributes)
+            element.tags = self.getTags(tags,tag_offsets[i],tag_offsets[i+1])
+            yield element
+
+        ids = a['way_ids']
+        versions = a['way_versions']
+        ref_offsets = a['way_ref_offsets']
+        refs = a['way_refs']
+        tag_offsets = a['way_tag_offsets']
+        tags = a['way_tags']
+        for i in range(0,len(ids)):
+            attributes = {'id':str(ids[i])}
+            if versions[i]:
+                attributes['version'] = str(versions[i])
+            element = Element('way',attributes)
+            element.refs = array('q',refs[ref_offsets[i]:ref_offsets[i+1]])
+            element.tags = self.getTags(tags,tag_offsets[i],tag_offsets[i+1])
+            yield element
+
+        ids = a['relation_ids']
+        versions = a['relation_versions']
+        member_offsets = a['relation_member_offsets']
+        member_types = a['relation_member_types']
+        member_refs = a['relation_member_refs']
+        member_roles = a['relation_member_roles']
+        tag_offsets = a['relation_tag_offsets']
+        tags = a['relation_tags']
+        for i in range(0,len(ids)):
+            attributes = {'id':str(ids[i])}
+            if versions[i]:
+                attributes['version'] = str(versions[i])
+            element = Element('relation',attributes)
+            for m in range(member_offsets[i],member_offsets[i+1]):
+                element.members.append((MEMBER_TYPES[member_types[m]],str(member_refs[m]),strings[member_roles[m]]))
+            element.tags = self.getTags(tags,tag_offsets[i],tag_offsets[i+1])
+            yield element
+
+
+# Class: OSMCacheWriter
+# Wraps a parser and records the elements of the first complete pass over the file, which are then written to the sidecar cache.
+class OSMCacheWriter():
+    # Constructor: __init__
+    #
+    # Parameters:
+    #   parser - The parser reading the OSM file.
+    def __init__(self,parser):
+        self.parser = parser
+        self.filepath = parser.filepath
+        self.cachepath = getCachePath(parser.filepath)
+        self.complete = False
+        self.written = False
+
+    @property
+    def attributes(self):
+        return self.parser.attributes
+
+    @property
+    def bounds(self):
+        return self.parser.bounds
+
+    def readHeader(self):
+        self.parser.readHeader()
+
+    # Method: elements
+    # Passes through the elements of the parser and writes the cache once the stream is complete.
+    def elements(self):
+        if self.written:
+            # further passes read the freshly written cache
+            cache = OSMCache(self.filepath)
+            for element in cache.elements():
+                yield element
+            return
+        if self.complete:
+            for element in self.parser.elements():
+                yield element
+            return
+
+        self.reset()
+        for element in self.parser.elements():
+            self.record(element)
+            yield element
+
+        try:
+            self.write()
+            self.written = True
+        except (IOError,OSError):
+            # cache directory is not writable, just go without cache
+            pass
+        self.complete = True
+        self.reset()
+
+    def reset(self):
+        self.string_ids = {}
+        self.arrays = {}
+        for (name,typecode) in SECTIONS:
+            self.arrays[name] = array(typecode)
+        self.arrays['strings'].append(0)
+        self.arrays['node_tag_offsets'].append(0)
+        self.arrays['way_ref_offsets'].append(0)
+        self.arrays['way_tag_offsets'].append(0)
+        self.arrays['relation_member_offsets'].append(0)
+        self.arrays['relation_tag_offsets'].append(0)
+
+    # Method: intern
+    # Returns the id of a string in the string table, adding it if needed.
+    def intern(self,string):
+        id = self.string_ids.get(string)
+        if id is None:
+            id = len(self.string_ids)
+            self.string_ids[string] = id
+            data = string.encode('utf-8')
+            self.arrays['string_data'].frombytes(data)
+            self.arrays['strings'].append(len(self.arrays['string_data']))
+        return id
+
+    def recordTags(self,prefix,element):
+        tags = self.arrays[prefix+'_tags']
+        for (name,value) in element.tags:
+            tags.append(self.intern(name))
+            tags.append(self.intern(value))
+        self.arrays[prefix+'_tag_offsets'].append(len(tags)//2)
+
+    def record(self,element):
+        a = self.arrays
+        attributes = element.attributes
+        prefix = element.name
+        if prefix not in ('node','way','relation'):
+            return
+
+        a[prefix+'_ids'].append(int(attributes['id']))
+        a[prefix+'_versions'].append(int(attributes.get('version',0)))
+
+        if prefix=='node':
+            a['node_lat'].append(float(attributes['lat']))
+            a['node_lon'].append(float(attributes['lon']))
+            a['node_ele'].append(float(attributes.get('ele','nan')))
+        elif prefix=='way':
+            a['way_refs'].extend([int(ref) for ref in element.refs])
+            a['way_ref_offsets'].append(len(a['way_refs']))
+        else:
+            for (type,ref,role) in element.members:
+                a['relation_member_types'].append(MEMBER_TYPES.index(type))
+                a['relation_member_refs'].append(int(ref))
+                a['relation_member_roles'].append(self.intern(role))
+            a['relation_member_offsets'].append(len(a['relation_member_refs']))
+
+        self.recordTags(prefix,element)
+
+    # Method: write
+    # Writes the recorded arrays to a temporary file which then replaces the cache.
+    def write(self):
+        a = self.arrays
+        for name in self.attributes:
+            a['root'].append(self.intern(name))
+            a['root'].append(self.intern(self.attributes[name]))
+        if self.bounds:
+            for name in ('minlat','minlon','maxlat','maxlon'):
+                a['bounds'].append(float(self.bounds[name]))
+
+        temppath = self.cachepath+'.tmp'
+        file = open(temppath,'wb')
+        try:
+            file.write(HEADER.pack(*getFileHeader(self.filepath)))
+            for (name,typecode) in SECTIONS:
+                data = a[name].tobytes()
+                file.write(SECTION.pack(typecode.encode('ascii'),len(a[name])))
+                file.write(data)
+                file.write(b'\0'*(-len(data) % 8))
+        finally:
+            file.close()
+
+        if os.path.exists(self.cachepath):
+            os.remove(self.cachepath)
+        os.rename(temppath,self.cachepath)
@@ -0,0 +1,103 @@
+from io_osm.osm_parser import OSMParser
+
+# element types in the order they appear in OSM files
+ELEMENT_TYPES = ('node','way','relation')
+
+# Class: OSMChange
+# The elements of one or more osmChange (.osc) files by type and id. Deleted elements are kept as None.
+# Files are applied in the given order, so a later file overrides the elements of an earlier one.
+class OSMChange():
+    # Constructor: __init__
+    #
+    # Parameters:
+    #   list filepaths - Paths of the osmChange files.
+    def __init__(self,filepaths = ()):
+        self.nodes = {}
+        self.ways = {}
+        self.relations = {}
+        for filepath in filepaths:
+            self.read(filepath)
+
+    # Method: read
+    # Reads an osmChange file, which may be compressed like OSM files.
+    def read(self,filepath):
+        for element in OSMParser(filepath).elements():
+            if element.name in ELEMENT_TYPES:
+                elements = self.getElements(element.name)
+                if element.action=='delete':
+                    elements[int(element.attributes['id'])] = None
+                else:
+                    elements[int(element.attributes['id'])] = element
+
+    # Method: getElements
+    # Returns the dict of changed elements of a type.
+    def getElements(self,name):
+        if name=='node':
+            return self.nodes
+        elif name=='way':
+            return self.ways
+        return self.relations
+
+    def __len__(self):
+        return len(self.nodes)+len(self.ways)+len(self.relations)
+
+
+# Class: ChangedParser
+# Wraps the parser of an OSM file and applies an <OSMChange> while streaming.
+# Modified elements replace the ones of the file, deleted ones are left out and created ones are inserted
+# before the first element of the next type, so nodes still come before the ways referencing them.
+class ChangedParser():
+    # Constructor: __init__
+    #
+    # Parameters:
+    #   parser - The parser reading the OSM file.
+    #   OSMChange change - The changes to apply.
+    def __init__(self,parser,change):
+        self.parser = parser
+        self.change = change
+        self.filepath = parser.filepath
+
+    @property
+    def attributes(self):
+        return self.parser.attributes
+
+    @property
+    def bounds(self):
+        return self.parser.bounds
+
+    def readHeader(self):
+        self.parser.readHeader()
+
+    # Method: elements
+    # Generator over the elements of the file with the changes applied.
+    def elements(self):
+        change = self.change
+        found = set()
+        stage = 0
+        for element in self.parser.elements():
+            if element.name in ELEMENT_TYPES:
+                while ELEMENT_TYPES.index(element.name)>stage:
+                    for created in self.getCreated(ELEMENT_TYPES[stage],found):
+                        yield created
+                    stage+=1
+
+                elements = change.getElements(element.name)
+                id = int(element.attributes['id'])
+                if id in elements:
+                    found.add((element.name,id))
+                    element = elements[id]
+                    if element is None:
+                        continue
+            yield element
+
+        while stage<len(ELEMENT_TYPES):
+            for created in self.getCreated(ELEMENT_TYPES[stage],found):
+                yield created
+            stage+=1
+
+    # Method: getCreated
+    # Returns the changed elements of a type that are not in the file, ordered by id.
+    # Besides created elements these are modified ones the file did not contain, e.g. ones that moved into an extract.
+    def getCreated(self,name,found):
+        elements = self.change.getElements(name)
+        return [elements[id] for id in sorted(elements) if elements[id] is not None and (name,id) not in found]
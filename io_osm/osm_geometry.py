@@ -0,0 +1,293 @@
+import math
+from array import array
+from io_osm.osm_mesh import MeshData
+from io_osm.osm_uv import planarUVs, stripUVs, segmentLengths
+from io_osm.osm_triangulate import triangulate
+from io_osm.osm_roof import getSkeleton, addGables
+
+# The geometry kernel builds the mesh buffers of ways from projected coordinates and resolved material parameters.
+# It does not touch Blender data, so it can be run and timed outside of Blender, see <benchmarks.geometry>.
+# Coordinates are (x,y,z) sequences, closed ways repeat their first node at the end like the node lists of ways.
+
+# Function: getNormals
+# Returns the normals of the nodes of a way in the xy plane. A normal is perpendicular to the line from the previous to the next node.
+#
+# Parameters:
+#   list coords - Coordinates of the nodes.
+#   bool closed - The way is closed, so the first and last node are neighbours.
+#
+# Returns:
+#   list - (x,y,z) tuples.
+def getNormals(coords,closed):
+    if closed:
+        num = len(coords)-1
+    else:
+        num = len(coords)
+
+    normals = []
+    for i in range(0,len(coords)):
+        if i>0:
+            start_v = coords[i-1]
+        elif closed:
+            start_v = coords[num-1]
+        else:
+            start_v = coords[i]
+
+        if i<num-1:
+            end_v = coords[i+1]
+        elif closed:
+            end_v = coords[0]
+        else:
+            end_v = coords[i]
+
+        # cross product of the normalized direction with the up vector
+        dx = start_v[0]-end_v[0]
+        dy = start_v[1]-end_v[1]
+        dz = start_v[2]-end_v[2]
+        length = math.sqrt(dx*dx+dy*dy+dz*dz)
+        if length>0:
+            normals.append((dy/length,-dx/length,0.0))
+        else:
+            normals.append((0.0,0.0,0.0))
+    return normals
+
+# Function: isClockwise
+# Returns True if most corners of a closed way turn clockwise.
+def isClockwise(coords):
+    pos = 0
+    neg = 0
+    num = len(coords)-1
+
+    for i in range(0,num):
+        v1 = coords[(i-1) % num]
+        v2 = coords[i]
+        v3 = coords[(i+1) % num]
+
+        cross = (v2[0]-v1[0])*(v3[1]-v2[1]) - (v2[1]-v1[1])*(v3[0]-v2[0])
+
+        if cross>0:
+            pos+=1
+        if cross<0:
+            neg+=1
+
+    return neg>=pos
+
+# Function: getRoofRows
+# Returns the rotation of roof uvs as rows of a rotation matrix, see <planarUVs>. Roofs are rotated around z towards the averaged normal of their corners.
+#
+# Parameters:
+#   list normals - Normals of the nodes, see <getNormals>.
+#   int num - Number of corners.
+def getRoofRows(normals,num):
+    x = sum([normals[i][0] for i in range(0,num)])/num
+    y = sum([normals[i][1] for i in range(0,num)])/num
+    angle = math.atan2(y,x)
+    c = math.cos(angle)
+    s = math.sin(angle)
+    return ((c,-s,0.0),(s,c,0.0))
+
+# Function: buildBuilding
+# Builds the walls and optionally the roof of a building. Walls and gables use material 0, the roof material 1.
+#
+# Parameters:
+#   list coords - Coordinates of the closed way.
+#   location - Location of the object, subtracted from the vertices.
+#   float height - Height of the walls.
+#   float levels - Levels of the building.
+#   float level_height - Height of a level on the facade texture.
+#   int texture_levels - Levels on the facade texture.
+#   string roof - 'flat', 'hipped' or 'gabled', None builds no roof.
+#   float slope - Rise of sloped roofs per unit of run.
+#
+# Returns:
+#   MeshData - The mesh buffers.
+def buildBuilding(coords,location,height,levels,level_height,texture_levels,roof = 'flat',slope = 0.0):
+    num = len(coords)-1 # first and last are at the same location, so we do not need the last node
+    v_num = num*2
+
+    # the roof follows the nodes as they are, walls are built counterclockwise
+    roof_rows = getRoofRows(getNormals(coords,True),num)
+    if isClockwise(coords):
+        coords = coords[::-1]
+
+    data = MeshData()
+    # bottom
+    for i in range(0,num):
+        co = coords[i]
+        data.addVertex((co[0]-location[0],co[1]-location[1],co[2]-location[2]))
+    # top
+    for i in range(0,num):
+        co = coords[i]
+        data.addVertex((co[0]-location[0],co[1]-location[1],co[2]-location[2]+height))
+
+    for i in range(0,num):
+        # wall
+        if i==num-1: # last one needs inverted direction
+            vertices = (i,0,num,v_num-1)
+        else:
+            vertices = (i,i+1,(i+num+1) % v_num,(i+num) % v_num)
+        data.addFace(vertices,0,True)
+
+    # facade uvs, walls are vertical, so their width is the distance of the nodes in the xy plane
+    lengths = segmentLengths(coords[0:num],True,2)
+    stripUVs(data,0,lengths,1/(level_height*texture_levels),levels/texture_levels,'u')
+
+    if roof in ('hipped','gabled'):
+        # rings the skeleton fails on keep a flat roof
+        if addSlopedRoof(data,num,roof,slope,1/(level_height*texture_levels),levels/texture_levels):
+            return data
+        roof = 'flat'
+
+    if roof=='flat':
+        first = data.getNumFaces()
+        (triangles,offsets) = triangulate([[[data.getVertex(i) for i in range(num,v_num)]]])
+        data.addTriangles(triangles,num,1,True) # roof material
+        planarUVs(data,first,None,roof_rows)
+
+    return data
+
+# Function: addSlopedRoof
+# Adds a hipped or gabled roof on top of the walls of <buildBuilding>. Every wall gets a roof face rising from its top with the same slope,
+# the faces meet along the straight skeleton of the footprint, see <osm_roof.getSkeleton>. Gables continue the facade of their wall.
+# Roof uvs run along the wall and up the slope.
+#
+# Parameters:
+#   MeshData data - The buffers with the walls, the top corners follow the bottom ones.
+#   int num - Number of corners.
+#   string shape - 'hipped' or 'gabled'.
+#   float slope - Rise per unit of run.
+#   float scale - Facade uv length per unit of wall length and height.
+#   float size - Facade uv height of the walls.
+#
+# Returns:
+#   bool - False if the footprint has no valid skeleton, nothing is added then.
+def addSlopedRoof(data,num,shape,slope,scale,size):
+    top = [data.getVertex(i) for i in range(num,num*2)]
+    skeleton = getSkeleton(top)
+    if skeleton is None:
+        return False
+    (nodes,faces) = skeleton
+    if shape=='gabled':
+        gables = addGables(nodes,faces)
+    else:
+        gables = []
+
+    z = sum([co[2] for co in top])/num
+    indices = list(range(num,num*2))
+    for node in nodes[num:]:
+        indices.append(data.addVertex((node[0],node[1],z+node[2]*slope)))
+
+    # all roof faces are triangulated in one call, their corners are skeleton nodes
+    roofs = [k for k in range(0,num) if k not in gables]
+    corners = [indices[i] for k in roofs for i in faces[k]]
+    (triangles,offsets) = triangulate([[[nodes[i] for i in faces[k]]] for k in roofs])
+    first = data.getNumFaces()
+    data.addTriangles(array('i',[corners[i] for i in triangles]),0,1,True) # roof material
+
+    # the slope is longer than its run
+    stretch = math.sqrt(1+slope*slope)
+    for j in range(0,len(roofs)):
+        k = roofs[j]
+        a = nodes[k]
+        b = nodes[(k+1) % num]
+        length = math.sqrt((b[0]-a[0])**2+(b[1]-a[1])**2)
+        dx = (b[0]-a[0])/length
+        dy = (b[1]-a[1])/length
+        planarUVs(data,first+offsets[j],first+offsets[j+1],((dx,dy,0.0),(-dy*stretch,dx*stretch,0.0)))
+
+    for k in gables:
+        (s,t,apex) = faces[k]
+        # u continues the wall below, the wall's uvs start at its bottom corners
+        u_start = data.uv[k*8]
+        u_end = data.uv[k*8+2]
+        length = math.sqrt((nodes[t][0]-nodes[s][0])**2+(nodes[t][1]-nodes[s][1])**2)
+        along = math.sqrt((nodes[apex][0]-nodes[s][0])**2+(nodes[apex][1]-nodes[s][1])**2)
+        u_apex = u_start+(u_end-u_start)*along/length
+        data.addFace((indices[s],indices[t],indices[apex]),0,True,((u_start,size),(u_end,size),(u_apex,size+nodes[apex][2]*slope*scale)))
+
+    return True
+
+# Function: buildTrafficway
+# Builds a strip along the nodes of a trafficway, which runs along v of the texture.
+#
+# Parameters:
+#   list coords - Coordinates of the nodes.
+#   location - Location of the object, subtracted from the vertices.
+#   float width - Width of the trafficway.
+#   int lanes - Lanes of the trafficway.
+#   int texture_lanes - Lanes on the texture.
+#   dict ends - Normal and width by node index, which replace the ones of the way, e.g. to join other trafficways.
+#
+# Returns:
+#   MeshData - The mesh buffers.
+def buildTrafficway(coords,location,width,lanes,texture_lanes,ends = None):
+    num = len(coords)
+    normals = getNormals(coords,False)
+
+    data = MeshData()
+    for i in range(0,num):
+        if ends and i in ends:
+            (normal,node_width) = ends[i]
+        else:
+            (normal,node_width) = (normals[i],width)
+
+        # the z-axis of the normal is ignored
+        offset = (normal[0]*node_width/2,normal[1]*node_width/2)
+        co = coords[i]
+        data.addVertex((co[0]+offset[0]-location[0],co[1]+offset[1]-location[1],co[2]-location[2])) # left
+        data.addVertex((co[0]-offset[0]-location[0],co[1]-offset[1]-location[1],co[2]-location[2])) # right
+
+    for i in range(0,num-1): # the last node has no face
+        ii = i*2
+        data.addFace((ii,ii+1,ii+3,ii+2),0,True)
+
+    # uv height factors
+    hf = 1/(width/lanes)
+    stripUVs(data,0,segmentLengths(coords,False,3),hf,lanes/texture_lanes,'v')
+
+    return data
+
+# Function: buildArea
+# Fills the polygon of a closed way, uvs are the flat coordinates.
+#
+# Parameters:
+#   list coords - Coordinates of the closed way.
+#   location - Location of the object, subtracted from the vertices.
+#   list holes - Coordinates of closed inner rings, e.g. of a multipolygon.
+#
+# Returns:
+#   MeshData - The mesh buffers.
+def buildArea(coords,location,holes = ()):
+    # first and last are at the same location, so we do not need the last node
+    rings = [coords[:-1]]+[hole[:-1] for hole in holes]
+
+    data = MeshData()
+    for ring in rings:
+        for co in ring:
+            data.addVertex((co[0]-location[0],co[1]-location[1],co[2]-location[2]))
+
+    (triangles,offsets) = triangulate([rings])
+    data.addTriangles(triangles,0,0,True)
+
+    planarUVs(data)
+
+    return data
+
+# Function: runJob
+# Builds the mesh buffers of a job, which is the kernel function and its arguments, see <Geometry.prepare>.
+#
+# Returns:
+#   MeshData - The mesh buffers, None without a job.
+def runJob(job):
+    if job is None:
+        return None
+    (function,args) = job
+    return function(*args)
+
+# Function: buildBatch
+# Builds the mesh buffers of several jobs. Runs in worker processes, see <OSM.createWaysParallel>.
+#
+# Returns:
+#   list - MeshData of every job.
+def buildBatch(jobs):
+    return [runJob(job) for job in jobs]
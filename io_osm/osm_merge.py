@@ -0,0 +1,78 @@
+import heapq
+
+# order of the element types in OSM files
+TYPE_ORDER = {'node':0,'way':1,'relation':2}
+
+# Class: MergedParser
+# Streams several OSM files as if they were one file, e.g. adjacent extracts of a larger area.
+# The bounds are the union of the bounds of all files, so everything is projected against one common origin.
+# OSM files are sorted by type and id, the files are merged like sorted lists, so every element is read once and
+# the copies of an element contained in several files follow each other. Only one of them is passed on, the one with the highest version.
+class MergedParser():
+    # Constructor: __init__
+    #
+    # Parameters:
+    #   list parsers - Parsers of the files.
+    def __init__(self,parsers):
+        self.parsers = parsers
+        self.filepath = parsers[0].filepath
+        self.attributes = {}
+        self.bounds = None
+        self.duplicates = 0
+
+    # Method: readHeader
+    # Reads the headers of all files and unites their bounds.
+    def readHeader(self):
+        self.bounds = None
+        for parser in self.parsers:
+            parser.readHeader()
+            if parser.bounds:
+                if self.bounds is None:
+                    self.bounds = dict([(name,float(parser.bounds[name])) for name in ('minlat','minlon','maxlat','maxlon')])
+                else:
+                    for name in ('minlat','minlon'):
+                        self.bounds[name] = min(self.bounds[name],float(parser.bounds[name]))
+                    for name in ('maxlat','maxlon'):
+                        self.bounds[name] = max(self.bounds[name],float(parser.bounds[name]))
+        self.attributes = self.parsers[0].attributes
+
+    # Method: elements
+    # Generator over the elements of all files, ordered by type and id and without duplicates.
+    def elements(self):
+        self.duplicates = 0
+        streams = [self.iterElements(i) for i in range(0,len(self.parsers))]
+        pending = None
+        for item in heapq.merge(*streams):
+            if pending and item[0]==pending[0] and item[1]==pending[1]:
+                self.duplicates+=1
+                if getVersion(item[4])>getVersion(pending[4]):
+                    pending = item
+                continue
+            if pending:
+                yield pending[4]
+            pending = item
+        if pending:
+            yield pending[4]
+
+    # Method: iterElements
+    # Generator over the elements of one file as sortable (type,id,file,position,element) tuples.
+    def iterElements(self,index):
+        parser = self.parsers[index]
+        position = 0
+        last = None
+        for element in parser.elements():
+            if element.name in TYPE_ORDER:
+                key = (TYPE_ORDER[element.name],int(element.attributes['id']))
+                if last is not None and key<last:
+                    raise IOError('%r is not sorted by type and id, only sorted files can be merged' % parser.filepath)
+                last = key
+                yield (key[0],key[1],index,position,element)
+                position+=1
+
+# Function: getVersion
+# Returns the version of an element, 0 if the file does not tell.
+def getVersion(element):
+    try:
+        return int(element.attributes.get('version',0))
+    except ValueError:
+        return 0
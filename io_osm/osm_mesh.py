@@ -0,0 +1,163 @@
+from array import array
+
+# Class: MeshData
+# Flat vertex, face and UV buffers of a mesh. The geometry builders fill them in plain Python,
+# <write> passes each attribute to Blender with a single foreach_set call instead of one RNA access per element.
+# Faces are stored with four vertices like vertices_raw, triangles end with 0.
+class MeshData():
+    __slots__ = ('co','faces','smooth','material_index','uv')
+
+    # Constructor: __init__
+    def __init__(self):
+        self.co = array('f')
+        self.faces = array('i')
+        self.smooth = []
+        self.material_index = array('i')
+        self.uv = array('f')
+
+    def getNumVertices(self):
+        return len(self.co)//3
+
+    def getNumFaces(self):
+        return len(self.material_index)
+
+    # Method: addVertex
+    # Adds a vertex and returns its index.
+    def addVertex(self,co):
+        self.co.append(co[0])
+        self.co.append(co[1])
+        self.co.append(co[2])
+        return len(self.co)//3-1
+
+    # Method: getVertex
+    # Returns the coordinates of a vertex.
+    def getVertex(self,index):
+        i = index*3
+        return (self.co[i],self.co[i+1],self.co[i+2])
+
+    # Method: addFace
+    # Adds a face.
+    #
+    # Parameters:
+    #   list vertices - Three or four vertex indices.
+    #   int material_index - Index of the material slot.
+    #   bool smooth - Smooth shading.
+    #   list uv - UV coordinates of the vertices as (u,v) tuples, triangles may leave out the fourth.
+    def addFace(self,vertices,material_index = 0,smooth = True,uv = ()):
+        if len(vertices)==3 and vertices[2]==0:
+            # the third vertex of a triangle must not be 0, rotating keeps the direction of the face
+            vertices = (vertices[2],vertices[0],vertices[1])
+            if len(uv)>=3:
+                uv = (uv[2],uv[0],uv[1])
+        self.faces.extend(vertices)
+        if len(vertices)==3:
+            self.faces.append(0)
+        self.material_index.append(material_index)
+        self.smooth.append(smooth)
+        for i in range(0,4):
+            if i<len(uv):
+                self.uv.append(uv[i][0])
+                self.uv.append(uv[i][1])
+            else:
+                self.uv.append(0.0)
+                self.uv.append(0.0)
+
+    # Method: addTriangles
+    # Adds triangles given as a flat array of vertex indices, three per triangle, as <osm_triangulate.triangulate> returns them.
+    # Their uvs are 0.
+    #
+    # Parameters:
+    #   array triangles - Vertex indices.
+    #   int offset - Added to the vertex indices.
+    #   int material_index - Index of the material slot.
+    #   bool smooth - Smooth shading.
+    def addTriangles(self,triangles,offset = 0,material_index = 0,smooth = True):
+        num = len(triangles)//3
+        faces = array('i',[0])*(num*4)
+        for i in range(0,3):
+            faces[i::4] = array('i',[v+offset for v in triangles[i::3]])
+        # the third vertex of a triangle must not be 0, rotating keeps the direction of the face
+        for i in range(2,num*4,4):
+            if faces[i]==0:
+                (faces[i-2],faces[i-1],faces[i]) = (0,faces[i-2],faces[i-1])
+        self.faces.extend(faces)
+        self.material_index.extend(array('i',[material_index])*num)
+        self.smooth.extend([smooth]*num)
+        self.uv.extend(array('f',[0.0])*(num*8))
+
+    # Method: getFace
+    # Returns the vertex indices of a face.
+    def getFace(self,index):
+        i = index*4
+        if self.faces[i+3]==0:
+            return self.faces[i:i+3]
+        return self.faces[i:i+4]
+
+    # Method: extend
+    # Appends the vertices and faces of other buffers, e.g. to merge several meshes into one.
+    #
+    # Parameters:
+    #   MeshData data - The buffers to append.
+    #   offset - Added to the appended vertices.
+    def extend(self,data,offset = (0.0,0.0,0.0)):
+        base = self.getNumVertices()
+        co = data.co
+        for i in range(0,len(co),3):
+            self.co.append(co[i]+offset[0])
+            self.co.append(co[i+1]+offset[1])
+            self.co.append(co[i+2]+offset[2])
+        faces = data.faces
+        for i in range(0,len(faces),4):
+            self.faces.append(faces[i]+base)
+            self.faces.append(faces[i+1]+base)
+            self.faces.append(faces[i+2]+base)
+            # a fourth index of 0 marks a triangle
+            if faces[i+3]==0:
+                self.faces.append(0)
+            else:
+                self.faces.append(faces[i+3]+base)
+        self.smooth.extend(data.smooth)
+        self.material_index.extend(data.material_index)
+        self.uv.extend(data.uv)
+
+    # Method: read
+    # Replaces the buffers with the data of a Blender mesh, read with one foreach_get call per attribute.
+    #
+    # Parameters:
+    #   mesh - The Blender mesh.
+    def read(self,mesh):
+        num_faces = len(mesh.faces)
+        self.co = array('f',[0.0])*(len(mesh.vertices)*3)
+        mesh.vertices.foreach_get('co',self.co)
+        self.faces = array('i',[0])*(num_faces*4)
+        mesh.faces.foreach_get('vertices_raw',self.faces)
+        self.smooth = [False]*num_faces
+        mesh.faces.foreach_get('use_smooth',self.smooth)
+        self.material_index = array('i',[0])*num_faces
+        mesh.faces.foreach_get('material_index',self.material_index)
+        self.uv = array('f',[0.0])*(num_faces*8)
+        if len(mesh.uv_textures)>0:
+            mesh.uv_textures[0].data.foreach_get('uv_raw',self.uv)
+
+    # Method: write
+    # Writes the buffers to a Blender mesh. Edges are calculated from the faces.
+    #
+    # Parameters:
+    #   mesh - The Blender mesh.
+    #   bool rebuild - The mesh already has the vertices and faces, only their values are replaced.
+    def write(self,mesh,rebuild):
+        if rebuild==False:
+            mesh.vertices.add(self.getNumVertices())
+            mesh.faces.add(self.getNumFaces())
+
+        mesh.vertices.foreach_set('co',self.co)
+        mesh.faces.foreach_set('vertices_raw',self.faces)
+        mesh.faces.foreach_set('use_smooth',self.smooth)
+        mesh.faces.foreach_set('material_index',self.material_index)
+        mesh.update(calc_edges=True)
+
+        if rebuild==False or len(mesh.uv_textures)==0:
+            uv_texture = mesh.uv_textures.new()
+        else:
+            uv_texture = mesh.uv_textures[0]
+        uv_texture.data.foreach_set('uv_raw',self.uv)
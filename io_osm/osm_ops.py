@@ -1,5 +1,77 @@
 import bpy
 
+# TODO: on newer Blender builds io_utils seems to be in bpy_extras, on older ones bpy_extras does not exists. Should be removed with the official Blender release where bpy_extras is present.
+try:
+    from bpy_extras.io_utils import ImportHelper
+except ImportError:
+    from io_utils import ImportHelper
+
+class ImportOSM(bpy.types.Operator, ImportHelper):
+    '''Load a OSM XML or PBF file'''
+    bl_idname = "import_osm.xml"
+    bl_label = "Import OSM"
+
+    filepath = bpy.props.StringProperty(name="File Path", default= "")
+    # selecting several files merges them into one import
+    files = bpy.props.CollectionProperty(name="File Path",type=bpy.types.OperatorFileListElement)
+    directory = bpy.props.StringProperty(subtype='DIR_PATH')
+    filename_ext = ".osm"
+    filter_glob = bpy.props.StringProperty(default="*.osm;*.pbf;*.gz;*.bz2;*.xz", options={'HIDDEN'})
+    create_tag_list = bpy.props.BoolProperty(name="Create Tag list",description="Creates an internal tags.txt containing listing all tags found in the OSM-xml.",default=False)
+    two_pass = bpy.props.BoolProperty(name="Two-pass import",description="Reads the file twice and only keeps nodes referenced by ways with a material or tagged for a group.",default=False)
+    use_cache = bpy.props.BoolProperty(name="Use cache",description="Keeps a binary cache of the parsed file next to it, so rebuilds do not parse the XML again. The directory of the file has to be writable.",default=False)
+    merge_meshes = bpy.props.BoolProperty(name="Merge by material",description="Builds all ways of the same type and materials into one object instead of one object per way, per tile in tiled scenes.",default=False)
+    share_meshes = bpy.props.BoolProperty(name="Share meshes",description="Buildings with the same footprint, height and materials share one mesh and are placed by location and rotation.",default=True)
+    workers = bpy.props.IntProperty(name="Worker processes",description="Number of processes used for parsing and building meshes. 1 does both in Blender itself. On Windows and macOS the processes need Blender's bundled Python, without it 1 is used.",default=1,min=1,max=64)
+    import_types = bpy.props.EnumProperty(name="Import",description="Types of objects to import.",default={'building','area','trafficway','barrier','object'},options={'ENUM_FLAG'},items=[('building','buildings','Buildings.'),('area','areas','Flat areas.'),('trafficway','trafficways','All kinds of traffic ways.'),('barrier','barriers','Walls, fences and other barriers.'),('object','objects','Group instances on tagged nodes.')])
+    projection = bpy.props.EnumProperty(name="Projection",description="Projection of latitude and longitude to scene coordinates.",default='mercator',items=[('mercator','mercator','Elliptical mercator projection, distances are stretched away from the equator.'),('local','local tangent plane','Plane touching the earth at the center of the file, true to scale for small extracts.')])
+    tile_size = bpy.props.FloatProperty(name="Tile size",description="Splits the scene into square tiles of this size, which are loaded and unloaded separately. 0 imports everything at once.",default=0.0,min=0.0)
+    tile = bpy.props.IntVectorProperty(name="Tile",description="Column and row of the tile to load first.",default=(0,0),min=0,size=2)
+    clip = bpy.props.EnumProperty(name="Clip",description="Only imports what lies within a box of latitude and longitude.",default='none',items=[('none','none','Import everything.'),('box','box','Clip to the given latitude and longitude.'),('scene','geo-bounds','Clip to the geo-bounds of the scene.')])
+    clip_lat = bpy.props.FloatVectorProperty(name='Clip Latitude',default=(0.0,0.0),size=2)
+    clip_lon = bpy.props.FloatVectorProperty(name='Clip Longtitude',default=(0.0,0.0),size=2)
+
+    def execute(self, context):
+        from os import path
+        filepath = self.properties.filepath
+        merge = []
+        for file in self.files:
+            if file.name!='' and path.join(self.directory,file.name)!=filepath:
+                merge.append(path.join(self.directory,file.name))
+        from io_osm.import_osm import load
+        return load(self, context, filepath, merge)
+
+    def draw(self,context):
+        layout = self.layout
+        row = layout.row()
+        row.prop(self,'create_tag_list')
+        row = layout.row()
+        row.prop(self,'two_pass')
+        row = layout.row()
+        row.prop(self,'use_cache')
+        row = layout.row()
+        row.prop(self,'merge_meshes')
+        row = layout.row()
+        row.prop(self,'share_meshes')
+        row = layout.row()
+        row.prop(self,'workers')
+        row = layout.row()
+        row.prop(self,'import_types')
+        row = layout.row()
+        row.prop(self,'projection')
+        row = layout.row()
+        row.prop(self,'tile_size')
+        if self.tile_size>0:
+            row = layout.row()
+            row.prop(self,'tile')
+        row = layout.row()
+        row.prop(self,'clip')
+        if self.clip=='box':
+            row = layout.row()
+            row.prop(self,'clip_lat')
+            row = layout.row()
+            row.prop(self,'clip_lon')
+
 class MATERIAL_OT_add_osm_tag(bpy.types.Operator):
     bl_label = 'Add tag'
     bl_idname = 'material.add_osm_tag'
@@ -63,7 +135,28 @@ class SCENE_OT_rebuild_osm(bpy.types.Operator):
         filepath = context.scene.osm.file
 
         if filepath!='' and path.exists(filepath):
-            rebuild_osm(filepath,context)
+            skipped = rebuild_osm(filepath,context)
+            self.report({'INFO'},'%d unchanged objects skipped' % skipped)
+        return {'FINISHED'}
+
+class SCENE_OT_update_osm(bpy.types.Operator):
+    bl_label = 'Update'
+    bl_idname = 'scene.update_osm'
+    bl_description = 'Applies an osmChange file and updates the affected OSM objects.'
+
+    filepath = bpy.props.StringProperty(name="File Path",subtype='FILE_PATH')
+    filter_glob = bpy.props.StringProperty(default="*.osc;*.gz;*.bz2;*.xz",options={'HIDDEN'})
+
+    def invoke(self,context,event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self,context):
+        from os import path
+        from io_osm.import_osm import update_osm
+
+        if context.scene.osm.file!='' and path.exists(context.scene.osm.file) and path.exists(self.filepath):
+            update_osm(self.filepath,context)
         return {'FINISHED'}
 
 class SCENE_OT_remove_osm(bpy.types.Operator):
@@ -78,19 +171,53 @@ class SCENE_OT_remove_osm(bpy.types.Operator):
         remove_osm(context)
         return {'FINISHED'}
 
+class SCENE_OT_load_osm_tile(bpy.types.Operator):
+    bl_label = 'Load tile'
+    bl_idname = 'scene.load_osm_tile'
+    bl_description = 'Loads the chosen tile of the OSM file.'
+
+    def execute(self,context):
+        from os import path
+        from io_osm.import_osm import load_tile
+
+        filepath = context.scene.osm.file
+
+        if filepath!='' and path.exists(filepath):
+            load_tile(context,context.scene.osm.tile)
+        return {'FINISHED'}
+
+class SCENE_OT_unload_osm_tile(bpy.types.Operator):
+    bl_label = 'Unload tile'
+    bl_idname = 'scene.unload_osm_tile'
+    bl_description = 'Removes the objects of the chosen tile.'
+
+    def execute(self,context):
+        from io_osm.import_osm import unload_tile
+
+        unload_tile(context,context.scene.osm.tile)
+        return {'FINISHED'}
+
 
 def register_ops():
+    bpy.utils.register_class(ImportOSM)
     bpy.utils.register_class(MATERIAL_OT_add_osm_tag)
     bpy.utils.register_class(MATERIAL_OT_remove_osm_tag)
     bpy.utils.register_class(GROUP_OT_add_osm_tag)
     bpy.utils.register_class(GROUP_OT_remove_osm_tag)
     bpy.utils.register_class(SCENE_OT_rebuild_osm)
+    bpy.utils.register_class(SCENE_OT_update_osm)
     bpy.utils.register_class(SCENE_OT_remove_osm)
+    bpy.utils.register_class(SCENE_OT_load_osm_tile)
+    bpy.utils.register_class(SCENE_OT_unload_osm_tile)
 
 def unregister_ops():
+    bpy.utils.unregister_class(ImportOSM)
     bpy.utils.unregister_class(MATERIAL_OT_add_osm_tag)
     bpy.utils.unregister_class(MATERIAL_OT_remove_osm_tag)
     bpy.utils.unregister_class(GROUP_OT_add_osm_tag)
     bpy.utils.unregister_class(GROUP_OT_remove_osm_tag)
     bpy.utils.unregister_class(SCENE_OT_rebuild_osm)
+    bpy.utils.unregister_class(SCENE_OT_update_osm)
     bpy.utils.unregister_class(SCENE_OT_remove_osm)
+    bpy.utils.unregister_class(SCENE_OT_load_osm_tile)
+    bpy.utils.unregister_class(SCENE_OT_unload_osm_tile)
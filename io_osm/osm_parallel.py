@@ -0,0 +1,264 @@
+import os
+import sys
+from array import array
+from collections import deque
+from io_osm.osm_parser import OSMParser, Element, createExpatParser
+from io_osm.osm_projection import mercX, mercY, projectMercator
+
+# Function: getPythonExecutable
+# Returns the Python interpreter worker processes can be started with, None if there is none.
+# Inside Blender sys.executable may be the Blender binary, older versions name their bundled Python in bpy.app.binary_path_python.
+def getPythonExecutable():
+    if os.path.basename(sys.executable).lower().startswith('python'):
+        return sys.executable
+    try:
+        import bpy
+        path = getattr(bpy.app,'binary_path_python','')
+    except ImportError:
+        path = ''
+    if path and os.path.isfile(path):
+        return path
+    return None
+
+# Function: getWorkers
+# Returns the number of worker processes that can actually be used. Where processes are forked they copy Blender's interpreter.
+# Where they are spawned (Windows, macOS) a new interpreter is started, which has to be Python and not Blender itself,
+# so the interpreter is set for multiprocessing. Without one everything runs in this process.
+#
+# Parameters:
+#   int workers - Number of worker processes asked for.
+#
+# Returns:
+#   int - The number of worker processes, 1 if none can be started.
+def getWorkers(workers):
+    if workers<=1:
+        return 1
+
+    import multiprocessing
+    if hasattr(multiprocessing,'get_start_method'):
+        method = multiprocessing.get_start_method()
+    elif sys.platform=='win32':
+        method = 'spawn'
+    else:
+        method = 'fork'
+    if method=='fork':
+        return workers
+
+    executable = getPythonExecutable()
+    if executable is None:
+        return 1
+    multiprocessing.set_executable(executable)
+    return workers
+
+# start tags of the elements a file may be split in front of
+SPLIT_TAGS = (b'<node',b'<way',b'<relation')
+
+# Function: findElementStart
+# Returns the position of the first node, way or relation start tag at or after a position in a file.
+#
+# Parameters:
+#   file - The file opened for binary reading.
+#   int pos - Position to start searching from.
+#   int end - Position to stop searching at.
+def findElementStart(file,pos,end):
+    block_size = 65536
+    while pos<end:
+        file.seek(pos)
+        # overlap the blocks, so tags on block borders are found
+        data = file.read(min(block_size,end-pos)+16)
+        found = -1
+        for tag in SPLIT_TAGS:
+            i = data.find(tag)
+            while i!=-1 and i+len(tag)<len(data) and data[i+len(tag)] not in b' \t\r\n/>':
+                i = data.find(tag,i+1)
+            if i!=-1 and (found==-1 or i<found):
+                found = i
+        if found!=-1 and pos+found<end:
+            return pos+found
+        pos+=block_size
+    return end
+
+# Function: splitFile
+# Splits an OSM XML file at element boundaries into byte ranges containing only nodes, ways and relations.
+#
+# Parameters:
+#   string filepath - Path to the OSM file.
+#   int num - Number of chunks to create.
+#
+# Returns:
+#   list - (start,end) tuples of the chunks.
+def splitFile(filepath,num):
+    size = os.path.getsize(filepath)
+    file = open(filepath,'rb')
+    try:
+        # the data ends with the closing root element
+        file.seek(max(0,size-4096))
+        tail = file.read()
+        end = max(0,size-4096)+tail.rfind(b'</osm>')
+
+        start = findElementStart(file,0,end)
+        step = max(1,(end-start)//num)
+        bounds = [start]
+        for i in range(1,num):
+            pos = findElementStart(file,max(bounds[-1]+1,start+i*step),end)
+            if pos>=end:
+                break
+            bounds.append(pos)
+        bounds.append(end)
+    finally:
+        file.close()
+
+    return [(bounds[i],bounds[i+1]) for i in range(0,len(bounds)-1) if bounds[i]<bounds[i+1]]
+
+# Function: parseChunk
+# Parses a byte range of an OSM XML file and projects the node coordinates. Runs in worker processes.
+#
+# Parameters:
+#   string filepath - Path to the OSM file.
+#   int start - First byte of the chunk.
+#   int end - Byte after the chunk.
+#   tuple origin - Projected coordinates of the projection origin.
+#
+# Returns:
+#   dict - Compact arrays of the nodes and ways in the chunk, relations as <Element> instances.
+def parseChunk(filepath,start,end,origin):
+    file = open(filepath,'rb')
+    try:
+        file.seek(start)
+        data = file.read(end-start)
+    finally:
+        file.close()
+
+    pending = []
+    parser = createExpatParser(pending,{})
+    parser.Parse(b'<osm>')
+    parser.Parse(data)
+    parser.Parse(b'</osm>',True)
+    del data
+
+    chunk = {'node_ids':array('q'),'node_versions':array('l'),'node_lat':array('d'),'node_lon':array('d'),'node_ele':array('d'),
+             'node_x':None,'node_y':None,'node_tags':{},
+             'way_ids':array('q'),'way_versions':array('l'),'way_ref_offsets':array('q',[0]),'way_refs':array('q'),'way_tags':{},
+             'relations':[]}
+
+    for element in pending:
+        attributes = element.attributes
+        if element.name=='node':
+            lat = float(attributes['lat'])
+            lon = float(attributes['lon'])
+            if element.tags:
+                chunk['node_tags'][len(chunk['node_ids'])] = element.tags
+            chunk['node_ids'].append(int(attributes['id']))
+            chunk['node_versions'].append(int(attributes.get('version',0)))
+            chunk['node_lat'].append(lat)
+            chunk['node_lon'].append(lon)
+            chunk['node_ele'].append(float(attributes.get('ele','nan')))
+        elif element.name=='way':
+            if element.tags:
+                chunk['way_tags'][len(chunk['way_ids'])] = element.tags
+            chunk['way_ids'].append(int(attributes['id']))
+            chunk['way_versions'].append(int(attributes.get('version',0)))
+            chunk['way_refs'].extend([int(ref) for ref in element.refs])
+            chunk['way_ref_offsets'].append(len(chunk['way_refs']))
+        elif element.name=='relation':
+            chunk['relations'].append(element)
+
+    (chunk['node_x'],chunk['node_y']) = projectMercator(chunk['node_lat'],chunk['node_lon'],origin)
+    return chunk
+
+# Function: chunkElements
+# Generator turning the arrays returned by <parseChunk> back into elements.
+def chunkElements(chunk):
+    ids = chunk['node_ids']
+    versions = chunk['node_versions']
+    lat = chunk['node_lat']
+    lon = chunk['node_lon']
+    ele = chunk['node_ele']
+    x = chunk['node_x']
+    y = chunk['node_y']
+    tags = chunk['node_tags']
+    for i in range(0,len(ids)):
+        attributes = {'id':str(ids[i]),'lat':lat[i],'lon':lon[i]}
+        if ele[i]==ele[i]: # not NaN
+            attributes['ele'] = ele[i]
+        if versions[i]:
+            attributes['version'] = str(versions[i])
+        element = Element('node',attributes)
+        element.co = (x[i],y[i])
+        element.tags = tags.get(i,[])
+        yield element
+
+    ids = chunk['way_ids']
+    versions = chunk['way_versions']
+    offsets = chunk['way_ref_offsets']
+    refs = chunk['way_refs']
+    tags = chunk['way_tags']
+    for i in range(0,len(ids)):
+        attributes = {'id':str(ids[i])}
+        if versions[i]:
+            attributes['version'] = str(versions[i])
+        element = Element('way',attributes)
+        element.refs = refs[offsets[i]:offsets[i+1]]
+        element.tags = tags.get(i,[])
+        yield element
+
+    for element in chunk['relations']:
+        yield element
+
+
+# Class: ParallelOSMParser
+# Parses an uncompressed OSM XML file with several worker processes. The file is split at element boundaries,
+# the workers parse the chunks and project the nodes and return compact arrays, which are turned back into elements in order.
+class ParallelOSMParser(OSMParser):
+    # Property: chunk_bytes
+    # int - Maximum size of a chunk, large files are split in more chunks than there are workers.
+    chunk_bytes = 16777216
+
+    # Constructor: __init__
+    #
+    # Parameters:
+    #   string filepath - Path to the OSM file.
+    #   int workers - Number of worker processes.
+    def __init__(self,filepath,workers):
+        super(ParallelOSMParser,self).__init__(filepath)
+        self.workers = workers
+
+    # Method: readHeader
+    # Reads root attributes and bounds sequentially, the elements are parsed by the workers later on.
+    def readHeader(self):
+        super(ParallelOSMParser,self).readHeader()
+        self.stream.close()
+        self.stream = None
+        self.buffer = []
+
+    # Method: getOrigin
+    # Returns the projected coordinates of the minimum bounds, which the node coordinates are relative to.
+    def getOrigin(self):
+        return (mercX(float(self.bounds['minlon'])),mercY(float(self.bounds['minlat'])))
+
+    # Method: elements
+    # Generator over all elements in the file, parsed by the worker processes.
+    def elements(self):
+        from concurrent.futures import ProcessPoolExecutor
+
+        if self.bounds is None:
+            self.readHeader()
+
+        num = max(self.workers,os.path.getsize(self.filepath)//self.chunk_bytes)
+        chunks = splitFile(self.filepath,num)
+        origin = self.getOrigin()
+
+        # keep a limited number of chunks in flight, so results do not pile up in memory
+        executor = ProcessPoolExecutor(self.workers)
+        try:
+            pending = deque()
+            for (start,end) in chunks:
+                pending.append(executor.submit(parseChunk,self.filepath,start,end,origin))
+                if len(pending)>=self.workers*2:
+                    for element in chunkElements(pending.popleft().result()):
+                        yield element
+            while pending:
+                for element in chunkElements(pending.popleft().result()):
+                    yield element
+        finally:
+            executor.shutdown()
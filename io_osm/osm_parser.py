@@ -0,0 +1,295 @@
+from xml.parsers import expat
+
+# magic bytes of the supported compression formats
+COMPRESSION_MAGIC = ((b'\x1f\x8b','gzip'),(b'BZh','bz2'),(b'\xfd7zXZ\x00','lzma'))
+
+# Function: openParser
+# Returns a parser for an OSM XML or PBF file. If caching is enabled a valid sidecar cache is read instead of the file,
+# otherwise the cache is written while the file is parsed.
+#
+# Parameters:
+#   filepath - Path to the OSM file or a list of paths of files merged into one, see <MergedParser>.
+#   bool cache - Use the binary sidecar cache.
+#   int workers - Number of worker processes the parser may use, see <osm_parallel.getWorkers>.
+#   list changes - Paths of osmChange files applied on top of the file, in the order they were applied.
+def openParser(filepath,cache = False,workers = 1,changes = ()):
+    from io_osm.osm_parallel import getWorkers
+    workers = getWorkers(workers)
+    if isinstance(filepath,(list,tuple)):
+        if len(filepath)>1:
+            from io_osm.osm_merge import MergedParser
+            parser = MergedParser([openFileParser(path,cache,workers) for path in filepath])
+        else:
+            parser = openFileParser(filepath[0],cache,workers)
+    else:
+        parser = openFileParser(filepath,cache,workers)
+    if changes:
+        from io_osm.osm_change import OSMChange, ChangedParser
+        return ChangedParser(parser,OSMChange(changes))
+    return parser
+
+# Function: openFileParser
+# Returns the parser for the file itself, see <openParser>.
+def openFileParser(filepath,cache = False,workers = 1):
+    if filepath.lower().endswith('.pbf'):
+        from io_osm.osm_pbf import PBFParser
+        parser = PBFParser(filepath,workers)
+    elif workers>1 and getCompression(filepath) is None:
+        # compressed files can not be split, so they are always parsed sequentially
+        from io_osm.osm_parallel import ParallelOSMParser
+        parser = ParallelOSMParser(filepath,workers)
+    else:
+        parser = OSMParser(filepath)
+    if cache:
+        from io_osm.osm_cache import OSMCache, OSMCacheWriter
+        reader = OSMCache(filepath)
+        if reader.isValid():
+            return reader
+        return OSMCacheWriter(parser)
+    return parser
+
+# Function: getCompression
+# Returns the name of the module needed to decompress a file or None if it is not compressed.
+def getCompression(filepath):
+    file = open(filepath,'rb')
+    try:
+        magic = file.read(6)
+    finally:
+        file.close()
+
+    for (prefix,module) in COMPRESSION_MAGIC:
+        if magic.startswith(prefix):
+            return module
+    return None
+
+# Function: openFile
+# Opens a file for binary reading. Compressed files are decompressed on a background thread while they are read.
+def openFile(filepath):
+    compression = getCompression(filepath)
+    if compression:
+        return DecompressingReader(filepath,compression)
+    return open(filepath,'rb')
+
+
+# Class: DecompressingReader
+# File like object decompressing a gzip, bzip2 or xz file on a background thread, so decompression overlaps with parsing.
+# Only a few decompressed chunks are queued at once, the decompressed file is neither written to disk nor held in memory.
+class DecompressingReader():
+    # Property: chunk_size
+    # int - Number of decompressed bytes passed to the reader at once.
+    chunk_size = 262144
+
+    # Property: queue_size
+    # int - Number of decompressed chunks that may be waiting for the reader.
+    queue_size = 8
+
+    # Constructor: __init__
+    #
+    # Parameters:
+    #   string filepath - Path to the compressed file.
+    #   string compression - Name of the module decompressing the file (gzip, bz2 or lzma).
+    def __init__(self,filepath,compression):
+        import threading
+        import queue
+
+        if compression=='gzip':
+            import gzip
+            self.file = gzip.open(filepath,'rb')
+        elif compression=='bz2':
+            import bz2
+            self.file = bz2.BZ2File(filepath,'rb')
+        else:
+            try:
+                import lzma
+            except ImportError:
+                raise IOError('xz compressed files are not supported by this Python version: %r' % filepath)
+            self.file = lzma.LZMAFile(filepath,'rb')
+
+        self.queue = queue.Queue(self.queue_size)
+        self.full = queue.Full
+        self.stopped = False
+        self.eof = False
+        self.thread = threading.Thread(target=self.decompress)
+        self.thread.daemon = True
+        self.thread.start()
+
+    # Method: decompress
+    # Runs on the background thread and queues the decompressed chunks. An empty chunk marks the end of the file, errors are passed on to the reader.
+    def decompress(self):
+        try:
+            while not self.stopped:
+                data = self.file.read(self.chunk_size)
+                self.put(data)
+                if not data:
+                    break
+        except Exception as e:
+            self.put(e)
+        finally:
+            self.file.close()
+
+    def put(self,item):
+        while not self.stopped:
+            try:
+                self.queue.put(item,True,0.1)
+                return
+            except self.full:
+                pass
+
+    # Method: read
+    # Returns the next decompressed chunk or an empty bytes object at the end of the file.
+    #
+    # Parameters:
+    #   int size - Ignored, the chunks have the size they were decompressed with.
+    def read(self,size = -1):
+        if self.eof:
+            return b''
+        data = self.queue.get()
+        if isinstance(data,Exception):
+            self.eof = True
+            raise data
+        if not data:
+            self.eof = True
+        return data
+
+    # Method: close
+    # Stops the background thread.
+    def close(self):
+        self.stopped = True
+        self.thread.join()
+
+
+# Function: createExpatParser
+# Creates an expat parser collecting the completed top level elements.
+#
+# Parameters:
+#   list pending - List the completed elements are appended to.
+#   dict root - Dict updated with the attributes of the <osm> root element.
+def createExpatParser(pending,root):
+    parser = expat.ParserCreate()
+    state = {'element':None,'action':None}
+
+    def start(name,attributes):
+        element = state['element']
+        if element:
+            if name=='tag':
+                element.tags.append((attributes['k'],attributes['v']))
+            elif name=='nd':
+                element.refs.append(attributes['ref'])
+            elif name=='member':
+                element.members.append((attributes['type'],attributes['ref'],attributes.get('role','')))
+        elif name in ('node','way','relation','bounds'):
+            state['element'] = Element(name,attributes)
+            state['element'].action = state['action']
+        elif name in ('create','modify','delete'):
+            # osmChange files group their elements by action
+            state['action'] = name
+        elif name in ('osm','osmChange'):
+            root.update(attributes)
+
+    def end(name):
+        element = state['element']
+        if element and element.name==name:
+            pending.append(element)
+            state['element'] = None
+        elif name in ('create','modify','delete'):
+            state['action'] = None
+
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    return parser
+
+
+# Class: Element
+# A single top level element of an OSM file (bounds, node, way or relation) with its tags, node references and members.
+# Elements are handed out one by one while streaming and dropped once they have been consumed.
+# Parsers that already projected a node store its x/y coordinates in co.
+# Node references are strings, binary parsers may hand them out as an array of 64 bit integers instead.
+# Elements of osmChange files know their action (create, modify or delete).
+class Element():
+    # Constructor: __init__
+    #
+    # Parameters:
+    #   string name - Name of the element (node, way, relation or bounds).
+    #   dict attributes - The attributes of the element.
+    def __init__(self,name,attributes):
+        self.name = name
+        self.attributes = attributes
+        self.tags = []
+        self.refs = []
+        self.members = []
+        self.co = None
+        self.action = None
+
+
+# Class: OSMParser
+# Streaming parser for OSM XML files based on expat. No DOM is built, instead the elements are emitted as soon as they are closed.
+class OSMParser():
+    # Property: chunk_size
+    # int - Number of bytes read from the file and fed to expat at once.
+    chunk_size = 65536
+
+    # Constructor: __init__
+    #
+    # Parameters:
+    #   string filepath - Path to the OSM file.
+    def __init__(self,filepath):
+        self.filepath = filepath
+        self.attributes = {}
+        self.bounds = None
+        self.buffer = []
+        self.stream = None
+
+    # Method: readHeader
+    # Reads the attributes of the <osm> root element and the <bounds> element, which have to be known before any node can be projected.
+    # Stops at the first data element, elements read so far are buffered and returned by <elements> later on.
+    def readHeader(self):
+        self.stream = self.iterElements()
+        self.buffer = []
+        for element in self.stream:
+            if element.name=='bounds':
+                self.bounds = element.attributes
+                break
+            self.buffer.append(element)
+            if element.name in ('node','way','relation'):
+                break
+
+    # Method: elements
+    # Generator over all elements in the file. Continues the stream started by <readHeader> or starts a new one.
+    def elements(self):
+        if self.stream:
+            stream = self.stream
+            self.stream = None
+            buffer = self.buffer
+            self.buffer = []
+            for element in buffer:
+                yield element
+        else:
+            stream = self.iterElements()
+
+        for element in stream:
+            if element.name!='bounds':
+                yield element
+
+    # Method: open
+    # Opens the file for binary reading, compressed files are decompressed while being read.
+    def open(self):
+        return openFile(self.filepath)
+
+    # Method: iterElements
+    # Feeds the file chunk by chunk to expat and yields the elements completed by each chunk.
+    def iterElements(self):
+        pending = []
+        parser = createExpatParser(pending,self.attributes)
+
+        file = self.open()
+        try:
+            while True:
+                data = file.read(self.chunk_size)
+                parser.Parse(data,not data)
+                for element in pending:
+                    yield element
+                del pending[:]
+                if not data:
+                    break
+        finally:
+            file.close()
@@ -0,0 +1,332 @@
+import zlib
+import struct
+from array import array
+from collections import deque
+from io_osm.osm_parser import Element
+
+MEMBER_TYPES = ('node','way','relation')
+
+# Function: readVarint
+# Reads a protobuf varint.
+#
+# Returns:
+#   tuple - The value and the position after it.
+def readVarint(data,pos):
+    result = 0
+    shift = 0
+    while True:
+        b = data[pos]
+        pos+=1
+        result|=(b & 0x7f)<<shift
+        if not b & 0x80:
+            return (result,pos)
+        shift+=7
+
+# Function: zigzag
+# Decodes a zigzag encoded signed integer.
+def zigzag(value):
+    return (value>>1) ^ -(value & 1)
+
+# Function: toSigned
+# Converts a two's complement encoded varint to a signed integer.
+def toSigned(value):
+    if value>=0x8000000000000000:
+        return value-0x10000000000000000
+    return value
+
+# Function: readFields
+# Reads all fields of a protobuf message.
+#
+# Returns:
+#   dict - Lists of raw field values by field number. Length delimited values are memoryviews, varints are ints.
+def readFields(data):
+    fields = {}
+    pos = 0
+    end = len(data)
+    while pos<end:
+        (key,pos) = readVarint(data,pos)
+        wire_type = key & 7
+        if wire_type==0:
+            (value,pos) = readVarint(data,pos)
+        elif wire_type==2:
+            (length,pos) = readVarint(data,pos)
+            value = data[pos:pos+length]
+            pos+=length
+        elif wire_type==1:
+            value = data[pos:pos+8]
+            pos+=8
+        elif wire_type==5:
+            value = data[pos:pos+4]
+            pos+=4
+        else:
+            raise ValueError('unsupported protobuf wire type %d' % wire_type)
+        field = key>>3
+        if field in fields:
+            fields[field].append(value)
+        else:
+            fields[field] = [value]
+    return fields
+
+# Function: readPacked
+# Reads a repeated varint field, which may be packed or not.
+def readPacked(fields,field):
+    values = []
+    for value in fields.get(field,()):
+        if isinstance(value,int):
+            values.append(value)
+        else:
+            pos = 0
+            end = len(value)
+            while pos<end:
+                (v,pos) = readVarint(value,pos)
+                values.append(v)
+    return values
+
+# Function: readDelta
+# Reads a packed, zigzag and delta encoded sint64 field.
+def readDelta(fields,field):
+    values = []
+    last = 0
+    for v in readPacked(fields,field):
+        last+=(v>>1) ^ -(v & 1)
+        values.append(last)
+    return values
+
+def readInt(fields,field,default = 0):
+    if field in fields:
+        return fields[field][-1]
+    return default
+
+def readVersion(fields):
+    if 4 in fields:
+        return readInt(readFields(fields[4][-1]),1)
+    return 0
+
+def readTags(fields,strings):
+    return list(zip([strings[k] for k in readPacked(fields,2)],[strings[v] for v in readPacked(fields,3)]))
+
+# Function: readBlob
+# Returns the uncompressed content of a blob.
+def readBlob(data):
+    fields = readFields(memoryview(data))
+    if 1 in fields:
+        return bytes(fields[1][0])
+    if 3 in fields:
+        return zlib.decompress(bytes(fields[3][0]))
+    raise ValueError('unsupported PBF blob compression')
+
+# Function: decodeBlock
+# Decodes a compressed OSMData blob into elements. Is a plain function so it can run in worker processes.
+#
+# Parameters:
+#   bytes data - The raw blob.
+#
+# Returns:
+#   list - The <Element> instances of the block.
+def decodeBlock(data):
+    block = readFields(memoryview(readBlob(data)))
+    strings = [bytes(s).decode('utf-8') for s in readFields(block[1][0]).get(1,[])] if 1 in block else []
+    granularity = readInt(block,17,100)
+    lat_offset = toSigned(readInt(block,19))
+    lon_offset = toSigned(readInt(block,20))
+
+    def lat(value):
+        return (lat_offset+granularity*value)*1e-9
+
+    def lon(value):
+        return (lon_offset+granularity*value)*1e-9
+
+    elements = []
+    for group in block.get(2,()):
+        group = readFields(group)
+
+        for node in group.get(1,()):
+            node = readFields(node)
+            element = Element('node',{'id':str(zigzag(readInt(node,1))),'lat':lat(zigzag(readInt(node,8))),'lon':lon(zigzag(readInt(node,9)))})
+            version = readVersion(node)
+            if version:
+                element.attributes['version'] = str(version)
+            element.tags = readTags(node,strings)
+            elements.append(element)
+
+        for dense in group.get(2,()):
+            dense = readFields(dense)
+            ids = readDelta(dense,1)
+            lats = readDelta(dense,8)
+            lons = readDelta(dense,9)
+            keys_vals = readPacked(dense,10)
+            versions = readPacked(readFields(dense[5][-1]),1) if 5 in dense else []
+            kv = 0
+            for i in range(0,len(ids)):
+                element = Element('node',{'id':str(ids[i]),'lat':lat(lats[i]),'lon':lon(lons[i])})
+                if i<len(versions) and versions[i]:
+                    element.attributes['version'] = str(versions[i])
+                # keys and values of all nodes in one list, each node is terminated by 0
+                while kv<len(keys_vals) and keys_vals[kv]!=0:
+                    element.tags.append((strings[keys_vals[kv]],strings[keys_vals[kv+1]]))
+                    kv+=2
+                kv+=1
+                elements.append(element)
+
+        for way in group.get(3,()):
+            way = readFields(way)
+            element = Element('way',{'id':str(toSigned(readInt(way,1)))})
+            version = readVersion(way)
+            if version:
+                element.attributes['version'] = str(version)
+            element.tags = readTags(way,strings)
+            element.refs = array('q',readDelta(way,8))
+            elements.append(element)
+
+        for relation in group.get(4,()):
+            relation = readFields(relation)
+            element = Element('relation',{'id':str(toSigned(readInt(relation,1)))})
+            version = readVersion(relation)
+            if version:
+                element.attributes['version'] = str(version)
+            element.tags = readTags(relation,strings)
+            roles = readPacked(relation,8)
+            refs = readDelta(relation,9)
+            types = readPacked(relation,10)
+            for i in range(0,len(refs)):
+                element.members.append((MEMBER_TYPES[types[i]],str(refs[i]),strings[roles[i]]))
+            elements.append(element)
+
+    return elements
+
+# Function: getBlockBounds
+# Returns the bounds of the nodes of an OSMData blob, for files whose header has no bounding box.
+#
+# Parameters:
+#   bytes data - The raw blob.
+#
+# Returns:
+#   tuple - Minimum latitude, minimum longitude, maximum latitude and maximum longitude, None if the blob has no nodes.
+def getBlockBounds(data):
+    block = readFields(memoryview(readBlob(data)))
+    granularity = readInt(block,17,100)
+    lat_offset = toSigned(readInt(block,19))
+    lon_offset = toSigned(readInt(block,20))
+
+    lats = []
+    lons = []
+    for group in block.get(2,()):
+        group = readFields(group)
+        for node in group.get(1,()):
+            node = readFields(node)
+            lats.append(zigzag(readInt(node,8)))
+            lons.append(zigzag(readInt(node,9)))
+        for dense in group.get(2,()):
+            dense = readFields(dense)
+            lats.extend(readDelta(dense,8))
+            lons.extend(readDelta(dense,9))
+    if len(lats)==0:
+        return None
+
+    # granularity is positive, so the extremes of the raw values are the extremes of the coordinates
+    return ((lat_offset+granularity*min(lats))*1e-9,(lon_offset+granularity*min(lons))*1e-9,
+            (lat_offset+granularity*max(lats))*1e-9,(lon_offset+granularity*max(lons))*1e-9)
+
+
+# Class: PBFParser
+# Reads OSM PBF files with plain Python and zlib. Offers the same interface as <OSMParser>, blobs can be decoded by several worker processes.
+class PBFParser():
+    # Constructor: __init__
+    #
+    # Parameters:
+    #   string filepath - Path to the PBF file.
+    #   int workers - Number of worker processes decoding blobs. 1 decodes in this process.
+    def __init__(self,filepath,workers = 1):
+        self.filepath = filepath
+        self.workers = workers
+        self.attributes = {}
+        self.bounds = None
+
+    # Method: blobs
+    # Generator over the blobs of the file.
+    #
+    # Returns:
+    #   tuple - The blob type and the raw blob.
+    def blobs(self):
+        file = open(self.filepath,'rb')
+        try:
+            while True:
+                size = file.read(4)
+                if len(size)<4:
+                    break
+                header = readFields(memoryview(file.read(struct.unpack('>I',size)[0])))
+                type = bytes(header[1][0]).decode('ascii')
+                yield (type,file.read(readInt(header,3)))
+        finally:
+            file.close()
+
+    # Method: readHeader
+    # Reads the OSMHeader blob with the bounding box and the writing program.
+    # The bounding box is optional, without it the bounds of all nodes are read in an extra pass over the file, see <readNodeBounds>.
+    def readHeader(self):
+        for (type,data) in self.blobs():
+            if type=='OSMHeader':
+                header = readFields(memoryview(readBlob(data)))
+                for feature in header.get(4,()):
+                    feature = bytes(feature).decode('utf-8')
+                    if feature not in ('OsmSchema-V0.6','DenseNodes'):
+                        raise ValueError('unsupported PBF feature %r' % feature)
+                self.attributes = {'version':'0.6'}
+                if 16 in header:
+                    self.attributes['generator'] = bytes(header[16][0]).decode('utf-8')
+                if 1 in header:
+                    bbox = readFields(header[1][0])
+                    self.bounds = {'minlon':zigzag(readInt(bbox,1))*1e-9,'maxlon':zigzag(readInt(bbox,2))*1e-9,'maxlat':zigzag(readInt(bbox,3))*1e-9,'minlat':zigzag(readInt(bbox,4))*1e-9}
+            break
+
+        if self.bounds is None:
+            self.bounds = self.readNodeBounds()
+
+    # Method: readNodeBounds
+    # Returns the bounds of all nodes in the file like the bounding box of the header.
+    #
+    # Raises:
+    #   IOError - The file has no nodes.
+    def readNodeBounds(self):
+        bounds = None
+        for (type,data) in self.blobs():
+            if type!='OSMData':
+                continue
+            block = getBlockBounds(data)
+            if block is None:
+                continue
+            if bounds is None:
+                bounds = list(block)
+            else:
+                bounds = [min(bounds[0],block[0]),min(bounds[1],block[1]),max(bounds[2],block[2]),max(bounds[3],block[3])]
+        if bounds is None:
+            raise IOError('%s has neither a bounding box nor nodes' % self.filepath)
+        return {'minlat':bounds[0],'minlon':bounds[1],'maxlat':bounds[2],'maxlon':bounds[3]}
+
+    # Method: elements
+    # Generator over all elements in the file.
+    def elements(self):
+        blocks = (data for (type,data) in self.blobs() if type=='OSMData')
+
+        if self.workers<=1:
+            for data in blocks:
+                for element in decodeBlock(data):
+                    yield element
+            return
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        # keep a limited number of blobs in flight, so the file is never read completely into memory
+        executor = ProcessPoolExecutor(self.workers)
+        try:
+            pending = deque()
+            for data in blocks:
+                pending.append(executor.submit(decodeBlock,data))
+                if len(pending)>=self.workers*2:
+                    for element in pending.popleft().result():
+                        yield element
+            while pending:
+                for element in pending.popleft().result():
+                    yield element
+        finally:
+            executor.shutdown()
@@ -0,0 +1,171 @@
+import math
+from array import array
+
+# NumPy is not shipped with every Blender build, batch projection falls back to plain Python without it
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+EQUATOR_RADIUS = 6378137.0      # greatest earth radius (equator)
+POLE_RADIUS = 6356752.314245    # smallest earth radius (pole)
+
+# constants of the ellipsoid, computed once instead of for every node
+ECCENTRICITY = math.sqrt(1-(POLE_RADIUS/EQUATOR_RADIUS)**2)
+HALF_ECCENTRICITY = ECCENTRICITY/2
+ECCENTRICITY_SQ = 1-(POLE_RADIUS/EQUATOR_RADIUS)**2
+HALF_PI = math.pi/2
+DEG_TO_RAD = math.pi/180
+MAX_LAT = 89.5
+
+# Python implementation for mercator projection by Paulo Silva taken from: http://wiki.openstreetmap.org/wiki/Mercator
+
+def mercX(lon):
+    return EQUATOR_RADIUS*math.radians(lon)
+
+def mercY(lat):
+    if lat>MAX_LAT:lat=MAX_LAT
+    if lat<-MAX_LAT:lat=-MAX_LAT
+    phi=math.radians(lat)
+    con=ECCENTRICITY*math.sin(phi)
+    con=((1.0-con)/(1.0+con))**HALF_ECCENTRICITY
+    ts=math.tan((HALF_PI-phi)/2)/con
+    y=0-EQUATOR_RADIUS*math.log(ts)
+    return y
+
+# Function: toArray
+# Returns a NumPy result as an array of doubles.
+def toArray(values):
+    return array('d',numpy.ascontiguousarray(values,dtype=numpy.float64).tobytes())
+
+# Function: projectMercator
+# Projects whole columns of latitudes and longitudes with the elliptical mercator projection of <mercX> and <mercY>.
+#
+# Parameters:
+#   sequence lat - Latitudes.
+#   sequence lon - Longitudes.
+#   tuple origin - Projected coordinates subtracted from the results.
+#
+# Returns:
+#   tuple - Arrays of the x and y coordinates.
+def projectMercator(lat,lon,origin = (0.0,0.0)):
+    (x0,y0) = origin
+
+    if numpy is not None:
+        phi = numpy.radians(numpy.clip(numpy.asarray(lat,dtype=numpy.float64),-MAX_LAT,MAX_LAT))
+        con = ECCENTRICITY*numpy.sin(phi)
+        con = ((1.0-con)/(1.0+con))**HALF_ECCENTRICITY
+        y = -EQUATOR_RADIUS*numpy.log(numpy.tan((HALF_PI-phi)/2)/con)-y0
+        x = EQUATOR_RADIUS*numpy.radians(numpy.asarray(lon,dtype=numpy.float64))-x0
+        return (toArray(x),toArray(y))
+
+    sin = math.sin
+    tan = math.tan
+    log = math.log
+    scale = EQUATOR_RADIUS*DEG_TO_RAD
+    x = array('d',[scale*value-x0 for value in lon])
+    y = array('d',lat)
+    for i in range(0,len(y)):
+        phi = y[i]
+        if phi>MAX_LAT: phi = MAX_LAT
+        elif phi<-MAX_LAT: phi = -MAX_LAT
+        phi*=DEG_TO_RAD
+        con = ECCENTRICITY*sin(phi)
+        con = ((1.0-con)/(1.0+con))**HALF_ECCENTRICITY
+        y[i] = -EQUATOR_RADIUS*log(tan((HALF_PI-phi)/2)/con)-y0
+    return (x,y)
+
+# Function: getProjection
+# Returns a projection by its name.
+#
+# Parameters:
+#   string name - mercator or local.
+#   float lat - Latitude of the center of the imported area.
+#   float lon - Longitude of the center of the imported area.
+def getProjection(name,lat,lon):
+    if name=='local':
+        return LocalTangentPlane(lat,lon)
+    return MercatorProjection()
+
+
+# Class: MercatorProjection
+# The elliptical mercator projection the importer has always used. Distances are stretched away from the equator.
+class MercatorProjection():
+    name = 'mercator'
+
+    # Method: projectPoint
+    # Returns the x/y coordinates of a single latitude and longitude.
+    def projectPoint(self,lat,lon):
+        return (mercX(lon),mercY(lat))
+
+    # Method: project
+    # Projects columns of latitudes and longitudes.
+    #
+    # Returns:
+    #   tuple - Arrays of the x and y coordinates relative to origin.
+    def project(self,lat,lon,origin = (0.0,0.0)):
+        return projectMercator(lat,lon,origin)
+
+
+# Class: LocalTangentPlane
+# Projects onto a plane touching the WGS84 ellipsoid at the center of the imported area (east/north coordinates in meters).
+# Distances and angles are true to scale for small extracts, the error grows with the distance from the center.
+class LocalTangentPlane():
+    name = 'local'
+
+    # Constructor: __init__
+    #
+    # Parameters:
+    #   float lat - Latitude of the tangent point.
+    #   float lon - Longitude of the tangent point.
+    def __init__(self,lat,lon):
+        phi = math.radians(lat)
+        lam = math.radians(lon)
+        self.sin_lat = math.sin(phi)
+        self.cos_lat = math.cos(phi)
+        self.sin_lon = math.sin(lam)
+        self.cos_lon = math.cos(lam)
+        self.center = self.toECEF(phi,lam,math)
+
+    # Method: toECEF
+    # Returns earth centered, earth fixed coordinates of latitudes and longitudes in radians on the ellipsoid surface.
+    #
+    # Parameters:
+    #   phi - Latitudes, a float or a NumPy array.
+    #   lam - Longitudes, a float or a NumPy array.
+    #   module m - math for floats, numpy for arrays.
+    def toECEF(self,phi,lam,m):
+        sin_phi = m.sin(phi)
+        cos_phi = m.cos(phi)
+        n = EQUATOR_RADIUS/m.sqrt(1-ECCENTRICITY_SQ*sin_phi*sin_phi)
+        return (n*cos_phi*m.cos(lam),n*cos_phi*m.sin(lam),n*(1-ECCENTRICITY_SQ)*sin_phi)
+
+    # Method: toPlane
+    # Rotates ECEF coordinates into east/north coordinates of the tangent plane.
+    def toPlane(self,ecef):
+        dx = ecef[0]-self.center[0]
+        dy = ecef[1]-self.center[1]
+        dz = ecef[2]-self.center[2]
+        east = self.cos_lon*dy-self.sin_lon*dx
+        north = self.cos_lat*dz-self.sin_lat*(self.cos_lon*dx+self.sin_lon*dy)
+        return (east,north)
+
+    def projectPoint(self,lat,lon):
+        return self.toPlane(self.toECEF(math.radians(lat),math.radians(lon),math))
+
+    def project(self,lat,lon,origin = (0.0,0.0)):
+        (x0,y0) = origin
+
+        if numpy is not None:
+            phi = numpy.radians(numpy.asarray(lat,dtype=numpy.float64))
+            lam = numpy.radians(numpy.asarray(lon,dtype=numpy.float64))
+            (x,y) = self.toPlane(self.toECEF(phi,lam,numpy))
+            return (toArray(x-x0),toArray(y-y0))
+
+        x = array('d',lon)
+        y = array('d',lat)
+        for i in range(0,len(x)):
+            (east,north) = self.projectPoint(y[i],x[i])
+            x[i] = east-x0
+            y[i] = north-y0
+        return (x,y)
@@ -12,6 +12,17 @@ class OSM_Tag(bpy.types.PropertyGroup):
                                     default=False)
 
 
+class OSM_File(bpy.types.PropertyGroup):
+    name = bpy.props.StringProperty(name="File")
+
+
+class OSM_Part(bpy.types.PropertyGroup):
+    id = bpy.props.StringProperty(name="ID")
+    name = bpy.props.StringProperty(name="Name")
+    face = bpy.props.IntProperty(name="First face",description="Index of the first face of the way in the merged mesh.",default=0,min=0)
+    tags = bpy.props.CollectionProperty(name="Tags",type=OSM_Tag)
+
+
 class OSM_Scene(bpy.types.PropertyGroup):
     traffic_direction = bpy.props.EnumProperty(name="Traffic direction",
                                                 default='right',
@@ -25,6 +36,76 @@ class OSM_Scene(bpy.types.PropertyGroup):
 
     file = bpy.props.StringProperty(name="File",default='')
 
+    merge_files = bpy.props.CollectionProperty(name="Merged files",
+                                        description="Further OSM files merged with the file.",
+                                        type=OSM_File)
+
+    change_files = bpy.props.CollectionProperty(name="Change files",
+                                        description="osmChange files applied to the file, in the order they were applied.",
+                                        type=OSM_File)
+
+    two_pass = bpy.props.BoolProperty(name="Two-pass import",
+                                        description="Reads the file twice and only keeps nodes referenced by ways with a material or tagged for a group.",
+                                        default=False)
+
+    use_cache = bpy.props.BoolProperty(name="Use cache",
+                                        description="Keeps a binary cache of the parsed file next to it, so rebuilds do not parse the XML again. The directory of the file has to be writable.",
+                                        default=False)
+
+    import_types = bpy.props.EnumProperty(name="Import",
+                                        description="Types of objects to import.",
+                                        default={'building','area','trafficway','barrier','object'},
+                                        options={'ENUM_FLAG'},
+                                        items=[('building','buildings','Buildings.'),('area','areas','Flat areas.'),('trafficway','trafficways','All kinds of traffic ways.'),('barrier','barriers','Walls, fences and other barriers.'),('object','objects','Group instances on tagged nodes.')])
+
+    projection = bpy.props.EnumProperty(name="Projection",
+                                        description="Projection of latitude and longitude to scene coordinates.",
+                                        default='mercator',
+                                        items=[('mercator','mercator','Elliptical mercator projection, distances are stretched away from the equator.'),('local','local tangent plane','Plane touching the earth at the center of the file, true to scale for small extracts.')])
+
+    clip = bpy.props.EnumProperty(name="Clip",
+                                        description="Only imports what lies within a box of latitude and longitude.",
+                                        default='none',
+                                        items=[('none','none','Import everything.'),('box','box','Clip to the given latitude and longitude.'),('scene','geo-bounds','Clip to the geo-bounds of the scene.')])
+
+    clip_lat = bpy.props.FloatVectorProperty(name='Clip Latitude',
+                                                default=(0.0,0.0),
+                                                size=2)
+
+    clip_lon = bpy.props.FloatVectorProperty(name='Clip Longtitude',
+                                                default=(0.0,0.0),
+                                                size=2)
+
+    merge_meshes = bpy.props.BoolProperty(name="Merge by material",
+                                        description="Builds all ways of the same type and materials into one object instead of one object per way, per tile in tiled scenes.",
+                                        default=False)
+
+    share_meshes = bpy.props.BoolProperty(name="Share meshes",
+                                        description="Buildings with the same footprint, height and materials share one mesh and are placed by location and rotation.",
+                                        default=True)
+
+    workers = bpy.props.IntProperty(name="Worker processes",
+                                        description="Number of processes used for parsing and building meshes. 1 does both in Blender itself. On Windows and macOS the processes need Blender's bundled Python, without it 1 is used.",
+                                        default=1,
+                                        min=1,
+                                        max=64)
+
+    tile_size = bpy.props.FloatProperty(name="Tile size",
+                                        description="Splits the scene into square tiles of this size, which are loaded and unloaded separately. 0 imports everything at once.",
+                                        default=0.0,
+                                        min=0.0)
+
+    tile = bpy.props.IntVectorProperty(name="Tile",
+                                        description="Column and row of the tile to load or unload.",
+                                        default=(0,0),
+                                        min=0,
+                                        size=2)
+
+    tile_grid = bpy.props.IntVectorProperty(name="Tiles",
+                                        description="Number of tiles in x and y direction.",
+                                        default=(0,0),
+                                        size=2)
+
     geo_bounds_lat = bpy.props.FloatVectorProperty(name='Bounds Latitude',
                                                 default=(0.0,0.0),
                                                 size=2)
@@ -45,6 +126,11 @@ class OSM_Material(bpy.types.PropertyGroup):
                                             default="facade",
                                             items=[('facade','facade','Material will be used for facades.'),('basement','basement','Material will be used for basement.'),('flat_roof','flat roof','Material will create a flat roof.'),('sloped_roof','sloped roof','Matrerial will create a sloped roof.')])
 
+    roof_shape = bpy.props.EnumProperty(name="Roof shape",
+                                        description="Shape of sloped roofs, the roof:shape tag of a building overrides it.",
+                                        default='hipped',
+                                        items=[('hipped','hipped','Every wall gets a roof face.'),('gabled','gabled','Ends of the roof become gables.')])
+
     building_levels = bpy.props.IntProperty(name="Number of levels in texture",
                                             description="Number of building/roof levels the texture has.",
                                             default=1,
@@ -90,13 +176,18 @@ class OSM_Material(bpy.types.PropertyGroup):
 class OSM_Object(bpy.types.PropertyGroup):
     id = bpy.props.StringProperty(name="ID")
     name = bpy.props.StringProperty(name="Name")
+    fingerprint = bpy.props.StringProperty(name="Fingerprint",description="Hash of the coordinates and tags the object was built from.")
+    material_fingerprint = bpy.props.StringProperty(name="Material fingerprint",description="Hash of the materials or the group the object was built with.")
     tags = bpy.props.CollectionProperty(name="Tags",type=OSM_Tag)
+    parts = bpy.props.CollectionProperty(name="Parts",description="Ways merged into the object, in the order of their faces.",type=OSM_Part)
 
 class OSM_Group(bpy.types.PropertyGroup):
     tags = bpy.props.CollectionProperty(name="Tags",type=OSM_Tag)
 
 def register_props():
     bpy.utils.register_class(OSM_Tag)
+    bpy.utils.register_class(OSM_File)
+    bpy.utils.register_class(OSM_Part)
     bpy.utils.register_class(OSM_Scene)
     bpy.utils.register_class(OSM_Material)
     bpy.utils.register_class(OSM_Group)
@@ -109,6 +200,8 @@ def register_props():
 
 def unregister_props():
     bpy.utils.unregister_class(OSM_Tag)
+    bpy.utils.unregister_class(OSM_File)
+    bpy.utils.unregister_class(OSM_Part)
     bpy.utils.unregister_class(OSM_Scene)
     bpy.utils.unregister_class(OSM_Material)
     bpy.utils.unregister_class(OSM_Group)
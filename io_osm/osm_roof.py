@@ -0,0 +1,308 @@
+import math
+
+# lengths and times below are treated as 0, coordinates are meters
+EPSILON = 1e-7
+
+# Class: WavefrontVertex
+# A corner of the shrinking ring of <getSkeleton>. It moves along the bisector of its edges, so both edges move inwards with speed 1.
+class WavefrontVertex():
+    __slots__ = ('x','y','vx','vy','left','right','node','prev','next','reflex','active')
+
+    # Constructor: __init__
+    #
+    # Parameters:
+    #   float x - Current x coordinate.
+    #   float y - Current y coordinate.
+    #   int left - Index of the edge ending at the corner.
+    #   int right - Index of the edge starting at the corner.
+    #   int node - Index of the skeleton node the corner started at.
+    def __init__(self,x,y,left,right,node):
+        self.x = x
+        self.y = y
+        self.left = left
+        self.right = right
+        self.node = node
+        self.prev = None
+        self.next = None
+        self.active = True
+
+    # Sets the velocity, which keeps the corner on both edges while they move inwards.
+    def setVelocity(self,normals,directions):
+        (ax,ay) = normals[self.left]
+        (bx,by) = normals[self.right]
+        det = ax*by-ay*bx
+        if abs(det)<EPSILON:
+            if ax*bx+ay*by>0:
+                # the edges follow each other in a straight line
+                (self.vx,self.vy) = (ax,ay)
+            else:
+                # the edges run back on each other, they meet where they are
+                (self.vx,self.vy) = (0.0,0.0)
+        else:
+            self.vx = (by-ay)/det
+            self.vy = (ax-bx)/det
+        (lx,ly) = directions[self.left]
+        (rx,ry) = directions[self.right]
+        self.reflex = lx*ry-ly*rx<-EPSILON
+
+# Function: getSkeleton
+# Computes the straight skeleton of a counterclockwise ring. The ring is shrunk by moving all edges inwards with the same speed,
+# its corners trace the skeleton. Edges collapse when their corners meet (edge events), the ring is split in two when a reflex corner hits
+# an edge (split events). Every edge of the ring gets a face bounded by the edge and the traces of the corners.
+#
+# Parameters:
+#   list ring - (x,y) or (x,y,z) coordinates without repeating the first one, z is ignored.
+#
+# Returns:
+#   tuple - The nodes and the faces, None if the ring is degenerated or the skeleton is not valid. Nodes are (x,y,time) lists,
+#           time is the distance the edges moved until the node was reached. The first nodes are the corners of the ring.
+#           Faces are lists of node indices counterclockwise, the face of edge k from corner k to k+1 starts with k and k+1.
+def getSkeleton(ring):
+    num = len(ring)
+    if num<3:
+        return None
+
+    directions = []
+    normals = []
+    for k in range(0,num):
+        a = ring[k]
+        b = ring[(k+1) % num]
+        dx = b[0]-a[0]
+        dy = b[1]-a[1]
+        length = math.sqrt(dx*dx+dy*dy)
+        if length<EPSILON:
+            return None
+        directions.append((dx/length,dy/length))
+        normals.append((-dy/length,dx/length))
+
+    nodes = [[co[0],co[1],0.0] for co in ring]
+    arcs = set()
+
+    vertices = [WavefrontVertex(ring[k][0],ring[k][1],(k-1) % num,k,k) for k in range(0,num)]
+    for k in range(0,num):
+        vertices[k].prev = vertices[k-1]
+        vertices[k].next = vertices[(k+1) % num]
+        vertices[k].setVelocity(normals,directions)
+    active = list(vertices)
+
+    time = 0.0
+    for event in range(0,num*4+16):
+        active = [v for v in active if v.active]
+        if len(active)==0:
+            break
+        (dt,vertex,edge) = getNextEvent(active,normals,directions)
+        if vertex is None:
+            return None
+
+        time+=dt
+        for v in active:
+            v.x+=v.vx*dt
+            v.y+=v.vy*dt
+
+        if edge is None:
+            created = collapseEdge(vertex,nodes,arcs,time)
+        else:
+            created = splitRing(vertex,edge,nodes,arcs,time)
+        for v in created:
+            v.setVelocity(normals,directions)
+            active.append(v)
+            closeRing(v,nodes,arcs,time)
+    else:
+        return None
+
+    faces = getFaces(num,arcs)
+    if faces is None:
+        return None
+
+    # the faces cover the ring exactly once
+    area = getArea([nodes[k] for k in range(0,num)])
+    covered = 0.0
+    for face in faces:
+        face_area = getArea([nodes[i] for i in face])
+        if face_area<-EPSILON:
+            return None
+        covered+=face_area
+    if abs(covered-area)>1e-6*area+EPSILON:
+        return None
+
+    return (nodes,faces)
+
+# Returns the next event of the shrinking rings as (time until it happens, corner, edge).
+# The edge is None for an edge event, which collapses the edge following the corner, else it is the corner starting the edge the reflex corner hits.
+def getNextEvent(active,normals,directions):
+    best = (None,None,None)
+    for u in active:
+        v = u.next
+        (dx,dy) = directions[u.right]
+        length = dx*(v.x-u.x)+dy*(v.y-u.y)
+        rate = dx*(v.vx-u.vx)+dy*(v.vy-u.vy)
+        if rate<-EPSILON:
+            dt = max(length,0.0)/-rate
+            if best[0] is None or dt<best[0]:
+                best = (dt,u,None)
+
+    for v in active:
+        if not v.reflex:
+            continue
+        a = v.next
+        while a is not v.prev:
+            e = a.right
+            b = a.next
+            (nx,ny) = normals[e]
+            speed = 1.0-(nx*v.vx+ny*v.vy)
+            dist = nx*(v.x-a.x)+ny*(v.y-a.y)
+            if speed>EPSILON and dist>-EPSILON:
+                dt = max(dist,0.0)/speed
+                if best[0] is None or dt<best[0]-EPSILON:
+                    # the hit point has to lie on the edge as it is by then
+                    (dx,dy) = directions[e]
+                    px = v.x+v.vx*dt
+                    py = v.y+v.vy*dt
+                    start = dx*(px-a.x-a.vx*dt)+dy*(py-a.y-a.vy*dt)
+                    end = dx*(px-b.x-b.vx*dt)+dy*(py-b.y-b.vy*dt)
+                    if start>-EPSILON and end<EPSILON:
+                        best = (dt,v,a)
+            a = b
+    return best
+
+# Returns the index of the node at a location, which is added unless an earlier node is at the same location.
+def addNode(nodes,x,y,time):
+    for i in range(0,len(nodes)):
+        node = nodes[i]
+        if abs(node[0]-x)<1e-6 and abs(node[1]-y)<1e-6 and abs(node[2]-time)<1e-6:
+            return i
+    nodes.append([x,y,time])
+    return len(nodes)-1
+
+# Adds the trace of a corner from the node it started at to a node. The trace is a border of the faces of both edges of the corner.
+def addArc(arcs,vertex,node):
+    if vertex.node!=node:
+        arcs.add((min(vertex.node,node),max(vertex.node,node),vertex.left))
+        arcs.add((min(vertex.node,node),max(vertex.node,node),vertex.right))
+
+# Collapses the edge from a corner to the next one, their traces end in a new node and a corner continues from there.
+# Returns the new corners.
+def collapseEdge(u,nodes,arcs,time):
+    v = u.next
+    u.active = False
+    v.active = False
+    node = addNode(nodes,(u.x+v.x)/2,(u.y+v.y)/2,time)
+    addArc(arcs,u,node)
+    addArc(arcs,v,node)
+    w = WavefrontVertex(nodes[node][0],nodes[node][1],u.left,v.right,node)
+    w.prev = u.prev
+    w.next = v.next
+    u.prev.next = w
+    v.next.prev = w
+    return [w]
+
+# Splits the ring where a reflex corner hits the edge starting at a corner. Returns the corners of both new rings.
+def splitRing(v,a,nodes,arcs,time):
+    b = a.next
+    v.active = False
+    node = addNode(nodes,v.x,v.y,time)
+    addArc(arcs,v,node)
+
+    v1 = WavefrontVertex(nodes[node][0],nodes[node][1],v.left,a.right,node)
+    v1.prev = v.prev
+    v1.next = b
+    v.prev.next = v1
+    b.prev = v1
+
+    v2 = WavefrontVertex(nodes[node][0],nodes[node][1],a.right,v.right,node)
+    v2.prev = a
+    v2.next = v.next
+    a.next = v2
+    v.next.prev = v2
+    return [v1,v2]
+
+# Closes a ring which shrank to two corners or to a line. The traces end where the corners are, and the edges of the ring,
+# which lie on each other, are the ridges between the faces.
+def closeRing(v,nodes,arcs,time):
+    corners = [v]
+    corner = v.next
+    while corner is not v:
+        corners.append(corner)
+        corner = corner.next
+    if len(corners)>2 and abs(getArea([(c.x,c.y) for c in corners]))>1e-8:
+        return
+
+    for corner in corners:
+        corner.active = False
+        node = addNode(nodes,corner.x,corner.y,time)
+        addArc(arcs,corner,node)
+        corner.node = node
+    for corner in corners:
+        if corner.node!=corner.next.node:
+            arcs.add((min(corner.node,corner.next.node),max(corner.node,corner.next.node),corner.right))
+
+# Returns the faces of all edges by following the traces around each face, None if a face is not a single loop.
+def getFaces(num,arcs):
+    borders = [{} for k in range(0,num)]
+    for (a,b,face) in arcs:
+        borders[face].setdefault(a,[]).append(b)
+        borders[face].setdefault(b,[]).append(a)
+
+    faces = []
+    for k in range(0,num):
+        border = borders[k]
+        face = [k,(k+1) % num]
+        prev = k
+        current = (k+1) % num
+        while True:
+            following = [i for i in border.get(current,()) if i!=prev]
+            if len(following)!=1 or len(face)>len(border)+2:
+                return None
+            (prev,current) = (current,following[0])
+            if current==k:
+                break
+            face.append(current)
+        faces.append(face)
+    return faces
+
+# Returns the area of a ring in the xy plane, positive if it runs counterclockwise.
+def getArea(ring):
+    area = 0.0
+    for k in range(0,len(ring)):
+        a = ring[k-1]
+        b = ring[k]
+        area+=a[0]*b[1]-b[0]*a[1]
+    return area/2
+
+# Function: addGables
+# Turns hipped ends of a skeleton into gables by moving the top of a triangular face onto its edge, so the face becomes an upright wall.
+# Only tops which belong to the triangle and the faces of the neighbouring edges are moved, other faces would be distorted.
+#
+# Parameters:
+#   list nodes - Nodes of <getSkeleton>, they are moved.
+#   list faces - Faces of <getSkeleton>.
+#
+# Returns:
+#   list - Indices of the edges whose faces became gables.
+def addGables(nodes,faces):
+    num = len(faces)
+    owners = {}
+    for k in range(0,num):
+        for i in faces[k]:
+            owners.setdefault(i,set()).add(k)
+
+    gables = []
+    for k in range(0,num):
+        if len(faces[k])!=3:
+            continue
+        (s,t,top) = faces[k]
+        if owners[top]!=set((k,(k-1) % num,(k+1) % num)):
+            continue
+        if len(faces[(k-1) % num])==3 or len(faces[(k+1) % num])==3:
+            continue
+
+        dx = nodes[t][0]-nodes[s][0]
+        dy = nodes[t][1]-nodes[s][1]
+        length = math.sqrt(dx*dx+dy*dy)
+        along = (dx*(nodes[top][0]-nodes[s][0])+dy*(nodes[top][1]-nodes[s][1]))/length
+        if along<=EPSILON or along>=length-EPSILON:
+            continue
+        nodes[top][0] = nodes[s][0]+dx/length*along
+        nodes[top][1] = nodes[s][1]+dy/length*along
+        gables.append(k)
+    return gables
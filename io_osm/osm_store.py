@@ -0,0 +1,203 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+# NumPy is not shipped with every Blender build, lookups fall back to bisect without it
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+NAN = float('nan')
+
+# Function: toIds
+# Returns the node references of an element as an array of 64 bit integers. Parsers may already hand them out as such an array.
+def toIds(refs):
+    if isinstance(refs,array) and refs.typecode=='q':
+        return refs
+    return array('q',[int(ref) for ref in refs])
+
+# Function: sortedIds
+# Returns the distinct ids of an iterable as a sorted array, for use with <containsId>.
+def sortedIds(ids):
+    return array('q',sorted(set(ids)))
+
+# Function: containsId
+# Returns True if a sorted array of ids contains an id.
+def containsId(ids,id):
+    i = bisect_left(ids,id)
+    return i<len(ids) and ids[i]==id
+
+# Class: NodeStore
+# Columnar storage of all nodes. Ids, geographic and projected coordinates are kept in flat arrays, ways refer to nodes by their index.
+# Node ids are 64 bit integers, references are resolved by a binary search over the sorted ids.
+# Only the few nodes that need it get a Node object.
+class NodeStore():
+    # Constructor: __init__
+    def __init__(self):
+        self.ids = array('q')
+        self.lat = array('d')
+        self.lon = array('d')
+        self.ele = array('d')
+        self.x = array('d')
+        self.y = array('d')
+        self.z = array('d')
+        self.projected = 0
+        self.unprojected = 0
+        # OSM files list nodes ordered by id, then the ids are their own sorted index
+        self.ordered = True
+        self.sorted_ids = None
+        self.order = None
+        self.indexed = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Method: add
+    # Adds a node to the store.
+    #
+    # Parameters:
+    #   int id - OSM id of the node.
+    #   float lat - Latitude.
+    #   float lon - Longitude.
+    #   float ele - Elevation.
+    #   tuple co - Projected x/y coordinates, if the parser already projected the node.
+    #
+    # Returns:
+    #   int - Index of the node in the store.
+    def add(self,id,lat,lon,ele = 0.0,co = None):
+        index = len(self.ids)
+        if index>0 and id<=self.ids[-1]:
+            self.ordered = False
+        self.ids.append(id)
+        self.lat.append(lat)
+        self.lon.append(lon)
+        self.ele.append(ele)
+        self.z.append(ele)
+        if co:
+            self.x.append(co[0])
+            self.y.append(co[1])
+        else:
+            self.x.append(NAN)
+            self.y.append(NAN)
+            self.unprojected+=1
+        return index
+
+    # Method: project
+    # Projects all nodes added since the last call in one batch, nodes projected by the parser are kept.
+    #
+    # Parameters:
+    #   projection - Projection from <osm_projection>.
+    #   tuple origin - Projected coordinates the node coordinates are relative to.
+    def project(self,projection,origin):
+        start = self.projected
+        end = len(self.ids)
+        if self.unprojected>0:
+            (x,y) = projection.project(self.lat[start:end],self.lon[start:end],origin)
+            if self.unprojected==end-start:
+                self.x[start:end] = x
+                self.y[start:end] = y
+            else:
+                for i in range(start,end):
+                    if self.x[i]!=self.x[i]: # NaN
+                        self.x[i] = x[i-start]
+                        self.y[i] = y[i-start]
+        self.projected = end
+        self.unprojected = 0
+
+    # Method: sort
+    # Builds the sorted index of the node ids. Called by <lookup> when nodes have been added since the index was built.
+    # Only the nodes added since are sorted, they are merged into the existing index by copying the runs in between.
+    def sort(self):
+        ids = self.ids
+        if self.ordered:
+            self.sorted_ids = ids
+            self.order = None
+        else:
+            start = self.indexed if self.sorted_ids is not None else 0
+            old_ids = self.sorted_ids[0:start] if start>0 else array('q')
+            if self.order is None:
+                # the ids were ordered when the index was built
+                old_order = array('i',range(0,start))
+            else:
+                old_order = self.order
+            sorted_ids = array('q')
+            order = array('i')
+            prev = 0
+            for i in sorted(range(start,len(ids)),key=ids.__getitem__):
+                # nodes with the same id keep the order they were added in
+                pos = bisect_right(old_ids,ids[i],prev)
+                sorted_ids+=old_ids[prev:pos]
+                order+=old_order[prev:pos]
+                sorted_ids.append(ids[i])
+                order.append(i)
+                prev = pos
+            sorted_ids+=old_ids[prev:]
+            order+=old_order[prev:]
+            self.sorted_ids = sorted_ids
+            self.order = order
+        self.indexed = len(ids)
+
+    # Method: lookup
+    # Resolves node ids to store indices. With NumPy all ids are looked up in one vectorized binary search.
+    #
+    # Parameters:
+    #   array ids - Node ids as 64 bit integers.
+    #
+    # Returns:
+    #   tuple - Array of the indices of the nodes found and list of the ids not found.
+    def lookup(self,ids):
+        if self.sorted_ids is None or self.indexed!=len(self.ids):
+            self.sort()
+        if len(ids)==0 or len(self.sorted_ids)==0:
+            return (array('i'),list(ids))
+
+        if numpy is not None:
+            # the views have to be released before returning, arrays can not grow while a buffer is exported
+            sorted_ids = numpy.frombuffer(self.sorted_ids,dtype=numpy.int64)
+            refs = numpy.frombuffer(ids,dtype=numpy.int64)
+            pos = numpy.minimum(numpy.searchsorted(sorted_ids,refs),len(sorted_ids)-1)
+            found = sorted_ids[pos]==refs
+            pos = pos[found]
+            if self.order is not None:
+                pos = numpy.frombuffer(self.order,dtype=numpy.int32)[pos]
+            indices = array('i',pos.astype(numpy.int32).tobytes())
+            missing = refs[~found].tolist()
+            del sorted_ids, refs, pos, found
+            return (indices,missing)
+
+        sorted_ids = self.sorted_ids
+        order = self.order
+        num = len(sorted_ids)
+        indices = array('i')
+        missing = []
+        for id in ids:
+            i = bisect_left(sorted_ids,id)
+            if i<num and sorted_ids[i]==id:
+                indices.append(i if order is None else order[i])
+            else:
+                missing.append(id)
+        return (indices,missing)
+
+    # Method: getIndex
+    # Returns the index of a node by its OSM id or None if the node is not in the store.
+    def getIndex(self,id):
+        (indices,missing) = self.lookup(array('q',[id]))
+        if len(indices)>0:
+            return indices[0]
+        return None
+
+    # Method: getCo
+    # Returns the projected coordinates of a node.
+    def getCo(self,index):
+        return (self.x[index],self.y[index],self.z[index])
+
+    # Method: getCoords
+    # Returns the projected coordinates of several nodes.
+    #
+    # Parameters:
+    #   list indices - Indices of the nodes.
+    def getCoords(self,indices):
+        x = self.x
+        y = self.y
+        z = self.z
+        return [(x[i],y[i],z[i]) for i in indices]
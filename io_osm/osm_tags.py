@@ -0,0 +1,88 @@
+from array import array
+
+# Class: TagDictionary
+# Interns tag keys and values, so each distinct string is stored once for the whole import.
+# The tags of an element are kept as a flat array of key and value ids: key, value, key, value, ...
+class TagDictionary():
+    # Constructor: __init__
+    def __init__(self):
+        self.strings = []
+        self.ids = {}
+
+    def __len__(self):
+        return len(self.strings)
+
+    # Method: intern
+    # Returns the id of a string, adding it to the dictionary if needed.
+    def intern(self,string):
+        id = self.ids.get(string)
+        if id is None:
+            id = len(self.strings)
+            self.ids[string] = id
+            self.strings.append(string)
+        return id
+
+    # Method: getString
+    # Returns the string of an id.
+    def getString(self,id):
+        return self.strings[id]
+
+    # Method: pack
+    # Interns the tags of an element.
+    #
+    # Parameters:
+    #   list tags - (key,value) tuples as read by the parser. If a key is repeated the last value wins.
+    #
+    # Returns:
+    #   array - Key and value ids.
+    def pack(self,tags):
+        pairs = array('i')
+        for (name,value) in tags:
+            key = self.intern(name)
+            value = self.intern(value)
+            for i in range(0,len(pairs),2):
+                if pairs[i]==key:
+                    pairs[i+1] = value
+                    break
+            else:
+                pairs.append(key)
+                pairs.append(value)
+        return pairs
+
+    # Method: get
+    # Returns the value of a tag.
+    #
+    # Parameters:
+    #   array pairs - Tags of an element as returned by <pack>.
+    #   string name - Key of the tag.
+    #   default - Returned if the element has no such tag.
+    def get(self,pairs,name,default = None):
+        key = self.ids.get(name)
+        if key is not None:
+            for i in range(0,len(pairs),2):
+                if pairs[i]==key:
+                    return self.strings[pairs[i+1]]
+        return default
+
+    # Method: has
+    # Returns True if an element has a tag.
+    def has(self,pairs,name):
+        key = self.ids.get(name)
+        if key is not None:
+            for i in range(0,len(pairs),2):
+                if pairs[i]==key:
+                    return True
+        return False
+
+    # Method: items
+    # Generator over the (key,value) strings of an element's tags.
+    def items(self,pairs):
+        strings = self.strings
+        for i in range(0,len(pairs),2):
+            yield (strings[pairs[i]],strings[pairs[i+1]])
+
+    # Method: idItems
+    # Generator over the (key,value) ids of an element's tags.
+    def idItems(self,pairs):
+        for i in range(0,len(pairs),2):
+            yield (pairs[i],pairs[i+1])
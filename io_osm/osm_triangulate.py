@@ -0,0 +1,223 @@
+from array import array
+
+# Function: triangulate
+# Triangulates many polygons with holes in one call by ear clipping. Holes are joined to the outer ring by bridges
+# to visible corners, which makes every polygon a single ring, see <bridgeHole>.
+#
+# Parameters:
+#   list polygons - Polygons as lists of rings, the outer ring first and its inner rings (holes) after it.
+#                   Rings are (x,y) or (x,y,z) sequences without repeating the first corner, z is ignored.
+#
+# Returns:
+#   tuple - The triangles and the offsets. Triangles are an array of corner indices, three per triangle, counterclockwise seen from above.
+#           Corners are numbered through all rings of all polygons in the given order, so the triangles index the vertices of all polygons.
+#           Offsets are an array of the first triangle of every polygon and the total number of triangles at the end.
+def triangulate(polygons):
+    triangles = array('i')
+    offsets = array('i',[0])
+    base = 0
+    for rings in polygons:
+        triangulatePolygon(rings,base,triangles)
+        base+=sum([len(ring) for ring in rings])
+        offsets.append(len(triangles)//3)
+    return (triangles,offsets)
+
+# Function: triangulatePolygon
+# Triangulates a polygon with holes and appends its triangles, see <triangulate>.
+#
+# Parameters:
+#   list rings - The outer ring and the inner rings.
+#   int base - Index of the first corner of the polygon.
+#   array triangles - The triangles are appended to it.
+def triangulatePolygon(rings,base,triangles):
+    xs = []
+    ys = []
+    for ring in rings:
+        for co in ring:
+            xs.append(co[0])
+            ys.append(co[1])
+
+    outer = list(range(0,len(rings[0])))
+    if len(outer)<3:
+        return
+    if getSignedArea(outer,xs,ys)<0:
+        outer.reverse()
+
+    # most footprints are convex without holes, they are fanned
+    if len(rings)==1 and isConvex(outer,xs,ys):
+        first = outer[0]+base
+        for k in range(1,len(outer)-1):
+            triangles.extend((first,outer[k]+base,outer[k+1]+base))
+        return
+
+    # holes run clockwise, the hole with the rightmost corner is bridged first, so later bridges do not cross it
+    holes = []
+    start = len(outer)
+    for ring in rings[1:]:
+        hole = list(range(start,start+len(ring)))
+        start+=len(ring)
+        if len(hole)<3:
+            continue
+        if getSignedArea(hole,xs,ys)>0:
+            hole.reverse()
+        holes.append(hole)
+    holes.sort(key=lambda hole: max([xs[i] for i in hole]),reverse=True)
+
+    polygon = outer
+    for hole in holes:
+        polygon = bridgeHole(polygon,hole,xs,ys)
+
+    clipEars(polygon,xs,ys,base,triangles)
+
+# Returns twice the signed area of a ring, positive if it runs counterclockwise.
+def getSignedArea(ring,xs,ys):
+    area = 0.0
+    for k in range(0,len(ring)):
+        a = ring[k-1]
+        b = ring[k]
+        area+=xs[a]*ys[b]-xs[b]*ys[a]
+    return area
+
+# Returns True if no corner of a counterclockwise ring turns clockwise.
+def isConvex(ring,xs,ys):
+    num = len(ring)
+    for k in range(0,num):
+        if getCross(ring[k-1],ring[k],ring[(k+1) % num],xs,ys)<0:
+            return False
+    return True
+
+# Returns the z component of the cross product of a->b and b->c, positive if the corner b turns counterclockwise.
+def getCross(a,b,c,xs,ys):
+    return (xs[b]-xs[a])*(ys[c]-ys[b])-(ys[b]-ys[a])*(xs[c]-xs[b])
+
+def isInTriangle(px,py,ax,ay,bx,by,cx,cy):
+    d1 = (px-bx)*(ay-by)-(ax-bx)*(py-by)
+    d2 = (px-cx)*(by-cy)-(bx-cx)*(py-cy)
+    d3 = (px-ax)*(cy-ay)-(cx-ax)*(py-ay)
+    return not ((d1<0 or d2<0 or d3<0) and (d1>0 or d2>0 or d3>0))
+
+# Function: bridgeHole
+# Joins a clockwise hole to a counterclockwise ring. A ray from the rightmost corner of the hole along x hits an edge of the ring,
+# the corner of the ring visible from the hole is found near that edge. The ring then runs to that corner, around the hole and back.
+#
+# Returns:
+#   list - The joined ring, the corners of the bridge appear twice.
+def bridgeHole(polygon,hole,xs,ys):
+    m = max(range(0,len(hole)),key=lambda k: (xs[hole[k]],-ys[hole[k]]))
+    mx = xs[hole[m]]
+    my = ys[hole[m]]
+    num = len(polygon)
+
+    # nearest edge of the ring right of the corner
+    hit = None
+    hit_x = None
+    for k in range(0,num):
+        a = polygon[k]
+        b = polygon[(k+1) % num]
+        if ys[a]==ys[b] or my<min(ys[a],ys[b]) or my>max(ys[a],ys[b]):
+            continue
+        x = xs[a]+(my-ys[a])*(xs[b]-xs[a])/(ys[b]-ys[a])
+        if x>=mx and (hit_x is None or x<hit_x):
+            hit = k
+            hit_x = x
+    if hit is None:
+        # the hole is not inside the ring
+        return polygon
+
+    # the end of the edge farther right is visible unless a reflex corner lies in the triangle of the corner, the hit and that end
+    if xs[polygon[hit]]>xs[polygon[(hit+1) % num]]:
+        p = hit
+    else:
+        p = (hit+1) % num
+    px = xs[polygon[p]]
+    py = ys[polygon[p]]
+    if hit_x!=px or my!=py:
+        best = None
+        for k in range(0,num):
+            v = polygon[k]
+            vx = xs[v]
+            vy = ys[v]
+            if k==p or vx<mx or (vx==mx and vy==my):
+                continue
+            if not isInTriangle(vx,vy,mx,my,hit_x,my,px,py):
+                continue
+            if getCross(polygon[k-1],v,polygon[(k+1) % num],xs,ys)>=0:
+                continue
+            # the corner with the smallest angle to the ray is visible
+            tan = abs(vy-my)/(vx-mx) if vx>mx else float('inf')
+            if best is None or tan<best[0] or tan==best[0] and vx<xs[polygon[best[1]]]:
+                best = (tan,k)
+        if best:
+            p = best[1]
+
+    # corners of earlier bridges appear twice, the bridge starts at the one whose corner opens towards the hole
+    v = polygon[p]
+    for k in range(0,num):
+        if xs[polygon[k]]==xs[v] and ys[polygon[k]]==ys[v] and isInSector(polygon[k-1],polygon[k],polygon[(k+1) % num],mx,my,xs,ys):
+            p = k
+            break
+
+    return polygon[:p+1]+hole[m:]+hole[:m+1]+polygon[p:]
+
+# Returns True if a point lies within the inner angle of the corner b of a counterclockwise ring.
+def isInSector(a,b,c,px,py,xs,ys):
+    left_in = (xs[b]-xs[a])*(py-ys[a])-(ys[b]-ys[a])*(px-xs[a])>=0
+    left_out = (xs[c]-xs[b])*(py-ys[b])-(ys[c]-ys[b])*(px-xs[b])>=0
+    if getCross(a,b,c,xs,ys)>=0:
+        return left_in and left_out
+    return left_in or left_out
+
+# Function: clipEars
+# Triangulates a counterclockwise ring by cutting off one ear after the other, a convex corner whose triangle contains no other corner.
+# Rings without ears, which are degenerated or self-intersecting, are cut where the search ends.
+#
+# Parameters:
+#   list polygon - Indices of the corners.
+#   list xs - x coordinates by index.
+#   list ys - y coordinates by index.
+#   int base - Added to the indices of the triangles.
+#   array triangles - The triangles are appended to it.
+def clipEars(polygon,xs,ys,base,triangles):
+    num = len(polygon)
+    prev = [k-1 for k in range(0,num)]
+    prev[0] = num-1
+    next = [k+1 for k in range(0,num)]
+    next[num-1] = 0
+
+    remaining = num
+    k = 0
+    attempts = 0
+    while remaining>3:
+        a = prev[k]
+        c = next[k]
+        if attempts>remaining or isEar(polygon,prev,next,a,k,c,xs,ys):
+            triangles.extend((polygon[a]+base,polygon[k]+base,polygon[c]+base))
+            next[a] = c
+            prev[c] = a
+            remaining-=1
+            attempts = 0
+        else:
+            attempts+=1
+        k = c
+
+    a = prev[k]
+    c = next[k]
+    triangles.extend((polygon[a]+base,polygon[k]+base,polygon[c]+base))
+
+def isEar(polygon,prev,next,a,k,c,xs,ys):
+    (ia,ik,ic) = (polygon[a],polygon[k],polygon[c])
+    if getCross(ia,ik,ic,xs,ys)<=0:
+        return False
+
+    (ax,ay,kx,ky,cx,cy) = (xs[ia],ys[ia],xs[ik],ys[ik],xs[ic],ys[ic])
+    j = next[c]
+    while j!=a:
+        v = polygon[j]
+        vx = xs[v]
+        vy = ys[v]
+        # corners of bridges appear twice, they do not block the ear at their other appearance
+        if not (vx==ax and vy==ay or vx==kx and vy==ky or vx==cx and vy==cy):
+            if isInTriangle(vx,vy,ax,ay,kx,ky,cx,cy) and getCross(polygon[prev[j]],v,polygon[next[j]],xs,ys)<=0:
+                return False
+        j = next[j]
+    return True
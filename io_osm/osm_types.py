@@ -1,10 +1,19 @@
 import bpy
 import math
-from collections import OrderedDict
-import mathutils
+import hashlib
+import bisect
+from array import array
+from collections import OrderedDict, deque
 from mathutils import geometry
 from mathutils import Vector
 from io_osm.import_osm import *
+from io_osm import osm_projection
+from io_osm.osm_projection import EQUATOR_RADIUS, POLE_RADIUS
+from io_osm.osm_store import NodeStore, toIds, sortedIds, containsId
+from io_osm.osm_tags import TagDictionary
+from io_osm.osm_mesh import MeshData
+from io_osm import osm_geometry
+from io_osm import osm_parallel
 
 AEROWAY_TAG = 'aeroway' # TODO: add way support
 UNIT_SCALES = {'m':1,'ft':0.305}
@@ -12,12 +21,63 @@ LAYERS = ['building','barrier','object','area','road']
 
 ROADS_SORT_ORDER = [None,'cycleway','railway']
 
-EQUATOR_RADIUS = 6378137.0      # greatest earth radius (equator)
-POLE_RADIUS = 6356752.314245    # smallest earth radius (pole)
+TYPES = ('building','area','trafficway','barrier','object')
+
+# name of the group holding the objects of a tile
+TILE_GROUP = 'OSM tile %d_%d'
+
+# bounds of ways without geometry, shared as they are never modified
+NO_BOUNDS = (Vector((0.0,0.0)),Vector((0.0,0.0)))
+
+# settings of the OSM material properties geometry is built from, see <OSM.getMaterialFingerprint>
+MATERIAL_SETTINGS = ('base_type','building_part','building_levels','building_level_height','building_default_levels','trafficway_sort','lanes','lane_width','barrier_width','roof_shape')
+
+# Returns a fingerprint of the coordinates and the tags of an element, so rebuilds can tell if it changed.
+# The OSM version is not enough, a way keeps its version when its nodes are moved.
+# Settings are the scene settings the geometry depends on as well, see <OSM.getSettingsFingerprint>.
+def getFingerprint(coords,tags,settings = ''):
+    fingerprint = hashlib.md5(settings.encode('utf-8'))
+    fingerprint.update(coords.tobytes())
+    for (name,value) in sorted(tags):
+        fingerprint.update(('%s=%s\n' % (name,value)).encode('utf-8'))
+    return fingerprint.hexdigest()
+
+# Returns the angle of the wall from a corner of a footprint to the next one.
+def getWallAngle(coords,start):
+    a = coords[start]
+    b = coords[(start+1) % len(coords)]
+    return math.atan2(b[1]-a[1],b[0]-a[0])
+
+# Returns the corners of a footprint rotated around the origin, beginning with the corner at start.
+def rotateCoords(coords,start,angle):
+    c = math.cos(angle)
+    s = math.sin(angle)
+    num = len(coords)
+    rotated = []
+    for i in range(0,num):
+        co = coords[(start+i) % num]
+        rotated.append((co[0]*c-co[1]*s,co[0]*s+co[1]*c))
+    return rotated
+
+# Returns the part of an object merged by material a face belongs to, see <OSM.mergeWays>.
+# The part holds the id, name and tags of the way the face was built from, None is returned for objects that are not merged.
+def getPart(object,face):
+    parts = object.osm.parts
+    i = bisect.bisect_right([part.face for part in parts],face)-1
+    if i<0:
+        return None
+    return parts[i]
 
 class OSM():
-    xml = None
+    parser = None
+    store = None
+    tags = None
+    projection = None
+    origin = (0.0,0.0)
     nodes = {}
+    shared_ways = None
+    missing_refs = 0
+    missing_ids = None
     ways = {'area':[],'building':[],'trafficway':[],'barrier':[],'by_id':{},'sorted':[]}
     relations = {}
     bounds = (Vector((0.0,0.0)),Vector((0.0,0.0)))
@@ -30,16 +90,52 @@ class OSM():
     ground = None
     camera = None
     offset = 0.0
+    base_offset = 0.0
     scene = None
     temp_scene = None
-    config_tags = {}
+    config_tags = None
+    config_tag_ids = None
+    material_fingerprints = None
+    settings_fingerprint = ''
+    skipped = 0
 
     # config
     right_hand_traffic = True
     offset_step = 0.01
     file = None
-
-    def __init__(self,xml):
+    two_pass = False
+    merge_meshes = False
+    share_meshes = True
+    workers = 1
+    projection_type = 'mercator'
+    clip = None
+    tile = None
+    tile_size = 0.0
+    types = set(TYPES)
+    tag_counts = None
+
+    # updates regenerate the ways within this many meters of a change, searched in cells of this size
+    update_margin = 25.0
+    update_cell_size = 100.0
+
+    # corners of buildings sharing a mesh may differ by this many meters
+    share_tolerance = 0.05
+    shared_meshes = None
+
+    # ways are sent to the worker processes in batches of this size, see <createWaysParallel>
+    build_batch = 64
+
+    def __init__(self,parser,tile = None):
+        self.store = NodeStore()
+        self.shared_ways = None
+        self.missing_refs = 0
+        self.missing_ids = []
+        self.tags = TagDictionary()
+        self.config_tags = {}
+        self.config_tag_ids = {}
+        self.material_fingerprints = {}
+        self.shared_meshes = None
+        self.skipped = 0
         self.nodes = {}
         self.ways = {'area':[],'building':[],'trafficway':[],'barrier':[],'by_id':{},'sorted':[]}
         self.relations = {}
@@ -53,25 +149,39 @@ class OSM():
         self.ground = None
         self.camera = None
         self.offset = 0.0
+        self.base_offset = 0.0
         self.scene = None
         self.temp_scene = None
         
         self.setConfig()
         self.setConfigTags()
 
-        self.xml = xml
-        self.version = xml.attributes['version'].value
-        self.generator = xml.attributes['generator'].value
-        _bounds = xml.getElementsByTagName('bounds').item(0)
+        # a tile replaces clipping, its extent is given by the grid instead
+        if tile is not None and self.tile_size>0:
+            self.tile = (int(tile[0]),int(tile[1]))
+            self.clip = None
+        else:
+            self.tile = None
+
+        self.parser = parser
+        parser.readHeader()
+        self.version = parser.attributes.get('version','')
+        self.generator = parser.attributes.get('generator','')
+        _bounds = parser.bounds
+
+        # the local tangent plane touches the center of the file bounds, all coordinates are relative to the minimum bounds
+        center = ((float(_bounds['minlat'])+float(_bounds['maxlat']))/2,(float(_bounds['minlon'])+float(_bounds['maxlon']))/2)
+        self.projection = osm_projection.getProjection(self.projection_type,center[0],center[1])
+        self.origin = self.projection.projectPoint(float(_bounds['minlat']),float(_bounds['minlon']))
 
-        latLon = (float(_bounds.attributes['minlat'].value),float(_bounds.attributes['minlon'].value))
+        latLon = (float(_bounds['minlat']),float(_bounds['minlon']))
         co = self.getCoordinates(latLon,False)
         self.bounds[0][0] = co[0]
         self.bounds[0][1] = co[1]
         self.geo_bounds[0][0] = latLon[0]
         self.geo_bounds[0][1] = latLon[1]
 
-        latLon = (float(_bounds.attributes['maxlat'].value),float(_bounds.attributes['maxlon'].value))
+        latLon = (float(_bounds['maxlat']),float(_bounds['maxlon']))
         co = self.getCoordinates(latLon,False)
         self.bounds[1][0] = co[0]
         self.bounds[1][1] = co[1]
@@ -80,6 +190,14 @@ class OSM():
 
         self.dimensions[0] = self.bounds[1][0]-self.bounds[0][0]
         self.dimensions[1] = self.bounds[1][1]-self.bounds[0][1]
+
+        self.settings_fingerprint = self.getSettingsFingerprint(center)
+
+        # the projection origin stays at the bounds of the file, so clipped imports line up with each other
+        if self.clip:
+            for i in range(0,2):
+                self.geo_bounds[0][i] = self.clip[0][i]
+                self.geo_bounds[1][i] = self.clip[1][i]
         
     def setConfig(self):
         osm = bpy.context.scene.osm
@@ -90,6 +208,19 @@ class OSM():
             
         self.offset_step = osm.offset_step
         self.file = osm.file
+        self.two_pass = osm.two_pass
+        self.merge_meshes = osm.merge_meshes
+        # merged meshes are built from the meshes of the ways, so every way needs its own
+        self.share_meshes = osm.share_meshes and not osm.merge_meshes
+        self.workers = osm_parallel.getWorkers(osm.workers)
+        self.tile_size = osm.tile_size
+        self.projection_type = osm.projection
+        self.types = set(osm.import_types)
+
+        if osm.clip!='none':
+            self.clip = ((min(osm.clip_lat),min(osm.clip_lon)),(max(osm.clip_lat),max(osm.clip_lon)))
+        else:
+            self.clip = None
 
     def setConfigTags(self):
         for material in bpy.data.materials:
@@ -115,7 +246,78 @@ class OSM():
 
                 if group not in tag_config.groups:
                     tag_config.groups.append(group)
-                    
+
+        self.compileConfigTags()
+
+    # Collects the tag keys and key/value pairs any material or group is configured for,
+    # so elements that can not match anything are rejected before objects are created for them.
+    def compileConfigTags(self):
+        self.material_keys = set()
+        self.material_pairs = set()
+        self.group_keys = set()
+        self.group_pairs = set()
+
+        for config_name in self.config_tags:
+            tag_config = self.config_tags[config_name]
+            if len(tag_config.materials)>0:
+                if tag_config.value=='':
+                    self.material_keys.add(tag_config.name)
+                else:
+                    self.material_pairs.add((tag_config.name,tag_config.value))
+            if len(tag_config.groups)>0:
+                if tag_config.value=='':
+                    self.group_keys.add(tag_config.name)
+                else:
+                    self.group_pairs.add((tag_config.name,tag_config.value))
+
+    # Returns True if the tags of a way element can resolve to a material of a type that is imported.
+    def acceptWay(self,element):
+        closed = len(element.refs)>1 and element.refs[0]==element.refs[-1]
+        for (name,value) in element.tags:
+            if name in self.material_keys or (name,value) in self.material_pairs:
+                for tag_config in self.getTagConfig(name,value):
+                    for material in tag_config.materials:
+                        if self.getWayType(material.osm.base_type,closed) in self.types:
+                            return True
+        return False
+
+    # Returns True if the tags of a node element can match a group and objects are imported.
+    def acceptNode(self,element):
+        if 'object' not in self.types:
+            return False
+        for (name,value) in element.tags:
+            if name in self.group_keys or (name,value) in self.group_pairs:
+                return True
+        return False
+
+    def getWayType(self,base_type,closed):
+        if base_type in ('building','area') and closed==False:
+            return 'trafficway'
+        if base_type=='trafficway' and closed:
+            return 'area'
+        return base_type
+
+    # Counts the tags of nodes and ways for the tag list, if one is requested.
+    # Counts are kept by interned ids, the strings are only built by <getTagCounts>.
+    def countTags(self,element):
+        if self.tag_counts is None or element.name not in ('node','way'):
+            return
+        type = element.name
+        intern = self.tags.intern
+        for (name,value) in element.tags:
+            v = (type,intern(name),intern(value))
+            if v not in self.tag_counts:
+                self.tag_counts[v] = 1
+            else:
+                self.tag_counts[v]+=1
+
+    # Returns the counted tags as lines of the tag list and their counts.
+    def getTagCounts(self):
+        counts = OrderedDict()
+        if self.tag_counts:
+            for (type,name,value) in self.tag_counts:
+                counts[type.upper()+':\t'+self.tags.getString(name)+' = '+self.tags.getString(value)] = self.tag_counts[(type,name,value)]
+        return counts
 
     def getTagConfig(self,name,value):
         full_name = name+'='+value
@@ -127,6 +329,104 @@ class OSM():
             config.append(self.config_tags[undefined_name])
         return config
 
+    # Returns the tag configs of an interned key and value, the lookups are cached per pair.
+    def getTagConfigByIds(self,name,value):
+        pair = (name,value)
+        if pair not in self.config_tag_ids:
+            self.config_tag_ids[pair] = self.getTagConfig(self.tags.getString(name),self.tags.getString(value))
+        return self.config_tag_ids[pair]
+
+    def getMaterials(self,tags):
+        materials = []
+        mat = None
+        roof_mat = None
+        basement_mat = None
+
+        lanes = int(self.tags.get(tags,'lanes',1))
+
+        priority = -1
+        roof_priority = -1
+        basement_priority = -1
+
+#        name = self.name+'_'+self.id
+#        if 'name' in tags:
+#            name = tags['name'].value
+#        print('\n%s: setting Materials...' % name)
+
+        for (name,value) in self.tags.idItems(tags):
+            tag_configs = self.getTagConfigByIds(name,value)
+            if len(tag_configs)>0:
+                for tag_config in tag_configs:
+                    for material in tag_config.materials:
+                        has_priority = False
+                        mat_tag = tag_config.getTagInList(material.osm.tags)
+                        tag_priority = mat_tag.priority
+
+#                        print('Tag: %s = %s - Prio: %d' %(mat_tag.name,mat_tag.value,tag_priority))
+
+                        # We have to check individual building parts as they need different priorities
+                        if material.osm.base_type=='building':
+                            if material.osm.building_part=='facade':
+                                has_priority = priority<=tag_priority
+                                if has_priority:
+                                    priority = tag_priority
+                            elif material.osm.building_part in ('sloped_roof','flat_roof'):
+                                has_priority = roof_priority<=tag_priority
+                                if has_priority:
+                                    roof_priority = tag_priority
+                            elif material.osm.building_part=='basement':
+                                has_priority = basement_priority<=tag_priority
+                                if has_priority:
+                                    basement_priority = tag_priority
+                        else:
+                            has_priority = priority<=tag_priority
+                            if has_priority:
+                                    priority = tag_priority
+
+                        if has_priority:
+                            # check if we have mandatory tags
+                            mandatory = getMandatoryTags(material)
+                            found = 0
+                            for i in range(0,len(mandatory)):
+                                mandatory_value = self.tags.get(tags,mandatory[i].name)
+                                if mandatory_value is not None:
+                                    if mandatory[i].value=='' or mandatory_value==mandatory[i].value:
+                                        found+=1
+
+#                            if len(mandatory)>0:
+#                                print('Material %s: has mandatory tags' % material.name)
+#                                if found==len(mandatory):
+#                                    print('all mandatory tags present')
+
+                            if len(mandatory)==0 or found==len(mandatory):
+#                                print('Material type: %s' % material.osm.base_type)
+
+                                if material.osm.base_type == 'building':
+#                                    print('Building part: %s' % material.osm.building_part)
+                                    if material.osm.building_part=='facade':
+                                        mat = material
+                                    elif material.osm.building_part in ('flat_roof','sloped_roof'):
+                                        roof_mat = material
+                                    elif material.osm.building_part=='basement':
+                                        basement_mat = material
+                                if material.osm.base_type == 'trafficway':
+                                    # prefer materials with matching lanes
+                                    if mat==None or mat.osm.lanes!=lanes:
+                                        mat = material
+                                if material.osm.base_type == 'area':
+                                    mat = material
+
+        if mat:
+            materials.append(mat)
+#            print('Base material: %s' % mat.name)
+        if roof_mat:
+            materials.append(roof_mat)
+#            print('Roof material: %s' % roof_mat.name)
+        if basement_mat:
+            materials.append(basement_mat)
+
+        return materials
+
     def generate(self,rebuild):
         self.scene = bpy.context.scene
 
@@ -140,28 +440,35 @@ class OSM():
 #        self.temp_scene = bpy.data.scenes.new("OSM_import")
         #bpy.context.scene.background_set = self.temp_scene
 
-        self.nodes = self.getNodes(self.xml)
-        self.ways = self.getWays(self.xml)
+        self.parse()
 
         deselectObjects(self.scene)
 
         #self.createGround()
         #self.createCamera()
 
+        merged = []
         if rebuild:
-            self.process_step = 100/len(self.scene.objects)
+            self.process_step = 100/max(1,len(self.scene.objects))
             self.createFromExisting()
+            merged = self.createMergedFromExisting()
         else:
-            self.process_step = 100/(len(self.ways['by_id'])+len(self.nodes))
+            # tiles may be empty
+            self.process_step = 100/max(1,len(self.ways['by_id'])+len(self.nodes))
             # generate all node objects
             self.createObjects(rebuild)
 
             # generate all ways
             self.createWays(rebuild)
+            if self.merge_meshes:
+                merged = [self.ways['by_id'][id] for id in self.ways['by_id']]
 
         self.sortAreas()
         self.sortTrafficways()
 
+        # z-offsets are part of the merged meshes, so ways are merged after sorting
+        self.mergeWays(merged)
+
         # set to layers
         if rebuild==False:
             for i in range(0,len(LAYERS)):
@@ -173,6 +480,8 @@ class OSM():
 
             self.linkObjects(self.nodes)
             self.linkObjects(self.ways['by_id'])
+            if self.tile:
+                self.groupObjects()
             updateScene(self.scene)
 
             if debug:
@@ -186,20 +495,487 @@ class OSM():
         for id in dict:
             if (dict[id].object): self.scene.objects.link(dict[id].object)
 
+    # Rebuilds the OSM objects in the scene. Objects whose element and materials did not change are kept as they are.
+    # Changed ways may have a different number of nodes, so their objects are replaced instead of rebuilt in place.
+    # Objects imported before fingerprints were stored are rebuilt in place.
     def createFromExisting(self):
-        for object in self.scene.objects:
+        self.skipped = 0
+        for object in list(self.scene.objects):
             if object.osm.id!='':
+                id = int(object.osm.id)
                 # check if it is an object
-                if object.osm.id in self.nodes:
-                    self.nodes[object.osm.id].generate(True,object)
-                    if debug:
-                        debugger.debug('%3.2f' % (self.process) +'% ' + self.nodes[object.osm.id].name)
-                elif object.osm.id in self.ways['by_id']:
-                    self.ways['by_id'][object.osm.id].generate(True,object)
-                    if debug:
-                        debugger.debug('%3.2f' % (self.process) +'% ' + self.ways['by_id'][object.osm.id].name)
+                if id in self.nodes:
+                    node = self.nodes[id]
+                    if node.isUnchanged(object):
+                        node.object = object
+                        self.skipped+=1
+                    else:
+                        node.generate(True,object)
+                        if debug:
+                            debugger.debug('%3.2f' % (self.process) +'% ' + node.name)
+                elif id in self.ways['by_id']:
+                    way = self.ways['by_id'][id]
+                    if object.osm.fingerprint=='':
+                        way.generate(True,object)
+                    elif way.isUnchanged(object):
+                        way.useObject(object)
+                        self.skipped+=1
+                    else:
+                        self.replaceObject(way,object)
+                    if debug and way.object and way.object!=object:
+                        debugger.debug('%3.2f' % (self.process) +'% ' + way.name)
+            self.process+=self.process_step
+
+        if debug:
+            debugger.debug('%d unchanged objects skipped' % self.skipped)
+
+    # Rebuilds the merged objects in the scene, see <mergeWays>. A merged object is kept if none of its ways and materials changed,
+    # otherwise its ways are generated again and returned to be merged after z-sorting.
+    # Scenes merged by material are updated by rebuilding them, so there ways without any object are merged as well
+    # and node objects are created and removed like the nodes in the file, e.g. after a change file was applied.
+    def createMergedFromExisting(self):
+        if self.merge_meshes:
+            self.createMissingNodes()
+
+        existing = {}
+        parts = set()
+        for object in list(self.scene.objects):
+            if len(object.osm.parts)>0 and self.isInTile(object):
+                existing[object.osm.name] = object
+                for part in object.osm.parts:
+                    parts.add(int(part.id))
+
+        ways = []
+        for id in self.ways['by_id']:
+            way = self.ways['by_id'][id]
+            if way.object is None and (id in parts or self.merge_meshes):
+                ways.append(way)
+        groups = self.getMergeGroups(ways)
+
+        changed = set()
+        for name in groups:
+            object = existing.get(name)
+            if object is None or object.osm.fingerprint!=self.getMergedFingerprint(groups[name]) or object.osm.material_fingerprint!=self.getMaterialFingerprint(groups[name][0].materials):
+                changed.add(name)
+
+        # offsets depend on all colliding areas and trafficways, so they are sorted again as a whole
+        for name in list(changed):
+            if groups[name][0].type in ('area','trafficway'):
+                changed.update([other for other in groups if groups[other][0].type in ('area','trafficway')])
+                break
+
+        merged = []
+        for name in groups:
+            if name in changed:
+                for way in groups[name]:
+                    way.generate(False)
+                    merged.append(way)
+                    if debug and way.object:
+                        debugger.debug('%3.2f' % (self.process) +'% ' + way.name)
+            else:
+                self.skipped+=len(groups[name])
+        for name in existing:
+            if name not in groups or name in changed:
+                removeObject(self.scene,existing[name])
+        return merged
+
+    # Removes the node objects of nodes no longer in the file and creates objects for nodes without one.
+    def createMissingNodes(self):
+        for object in list(self.scene.objects):
+            # node objects have no data
+            if object.osm.id!='' and object.data is None and int(object.osm.id) not in self.nodes and self.isInTile(object):
+                removeObject(self.scene,object)
+
+        if 'object' not in self.types:
+            return
+        layers = self.getLayers()
+        layers[LAYERS.index('object')] = True
+        for id in self.nodes:
+            node = self.nodes[id]
+            if node.object is None:
+                node.generate(False)
+                if node.object:
+                    node.object.layers = layers
+                    self.scene.objects.link(node.object)
+                    if self.tile:
+                        self.getTileGroup().objects.link(node.object)
+
+    # Returns True if an object belongs to the tile of this instance, always True without tiles.
+    def isInTile(self,object):
+        if self.tile is None:
+            return True
+        name = TILE_GROUP % self.tile
+        for group in object.users_group:
+            if group.name==name:
+                return True
+        return False
+
+    # Returns ways grouped by the name of the merged object they belong to, the type followed by the material names.
+    # Ways without an object of their own are left out, see <Way.generate>.
+    def getMergeGroups(self,ways):
+        groups = OrderedDict()
+        for way in ways:
+            if way.type and way.level>=0:
+                name = '%s: %s' % (way.type,', '.join([material.name for material in way.materials]))
+                if name not in groups:
+                    groups[name] = []
+                groups[name].append(way)
+        return groups
+
+    # Returns a fingerprint of the ways of a merged object, see <Way.getFingerprint>.
+    def getMergedFingerprint(self,ways):
+        fingerprint = hashlib.md5()
+        for way in ways:
+            fingerprint.update(('%d:%s\n' % (way.id,way.getFingerprint())).encode('utf-8'))
+        return fingerprint.hexdigest()
+
+    # Builds generated ways of the same type and materials into one object each, instead of one object per way.
+    # The id, name and tags of every way are kept as part of the object together with the index of its first face, see <getPart>.
+    # The objects of the ways were only needed to build their meshes and are removed.
+    def mergeWays(self,ways):
+        groups = self.getMergeGroups([way for way in ways if way.object])
+        for name in groups:
+            ways = groups[name]
+
+            # vertices are placed relative to the center of the ways, so they keep their precision
+            location = Vector((0.0,0.0,0.0))
+            for way in ways:
+                location+=way.object.location
+            location = location/len(ways)
+
+            mesh = bpy.data.meshes.new(name)
+            object = bpy.data.objects.new(name,mesh)
+            object.location = location
+            object.osm.name = name
+            for material in ways[0].materials:
+                mesh.materials.append(material)
+            edge_split = object.modifiers.new(name="edge_split",type="EDGE_SPLIT")
+            edge_split.split_angle = math.radians(40.00)
+
+            data = MeshData()
+            way_data = MeshData()
+            for way in ways:
+                part = object.osm.parts.add()
+                part.id = str(way.id)
+                part.name = way.name
+                part.face = data.getNumFaces()
+                for (tag_name,value) in self.tags.items(way.tags):
+                    tag = part.tags.add()
+                    tag.name = tag_name
+                    tag.value = value
+
+                way_data.read(way.object.data)
+                data.extend(way_data,way.object.location-location)
+
+                way_mesh = way.object.data
+                bpy.data.objects.remove(way.object)
+                bpy.data.meshes.remove(way_mesh)
+                way.object = None
+
+            data.write(mesh,False)
+            object.osm.fingerprint = self.getMergedFingerprint(ways)
+            object.osm.material_fingerprint = self.getMaterialFingerprint(ways[0].materials)
+
+            if ways[0].type in LAYERS:
+                layers = self.getLayers()
+                layers[LAYERS.index(ways[0].type)] = True
+                object.layers = layers
+            self.scene.objects.link(object)
+            if self.tile:
+                self.getTileGroup().objects.link(object)
+
+        if debug and len(groups)>0:
+            debugger.debug('merged %d ways into %d objects' % (sum([len(groups[name]) for name in groups]),len(groups)))
+
+    # Generates a new object for a way and replaces an existing object with it, keeping its layers and groups.
+    def replaceObject(self,way,object):
+        way.generate(False)
+        if way.object:
+            way.object.layers = [layer for layer in object.layers]
+            self.scene.objects.link(way.object)
+            for group in object.users_group:
+                group.objects.link(way.object)
+        removeObject(self.scene,object)
+
+    # Returns the mesh shared by buildings with the same footprint as a building and the rotation to place it with, None if there is none yet.
+    # Candidates are found by the signature and the perimeter of the footprint, then compared corner by corner, see <Building.getFootprint>.
+    # Meshes shared by earlier imports, e.g. other tiles, are found by the footprint stored with them.
+    def getSharedMesh(self,footprint):
+        if self.shared_meshes is None:
+            self.shared_meshes = {}
+            for mesh in bpy.data.meshes:
+                if mesh.get('osm_footprint'):
+                    co = mesh['osm_coords']
+                    self.addSharedMesh((mesh['osm_footprint'],(0.0,0.0),[(co[i],co[i+1]) for i in range(0,len(co),2)]),mesh,mesh['osm_angle'])
+
+        (signature,center,coords) = footprint
+        (perimeter,size) = self.getPerimeterBin(coords)
+        for bin in (perimeter-1,perimeter,perimeter+1):
+            for (mesh,mesh_coords,mesh_angle) in self.shared_meshes.get((signature,bin),()):
+                angle = self.matchFootprint(coords,mesh_coords)
+                if angle is not None:
+                    return (mesh,angle-mesh_angle)
+        return None
+
+    # Adds the mesh of a building to the shared meshes, with its corners rotated like the first wall points along the x-axis.
+    def addSharedMesh(self,footprint,mesh,angle = None):
+        (signature,center,coords) = footprint
+        if angle is None:
+            angle = getWallAngle(coords,0)
+            coords = rotateCoords(coords,0,-angle)
+            mesh['osm_footprint'] = signature
+            mesh['osm_coords'] = [c for co in coords for c in co]
+            mesh['osm_angle'] = angle
+        key = (signature,self.getPerimeterBin(coords)[0])
+        if key not in self.shared_meshes:
+            self.shared_meshes[key] = []
+        self.shared_meshes[key].append((mesh,coords,angle))
+
+    # Returns the bin of the perimeter of a footprint. Bins are wide enough that matching footprints are in the same or a neighbouring bin.
+    def getPerimeterBin(self,coords):
+        num = len(coords)
+        perimeter = 0.0
+        for i in range(0,num):
+            a = coords[i]
+            b = coords[(i+1) % num]
+            perimeter+=math.sqrt((b[0]-a[0])**2+(b[1]-a[1])**2)
+        size = 2*num*self.share_tolerance
+        return (int(math.floor(perimeter/size)),size)
+
+    # Returns the angle of the wall of a footprint that makes it match corners rotated like their first wall points along the x-axis,
+    # None if no wall does.
+    def matchFootprint(self,coords,rotated):
+        num = len(coords)
+        if num!=len(rotated):
+            return None
+        tolerance = self.share_tolerance
+        for start in range(0,num):
+            angle = getWallAngle(coords,start)
+            c = math.cos(-angle)
+            s = math.sin(-angle)
+            for i in range(0,num):
+                co = coords[(start+i) % num]
+                if abs(co[0]*c-co[1]*s-rotated[i][0])>tolerance or abs(co[0]*s+co[1]*c-rotated[i][1])>tolerance:
+                    break
+            else:
+                return angle
+        return None
+
+    # Returns the scene settings every object is built with: the projection, its center and origin, and the traffic direction
+    # objects are placed next to roads by. Objects built with other settings are not unchanged even if their element is.
+    def getSettingsFingerprint(self,center):
+        return '%s:%r:%r:%r\n' % (self.projection_type,tuple(center),tuple(self.origin),self.right_hand_traffic)
+
+    # Returns a fingerprint of the materials of an element, including the settings its geometry is built from.
+    def getMaterialFingerprint(self,materials):
+        key = tuple([material.name for material in materials])
+        if key not in self.material_fingerprints:
+            fingerprint = hashlib.md5()
+            for material in materials:
+                fingerprint.update(material.name.encode('utf-8'))
+                for name in MATERIAL_SETTINGS:
+                    fingerprint.update((':%r' % (getattr(material.osm,name),)).encode('utf-8'))
+                fingerprint.update(b'\n')
+            self.material_fingerprints[key] = fingerprint.hexdigest()
+        return self.material_fingerprints[key]
+
+    # Applies an osmChange to the objects in the scene instead of rebuilding everything.
+    # The parser has to read the file of the scene with all change files applied, see <ChangedParser>.
+    # Ways that changed or reference changed nodes and changed tagged nodes are created again, deleted ones are removed.
+    # Areas and trafficways close to the changes are regenerated and z-sorted again, everything else is left untouched.
+    def update(self,change):
+        self.scene = bpy.context.scene
+        self.store = NodeStore()
+        self.shared_ways = None
+        self.missing_refs = 0
+        self.missing_ids = []
+        self.nodes = {}
+        self.ways = {'area':[],'building':[],'trafficway':[],'barrier':[],'by_id':{},'sorted':[]}
+
+        # node and way ids may be equal, node objects have no data
+        existing = {}
+        for object in self.scene.objects:
+            if object.osm.id!='':
+                existing[('node' if object.data is None else 'way',int(object.osm.id))] = object
+
+        # the neighbourhood is collected as cells of a grid, covering the changes before and after the update
+        cells = set()
+        removed = 0
+        for (name,elements) in (('node',change.nodes),('way',change.ways)):
+            for id in elements:
+                if (name,id) in existing:
+                    object = existing.pop((name,id))
+                    self.addUpdateCells(cells,self.getObjectBounds(object))
+                    removeObject(self.scene,object)
+                    removed+=1
+
+        if debug:
+            debugger.debug("parsing changed elements (pass 1/2) ...")
+
+        changed_nodes = set(change.nodes)
+        updated = []
+        for element in self.parser.elements():
+            if element.name=='node':
+                id = int(element.attributes['id'])
+                self.addNode(element,id in change.nodes and self.acceptNode(element))
+            elif element.name=='way':
+                id = int(element.attributes['id'])
+                element.refs = toIds(element.refs)
+                if id in change.ways or changed_nodes.isdisjoint(element.refs)==False:
+                    if ('way',id) in existing:
+                        removeObject(self.scene,existing.pop(('way',id)))
+                        removed+=1
+                    if self.acceptWay(element):
+                        self.projectNodes()
+                        way = Way(element,self)
+                        if len(way.nodes)>0 and self.isLoaded(way.nodes):
+                            self.addWay(way)
+                            updated.append(way)
+
+        self.projectNodes()
+        self.reportMissingRefs()
+
+        for id in list(self.nodes):
+            if self.isLoaded([self.nodes[id].index]):
+                self.addUpdateCells(cells,self.getNodeBounds([self.nodes[id].index]))
+            else:
+                del self.nodes[id]
+        for way in updated:
+            self.addUpdateCells(cells,self.getNodeBounds(way.nodes))
+
+        if debug:
+            debugger.debug("parsing neighbourhood (pass 2/2) ...")
+
+        neighbours = {}
+        for element in self.parser.elements():
+            if element.name=='way':
+                id = int(element.attributes['id'])
+                if ('way',id) in existing and id not in self.ways['by_id'] and self.acceptWay(element):
+                    (refs,missing) = self.store.lookup(toIds(element.refs))
+                    if len(refs)>0 and self.inUpdateCells(cells,self.getNodeBounds(refs)):
+                        way = Way(element,self)
+                        if way.type in ('area','trafficway'):
+                            self.addWay(way)
+                            neighbours[id] = existing[('way',id)]
+
+        self.process_step = 100/max(1,len(self.ways['by_id'])+len(self.nodes))
+        self.createObjects(False)
+        for way in updated:
+            way.generate(False)
+            if debug and way.object:
+                debugger.debug('%3.2f' % (self.process) +'% ' + way.name)
+            self.process+=self.process_step
+        for id in neighbours:
+            # vertices are placed relative to the location, the z offset is sorted again below
+            neighbours[id].location[2] = 0.0
+            self.ways['by_id'][id].generate(True,neighbours[id])
             self.process+=self.process_step
 
+        # objects which are not sorted again keep their z offset, the sorted ways are placed above the ones they overlap
+        self.offset = self.base_offset = self.getUpdateOffset(existing,neighbours)
+        self.sortAreas()
+        self.sortTrafficways()
+
+        created = {}
+        for way in updated:
+            created[way.id] = way
+        for i in range(0,len(LAYERS)):
+            if LAYERS[i]:
+                if LAYERS[i]=='object':
+                    self.setToLayer(self.nodes,i,True)
+                elif LAYERS[i] in self.ways:
+                    self.setToLayer([way for way in self.ways[LAYERS[i]] if way.id not in neighbours],i)
+
+        self.linkObjects(self.nodes)
+        self.linkObjects(created)
+        if self.tile_size>0:
+            for id in self.nodes:
+                self.groupObject(self.nodes[id].object,self.nodes[id].index)
+            for way in updated:
+                self.groupObject(way.object,way.nodes[0])
+        updateScene(self.scene)
+
+        if debug:
+            debugger.debug('OSM update complete: %d objects removed, %d created, %d neighbours z-sorted again' % (removed,len(self.nodes)+len(updated),len(neighbours)))
+
+    # Returns the z offset the areas and trafficways of an update are sorted from. It is above the offset of all area and trafficway
+    # objects which overlap the sorted ways but are not sorted again, else a sorted way could end up at the same height as one of them.
+    #
+    # Parameters:
+    #   dict existing - Objects in the scene which were not rebuilt by the update, by (element name,id).
+    #   dict neighbours - Objects of the neighbourhood which are sorted again, by way id.
+    def getUpdateOffset(self,existing,neighbours):
+        sorted_bounds = [self.getNodeBounds(way.nodes) for way in self.ways['area']+self.ways['trafficway'] if way.object]
+        offset = 0.0
+        for ((name,id),object) in existing.items():
+            if name!='way' or id in neighbours or len(object.data.materials)==0 or object.data.materials[0] is None:
+                continue
+            if object.data.materials[0].osm.base_type not in ('area','trafficway'):
+                continue
+            bounds = self.getObjectBounds(object)
+            for other in sorted_bounds:
+                if bounds[0]<other[2] and bounds[2]>other[0] and bounds[1]<other[3] and bounds[3]>other[1]:
+                    offset = max(offset,object.location[2]+self.offset_step)
+                    break
+        return offset
+
+    # Returns the name of the tile group a node in the store belongs to.
+    def getTileName(self,index):
+        return getTileName(self.getTile(self.store.x[index],self.store.y[index]))
+
+    # Puts an object into the group of the tile a node in the store belongs to.
+    def groupObject(self,object,index):
+        if object:
+            bpy.data.groups[self.getTileName(index)].objects.link(object)
+
+    # Returns True if objects of nodes in the store are loaded in the scene.
+    # In tiled scenes the tile of the first node has to be loaded, in clipped scenes a node has to lie inside the clip box.
+    def isLoaded(self,indices):
+        store = self.store
+        if self.tile_size>0:
+            return self.getTileName(indices[0]) in bpy.data.groups
+        if self.clip:
+            for i in indices:
+                if self.clip[0][0]<=store.lat[i]<=self.clip[1][0] and self.clip[0][1]<=store.lon[i]<=self.clip[1][1]:
+                    return True
+            return False
+        return True
+
+    # Returns the bounding box of nodes in the store as (min x,min y,max x,max y).
+    def getNodeBounds(self,indices):
+        x = [self.store.x[i] for i in indices]
+        y = [self.store.y[i] for i in indices]
+        return (min(x),min(y),max(x),max(y))
+
+    # Returns the bounding box of an object in the scene as (min x,min y,max x,max y).
+    def getObjectBounds(self,object):
+        location = object.location
+        if object.data is None or len(object.data.vertices)==0:
+            return (location[0],location[1],location[0],location[1])
+        # shared meshes are placed with a rotation
+        c = math.cos(object.rotation_euler[2])
+        s = math.sin(object.rotation_euler[2])
+        x = [v.co[0]*c-v.co[1]*s for v in object.data.vertices]
+        y = [v.co[0]*s+v.co[1]*c for v in object.data.vertices]
+        return (location[0]+min(x),location[1]+min(y),location[0]+max(x),location[1]+max(y))
+
+    # Returns the grid cells covered by a bounding box, grown by the update margin.
+    def getUpdateCells(self,bounds):
+        size = self.update_cell_size
+        margin = self.update_margin
+        for col in range(int(math.floor((bounds[0]-margin)/size)),int(math.floor((bounds[2]+margin)/size))+1):
+            for row in range(int(math.floor((bounds[1]-margin)/size)),int(math.floor((bounds[3]+margin)/size))+1):
+                yield (col,row)
+
+    def addUpdateCells(self,cells,bounds):
+        cells.update(self.getUpdateCells(bounds))
+
+    def inUpdateCells(self,cells,bounds):
+        for cell in self.getUpdateCells(bounds):
+            if cell in cells:
+                return True
+        return False
+
     def setToLayer(self,items,layer,dict = False):
         layers = self.getLayers()
         layers[layer] = True
@@ -216,6 +992,9 @@ class OSM():
     def createWays(self,rebuild):
         if debug:
             debugger.debug('\nCreating ways ...')
+        if self.workers>1:
+            self.createWaysParallel(rebuild)
+            return
         for id in self.ways['by_id']:
             way = self.ways['by_id'][id]
             way.generate(rebuild)
@@ -223,7 +1002,57 @@ class OSM():
                 debugger.debug('%3.2f' % (self.process) +'% ' + way.name)
             self.process+=self.process_step
 
+    # Method: createWaysParallel
+    # Creates the ways like <createWays>, but their mesh buffers are built by worker processes, see <osm_geometry.buildBatch>.
+    # Objects are created and the buffers uploaded here, in the order of the ways, while the workers build the next batches.
+    def createWaysParallel(self,rebuild):
+        from concurrent.futures import ProcessPoolExecutor
+
+        # keep a limited number of batches in flight, so results do not pile up in memory
+        executor = ProcessPoolExecutor(self.workers)
+        try:
+            pending = deque()
+            batch = []
+            for id in self.ways['by_id']:
+                way = self.ways['by_id'][id]
+                if way.type and way.level>=0:
+                    batch.append((way,way.prepare(rebuild)))
+                self.process+=self.process_step
+                if len(batch)>=self.build_batch:
+                    pending.append(self.submitBatch(executor,batch))
+                    batch = []
+                    if len(pending)>=self.workers*2:
+                        self.finishBatch(rebuild,*pending.popleft())
+            if len(batch)>0:
+                pending.append(self.submitBatch(executor,batch))
+            while pending:
+                self.finishBatch(rebuild,*pending.popleft())
+        finally:
+            executor.shutdown()
+
+    # Sends the jobs of a batch of prepared ways to the workers, returns the batch and the future of the buffers.
+    def submitBatch(self,executor,batch):
+        jobs = [job for (way,job) in batch if job]
+        if len(jobs)>0:
+            return (batch,executor.submit(osm_geometry.buildBatch,jobs))
+        return (batch,None)
+
+    # Uploads the buffers of a batch of prepared ways built by the workers.
+    def finishBatch(self,rebuild,batch,future):
+        if future:
+            results = iter(future.result())
+        for (way,job) in batch:
+            if way.object:
+                if job:
+                    way.finish(rebuild,next(results))
+                else:
+                    way.finish(rebuild,None)
+                if debug:
+                    debugger.debug(way.name)
+
     def createObjects(self,rebuild):
+        if 'object' not in self.types:
+            return
         if debug:
             debugger.debug('\nCreating objects ...')
         for id in self.nodes:
@@ -264,7 +1093,7 @@ class OSM():
             offset = colliding[0].offset
             sort_index = way.materials[0].osm.trafficway_sort
             return offset+(self.offset_step*(sort_index+1))
-        return 0.0
+        return self.base_offset
 
     def createGround(self):
         mesh = bpy.data.meshes.new("Ground")
@@ -330,87 +1159,194 @@ class OSM():
 
         #self.scene.camera = self.camera
 
-    def getNodes(self,xml):
-        if debug:
-            debugger.debug("parsing nodes ...")
+    # Streams the file and builds nodes and ways as their elements are read.
+    # Elements are not kept, so only the resulting model stays in memory.
+    def parse(self):
+        self.store = NodeStore()
+        self.shared_ways = None
+        self.missing_refs = 0
+        self.missing_ids = []
+        self.nodes = {}
+        self.ways = {'area':[],'building':[],'trafficway':[],'barrier':[],'by_id':{},'sorted':[]}
 
-        nodes = {}
-        xml_nodes = xml.getElementsByTagName('node')
-        for i in range(0,xml_nodes.length):
-            node = Node(xml_nodes.item(i),self)
-            nodes[node.id] = node
+        if self.two_pass or self.clip or self.tile:
+            self.parseFiltered()
+            self.projectNodes()
+            self.reportMissingRefs()
+            return
 
-        return nodes
+        if debug:
+            debugger.debug("parsing nodes and ways ...")
+
+        # nodes may be referenced by ways later on, so only ways can be rejected while streaming
+        for element in self.parser.elements():
+            self.countTags(element)
+            if element.name=='node':
+                self.addNode(element,self.acceptNode(element))
+            elif element.name=='way' and self.acceptWay(element):
+                # the nodes before the first way are projected at once
+                self.projectNodes()
+                self.addWay(Way(element,self))
+
+        self.projectNodes()
+        self.reportMissingRefs()
+
+    # First pass keeps only the ways that are needed and collects the nodes they reference,
+    # second pass builds only those nodes and the nodes needed on their own.
+    # In two-pass mode ways need to resolve to a material and nodes need tags a group can match.
+    # With clipping ways need at least one node inside the clip box and are kept intact, other nodes need to be inside.
+    # A tile owns the ways whose first node lies inside it, so every way belongs to exactly one tile.
+    # Nodes of kept ways outside the clip box or the tile are kept for the geometry, but do not become objects.
+    def parseFiltered(self):
+        if debug:
+            debugger.debug("parsing ways (pass 1/2) ...")
+
+        # nodes come first in OSM files, so the nodes inside the clip box are known when the ways are read
+        inside = set()
+        way_elements = []
+        refs = array('q')
+        for element in self.parser.elements():
+            self.countTags(element)
+            if element.name=='node':
+                if (self.clip or self.tile) and self.isInside(element):
+                    inside.add(int(element.attributes['id']))
+            elif element.name=='way':
+                element.refs = toIds(element.refs)
+                if self.clip and inside.isdisjoint(element.refs):
+                    continue
+                if self.tile and (len(element.refs)==0 or element.refs[0] not in inside):
+                    continue
+                if self.acceptWay(element)==False:
+                    continue
+                if self.two_pass and len(self.getMaterials(self.getTags(element)))==0:
+                    continue
+                way_elements.append(element)
+                refs.extend(element.refs)
+
+        refs = sortedIds(refs)
 
-    def getWays(self,xml):
         if debug:
-            debugger.debug("parsing ways ...")
-
-        areas = []
-        buildings = []
-        trafficways = []
-        barriers = []
-        by_id = {}
-
-        xml_ways = xml.getElementsByTagName('way')
-        for i in range(0,xml_ways.length):
-            way = Way(xml_ways.item(i),self)
-            by_id[way.id] = way
-            if way.type=='area':
-                areas.append(way)
-            elif way.type=='building':
-                buildings.append(way)
-            elif way.type=='trafficway':
-                trafficways.append(way)
-            elif way.type=='barrier':
-                barriers.append(way)
-
-        return {'area':areas,'building':buildings,'trafficway':trafficways,'barrier':barriers,'by_id':by_id,'sorted':[]}
-
-    def getNodeRefs(self,way,xml):
-        refs = []
-        xml_nds = xml.getElementsByTagName('nd')
-        for i in range(0,xml_nds.length):
-            id = xml_nds.item(i).attributes['ref'].value
-            if id in self.nodes:
-                node = self.nodes[id]
-                node.ways.append(way)
-                refs.append(node)
+            debugger.debug("parsing nodes (pass 2/2) ...")
+
+        for element in self.parser.elements():
+            if element.name=='node':
+                id = int(element.attributes['id'])
+                accept = self.acceptNode(element)
+                if containsId(refs,id):
+                    self.addNode(element,accept and (not (self.clip or self.tile) or id in inside))
+                elif (self.clip or self.tile) and id not in inside:
+                    continue
+                elif self.two_pass==False or accept:
+                    self.addNode(element,accept)
+
+        self.projectNodes()
+        for element in way_elements:
+            self.addWay(Way(element,self))
 
-        return refs
+        if debug:
+            debugger.debug("kept %d nodes and %d ways" % (len(self.store),len(way_elements)))
+
+    def isInside(self,element):
+        lat = float(element.attributes['lat'])
+        lon = float(element.attributes['lon'])
+        if self.tile:
+            (x,y) = self.projection.projectPoint(lat,lon)
+            return self.getTile(x-self.origin[0],y-self.origin[1])==self.tile
+        return self.clip[0][0]<=lat<=self.clip[1][0] and self.clip[0][1]<=lon<=self.clip[1][1]
+
+    # Returns the number of tiles in x and y direction.
+    def getTileGrid(self):
+        return (max(1,int(math.ceil(self.dimensions[0]/self.tile_size))),max(1,int(math.ceil(self.dimensions[1]/self.tile_size))))
+
+    # Returns the tile containing projected coordinates. Coordinates outside the bounds belong to the tiles at the border.
+    def getTile(self,x,y):
+        (cols,rows) = self.getTileGrid()
+        col = min(max(int(math.floor(x/self.tile_size)),0),cols-1)
+        row = min(max(int(math.floor(y/self.tile_size)),0),rows-1)
+        return (col,row)
+
+    # Puts the objects of a tile into the tile's group, so the tile can be unloaded again.
+    def groupObjects(self):
+        group = self.getTileGroup()
+
+        for items in (self.nodes,self.ways['by_id']):
+            for id in items:
+                if items[id].object:
+                    group.objects.link(items[id].object)
+
+    # Returns the group of the tile of this instance, which is created if it does not exist yet.
+    def getTileGroup(self):
+        name = TILE_GROUP % self.tile
+        if name in bpy.data.groups:
+            return bpy.data.groups[name]
+        return bpy.data.groups.new(name)
+
+    # Adds a node to the node store. Only tagged nodes get a <Node> instance, which may become an object, unless object is False, see <acceptNode>.
+    def addNode(self,element,object = True):
+        attributes = element.attributes
+        # parsers project with mercator only
+        co = element.co if self.projection.name=='mercator' else None
+        index = self.store.add(int(attributes['id']),float(attributes['lat']),float(attributes['lon']),float(attributes.get('ele',0.0)),co)
+        if object and len(element.tags)>0:
+            node = Node(element,index,self)
+            self.nodes[node.id] = node
+
+    # Projects the nodes added to the store since the last call.
+    def projectNodes(self):
+        if self.store.projected<len(self.store):
+            self.store.project(self.projection,self.origin)
+
+    # Returns the <Node> instance of a node in the store or None if the node is untagged.
+    def getNodeObject(self,index):
+        return self.nodes.get(self.store.ids[index])
+
+    def addWay(self,way):
+        if way.type not in self.types:
+            return
+        self.ways['by_id'][way.id] = way
+        if way.type in ('area','building','trafficway','barrier'):
+            self.ways[way.type].append(way)
+
+    # Returns the store indices of the nodes a way references. References to nodes missing in the file are left out and counted.
+    def getNodeRefs(self,way,element):
+        (refs,missing) = self.store.lookup(toIds(element.refs))
+        if missing:
+            self.missing_refs+=len(missing)
+            if len(self.missing_ids)<10:
+                self.missing_ids.extend(missing[:10-len(self.missing_ids)])
 
-    def getTags(self,xml):
-        tags = {}
-        xml_tags = xml.getElementsByTagName('tag')
-        for i in range(0,xml_tags.length):
-            tag = Tag(xml_tags.item(i),self)
-            tags[tag.name] = tag
+        return refs
 
-        return tags
+    # Reports references to missing nodes once after parsing, instead of once per reference.
+    def reportMissingRefs(self):
+        if self.missing_refs>0 and debug:
+            debugger.debug("%d references to nodes missing in the file, e.g. %s" % (self.missing_refs,', '.join([str(id) for id in self.missing_ids])))
+
+    # Returns the trafficways referencing a node, once for each time they reference it.
+    # Only trafficways are joined at shared nodes, so the lookup is built from them on first use instead of for every node while parsing.
+    def getSharedWays(self,index):
+        if self.shared_ways is None:
+            self.shared_ways = {}
+            for way in self.ways['trafficway']:
+                for i in way.nodes:
+                    if i in self.shared_ways:
+                        self.shared_ways[i].append(way)
+                    else:
+                        self.shared_ways[i] = [way]
+        return self.shared_ways.get(index,())
 
+    # Returns the interned tags of an element.
+    def getTags(self,element):
+        return self.tags.pack(element.tags)
 
-    # Python implementation for mercator projection by Paulo Silva taken from: http://wiki.openstreetmap.org/wiki/Mercator
 
     def mercX(self,lon):
-        return EQUATOR_RADIUS*math.radians(lon)
+        return osm_projection.mercX(lon)
 
     def mercY(self,lat):
-        if lat>89.5:lat=89.5
-        if lat<-89.5:lat=-89.5
-        r_major=EQUATOR_RADIUS
-        r_minor=POLE_RADIUS
-        temp=r_minor/r_major
-        eccent=math.sqrt(1-temp**2)
-        phi=math.radians(lat)
-        sinphi=math.sin(phi)
-        con=eccent*sinphi
-        com=eccent/2
-        con=((1.0-con)/(1.0+con))**com
-        ts=math.tan((math.pi/2-phi)/2)/con
-        y=0-r_major*math.log(ts)
-        return y
-
-    # Returns x/y coordinates of a given latitude, longitude and elevation using the sperical mercator projection.
+        return osm_projection.mercY(lat)
+
+    # Returns x/y coordinates of a given latitude, longitude and elevation using the configured projection.
     def getCoordinates(self,latLonEle,use_bounds = True):
         from math import sqrt, cos, sin, radians
 
@@ -425,14 +1361,17 @@ class OSM():
 #        co[1] = (r/180)*latLonEle[0]*self.latlon_scale
 #        co[0] = ((r/2)/180)*latLonEle[1]*self.latlon_scale
 
-        co[0] = self.mercX(latLonEle[1])
-        co[1] = self.mercY(latLonEle[0])
+        (x,y) = self.projection.projectPoint(latLonEle[0],latLonEle[1])
+
+        # subtract the origin before the coordinates are stored in single precision
+        if use_bounds:
+            x-=self.origin[0]
+            y-=self.origin[1]
+        co[0] = x
+        co[1] = y
 
         if len(latLonEle)==3:
             co[2] = latLonEle[2]
-        if use_bounds:
-            co[0]-=self.bounds[0][0]
-            co[1]-=self.bounds[0][1]
 
         return co
 
@@ -528,22 +1467,8 @@ class OSM():
             way.object.layers[0] = False
 
 
-class Tag():
-    name = None
-    value = None
-    osm = None
-
-    def __init__(self,xml,osm):
-        self.osm = osm
-        self.name = xml.attributes['k'].value
-        self.value = xml.attributes['v'].value
-
-
 class TagConfig():
-    name = None
-    value = None
-    materials = []
-    groups = []
+    __slots__ = ('name','value','materials','groups')
 
     def  __init__(self,name,value):
         self.name = name
@@ -570,28 +1495,21 @@ class TagConfig():
         return None        
 
 
+# Ways and nodes use __slots__, there may be millions of them and instance dicts would double their size.
 class Way():
-    id = None
-    name = "Way"
-    nodes = []
-    tags = {}
-    type = None
-    object = None
-    geometry = None
-    osm = None
-    area = 0.0
-    bounds = (Vector((0.0,0.0)),Vector((0.0,0.0)))
-    offset = 0.0
-    level = 0
-    materials = []
+    __slots__ = ('id','name','nodes','tags','type','object','geometry','osm','area','bounds','offset','level','materials')
 
-    def __init__(self,xml,osm):
+    def __init__(self,element,osm):
         self.osm = osm
-        self.id = xml.attributes['id'].value
-        self.tags = self.osm.getTags(xml)
-        self.nodes = self.osm.getNodeRefs(self,xml)
+        self.id = int(element.attributes['id'])
+        self.name = "Way"
+        self.type = None
+        self.object = None
+        self.geometry = None
+        self.tags = self.osm.getTags(element)
+        self.nodes = self.osm.getNodeRefs(self,element)
         self.area = 0.0
-        self.bounds = (Vector((0.0,0.0)),Vector((0.0,0.0)))
+        self.bounds = NO_BOUNDS
         self.offset = 0.0
         self.level = 0
         self.materials = []
@@ -602,31 +1520,45 @@ class Way():
         self.createGeometry()
 
     def setLevel(self):
-        if 'level' in self.tags:
+        if self.hasTag('level'):
             try:
-                self.level = char(int(self.tags['level'].value))
+                self.level = char(int(self.getTag('level')))
             except:
                 self.level = -1
         
     def setName(self):
-        if 'name' in self.tags:
-            self.name = self.tags['name'].value
+        if self.hasTag('name'):
+            self.name = self.getTag('name')
         else:
             self.name = '%s_%s' % (self.type,self.id)
 
     def generate(self,rebuild, object = None):
         if self.type and self.level>=0:
-            self.createObject(rebuild,object)
+            job = self.prepare(rebuild,object)
             if self.object:
-                if self.type:
-                    if self.geometry:
-                        self.geometry.generate(rebuild)
-                    self.area = self.geometry.getArea()
-                    
-                self.bounds = self.geometry.getBounds()
-
-                # align objects along center edge
-                self.alignObjects()
+                self.finish(rebuild,osm_geometry.runJob(job))
+
+    # Method: prepare
+    # Creates the object of the way and returns the job building its mesh buffers, see <Geometry.prepare>.
+    def prepare(self,rebuild, object = None):
+        self.createObject(rebuild,object)
+        if self.object and self.geometry:
+            return self.geometry.prepare(rebuild)
+        return None
+
+    # Method: finish
+    # Uploads the mesh buffers built by the job of <prepare> and places the objects of the nodes.
+    #
+    # Parameters:
+    #   bool rebuild - The object already has its mesh.
+    #   MeshData data - The mesh buffers, None if the job was None.
+    def finish(self,rebuild,data):
+        self.geometry.upload(rebuild,data)
+        self.area = self.geometry.getArea()
+        self.bounds = self.geometry.getBounds()
+
+        # align objects along center edge
+        self.alignObjects()
 
     def createGeometry(self):
         # TODO: look for USAGE_TAGS groups and place them on top of building, on every node for lines or in object center for areas
@@ -643,24 +1575,56 @@ class Way():
             
     def createObject(self,rebuild, object = None):
         if rebuild==False:
-            mesh = bpy.data.meshes.new(self.name)
+            if self.geometry:
+                mesh = self.geometry.createMesh()
+            else:
+                mesh = bpy.data.meshes.new(self.name)
             self.object = bpy.data.objects.new(self.name,mesh)
-            self.object.osm.id = self.id
+            self.object.osm.id = str(self.id)
             self.object.osm.name = self.name
-            for tag in self.tags:
+            for (name,value) in self.osm.tags.items(self.tags):
                 obj_tag = self.object.osm.tags.add()
-                obj_tag.name = self.tags[tag].name
-                obj_tag.value = self.tags[tag].value
+                obj_tag.name = name
+                obj_tag.value = value
 
             #self.osm.scene.objects.link(self.object)
             self.object.location = self.getCenter()
         elif object:
             self.object = object
 
+        if self.object:
+            self.object.osm.fingerprint = self.getFingerprint()
+            self.object.osm.material_fingerprint = self.osm.getMaterialFingerprint(self.materials)
+
+    # Returns the fingerprint of the node coordinates and tags, see <getFingerprint>.
+    def getFingerprint(self):
+        store = self.osm.store
+        coords = array('d')
+        for i in self.nodes:
+            coords.append(store.lat[i])
+            coords.append(store.lon[i])
+            coords.append(store.ele[i])
+        return getFingerprint(coords,self.osm.tags.items(self.tags),self.osm.settings_fingerprint)
+
+    # Returns True if an object was built from the same coordinates, tags and materials.
+    def isUnchanged(self,object):
+        return object.osm.fingerprint==self.getFingerprint() and object.osm.material_fingerprint==self.osm.getMaterialFingerprint(self.materials)
+
+    # Takes the object of an unchanged way as it is. Only area and bounds are read from its mesh, as z-sorting needs them.
+    def useObject(self,object):
+        self.object = object
+        if self.geometry:
+            self.area = self.geometry.getArea()
+            self.bounds = self.geometry.getBounds()
+
+    # Returns the projected coordinates of the nodes as Vectors.
+    def getCoords(self):
+        return [Vector(co) for co in self.osm.store.getCoords(self.nodes)]
+
     def getCenter(self):
         v = Vector((0.0,0.0,0.0))
-        for node in self.nodes:
-            v+=node.co
+        for co in self.getCoords():
+            v+=co
         return v/len(self.nodes)
 
     def alignObjects(self):
@@ -669,108 +1633,30 @@ class Way():
         
         for i in range(0,len(self.nodes)):
             # check for referenced objects and align them with center edge on xy plane, means rotate on z-axis only
-            if self.nodes[i].object:
+            node = self.osm.getNodeObject(self.nodes[i])
+            if node and node.object:
                 normal = self.geometry.normals[i]
                 rot = normal.to_track_quat('X','Z').to_euler()
-                self.nodes[i].object.rotation_euler = rot
+                node.object.rotation_euler = rot
 
                 # offset the object to the side so it's next to a road
                 if self.type=='trafficway' and self.geometry.width>0:
                     offset = normal*(self.geometry.width/2)
+                    co = Vector(self.osm.store.getCo(self.nodes[i]))
                     if self.osm.right_hand_traffic:
-                        self.nodes[i].object.location = self.nodes[i].co-offset
+                        node.object.location = co-offset
                     else:
-                        self.nodes[i].object.location = self.nodes[i].co+offset
-
-    def setMaterials(self):
-        mat = None
-        roof_mat = None
-        basement_mat = None
-
-        lanes = 1
-        if 'lanes' in self.tags:
-            lanes = int(self.tags['lanes'].value)
-
-        priority = -1
-        roof_priority = -1
-        basement_priority = -1
-
-#        name = self.name+'_'+self.id
-#        if 'name' in self.tags:
-#            name = self.tags['name'].value
-#        print('\n%s: setting Materials...' % name)
-
-        for name in self.tags:
-            tag = self.tags[name]
-            tag_configs = self.osm.getTagConfig(tag.name,tag.value)
-            if len(tag_configs)>0:
-                for tag_config in tag_configs:
-                    for material in tag_config.materials:
-                        has_priority = False
-                        mat_tag = tag_config.getTagInList(material.osm.tags)
-                        tag_priority = mat_tag.priority
-
-#                        print('Tag: %s = %s - Prio: %d' %(mat_tag.name,mat_tag.value,tag_priority))
-
-                        # We have to check individual building parts as they need different priorities
-                        if material.osm.base_type=='building':
-                            if material.osm.building_part=='facade':
-                                has_priority = priority<=tag_priority
-                                if has_priority:
-                                    priority = tag_priority
-                            elif material.osm.building_part in ('sloped_roof','flat_roof'):
-                                has_priority = roof_priority<=tag_priority
-                                if has_priority:
-                                    roof_priority = tag_priority
-                            elif material.osm.building_part=='basement':
-                                has_priority = basement_priority<=tag_priority
-                                if has_priority:
-                                    basement_priority = tag_priority
-                        else:
-                            has_priority = priority<=tag_priority
-                            if has_priority:
-                                    priority = tag_priority
+                        node.object.location = co+offset
 
-                        if has_priority:
-                            # check if we have mandatory tags
-                            mandatory = getMandatoryTags(material)
-                            found = 0
-                            for i in range(0,len(mandatory)):
-                                if mandatory[i].name in self.tags:
-                                    if mandatory[i].value=='' or self.tags[mandatory[i].name].value==mandatory[i].value:
-                                        found+=1
+    # Returns the value of a tag or default if the way has no such tag.
+    def getTag(self,name,default = None):
+        return self.osm.tags.get(self.tags,name,default)
 
-#                            if len(mandatory)>0:
-#                                print('Material %s: has mandatory tags' % material.name)
-#                                if found==len(mandatory):
-#                                    print('all mandatory tags present')
-
-                            if len(mandatory)==0 or found==len(mandatory):
-#                                print('Material type: %s' % material.osm.base_type)
+    def hasTag(self,name):
+        return self.osm.tags.has(self.tags,name)
 
-                                if material.osm.base_type == 'building':
-#                                    print('Building part: %s' % material.osm.building_part)
-                                    if material.osm.building_part=='facade':
-                                        mat = material
-                                    elif material.osm.building_part in ('flat_roof','sloped_roof'):
-                                        roof_mat = material
-                                    elif material.osm.building_part=='basement':
-                                        basement_mat = material
-                                if material.osm.base_type == 'trafficway':
-                                    # prefer materials with matching lanes
-                                    if mat==None or mat.osm.lanes!=lanes:
-                                        mat = material
-                                if material.osm.base_type == 'area':
-                                    mat = material
-
-        if mat:
-            self.materials.append(mat)
-#            print('Base material: %s' % mat.name)
-        if roof_mat:
-            self.materials.append(roof_mat)
-#            print('Roof material: %s' % roof_mat.name)
-        if basement_mat:
-            self.materials.append(basement_mat)        
+    def setMaterials(self):
+        self.materials = self.osm.getMaterials(self.tags)
 
     def getMaterial(self,index = 0):
         if index < len(self.materials):
@@ -782,11 +1668,7 @@ class Way():
         self.type = None
 
         if len(self.materials)>0:
-            self.type = self.materials[0].osm.base_type
-            if self.type in ('building','area') and self.isClosed()==False:
-                self.type = 'trafficway'
-            if self.type in ('trafficway') and self.isClosed():
-                self.type = 'area'
+            self.type = self.osm.getWayType(self.materials[0].osm.base_type,self.isClosed())
     
     def setOffset(self,offset):
         if self.object:
@@ -794,35 +1676,15 @@ class Way():
             self.object.location[2] = offset
 
     def isClockwise(self):
-        pos = 0
-        neg = 0
-        num = len(self.nodes)-1
-
-        for i in range(0,num):
-            v1 = Vector((self.nodes[(i-1) % num].co[0],self.nodes[(i-1) % num].co[1]))
-            v2 = Vector((self.nodes[i].co[0],self.nodes[i].co[1]))
-            v3 = Vector((self.nodes[(i+1) % num].co[0],self.nodes[(i+1) % num].co[1]))
-
-            cross = (v2[0]-v1[0])*(v3[1]-v2[1]) - (v2[1]-v1[1])*(v3[0]-v2[0])
-
-            if cross>0:
-                pos+=1
-            if cross<0:
-                neg+=1
-
-        return neg>=pos
+        return osm_geometry.isClockwise(self.osm.store.getCoords(self.nodes))
 
     def isClosed(self):
-        num = len(self.nodes)
-        for i in range(0,3):
-            if self.nodes[0].co[i]!=self.nodes[num-1].co[i]:
-                return False
-        return True
+        store = self.osm.store
+        return store.getCo(self.nodes[0])==store.getCo(self.nodes[-1])
 
 
 class Geometry():
-    way = None
-    normals = []
+    __slots__ = ('way','normals')
 
     def __init__(self,way):
         self.way = way
@@ -830,11 +1692,18 @@ class Geometry():
         self.setNormals()
 
     def setNormals(self):
-        for i in range(0,len(self.way.nodes)):
-            self.normals.append(self.getNodeNormal(i))
+        coords = self.way.osm.store.getCoords(self.way.nodes)
+        self.normals = [Vector(normal) for normal in osm_geometry.getNormals(coords,self.way.isClosed())]
+
+    # Returns the mesh of a new object, see <Way.createObject>.
+    def createMesh(self):
+        return bpy.data.meshes.new(self.way.name)
 
     # TODO: check if a group with the osm-property "name" with same name as the way exists and use that instead of generic mesh
-    def generate(self,rebuild):
+    # Method: prepare
+    # Sets up the object and returns the job building the mesh buffers with the geometry kernel, see <osm_geometry.runJob>.
+    # Jobs only hold plain values, so they can be built by worker processes. None is returned if there is nothing to build.
+    def prepare(self,rebuild):
         if rebuild==False:
             mesh = self.way.object.data
 
@@ -846,7 +1715,14 @@ class Geometry():
             
             edge_split = self.way.object.modifiers.new(name="edge_split",type="EDGE_SPLIT")
             edge_split.split_angle = math.radians(40.00)
-            
+        return None
+
+    # Method: upload
+    # Writes the mesh buffers built by the job of <prepare> to the mesh of the object.
+    def upload(self,rebuild,data):
+        if data:
+            data.write(self.way.object.data,rebuild)
+
     def getArea(self):
         area = 0.0
         for face in self.way.object.data.faces:
@@ -871,319 +1747,121 @@ class Geometry():
         y_max-=self.way.object.location[1]/2
         
         return ((x_min,y_min),(x_max,y_max))
-        
-    def getNodeNormal(self,i):
-        upvector = Vector((0.0,0.0,1.0))
-        closed = self.way.isClosed()
 
-        if closed:
-            num = len(self.way.nodes)-1
-        else:
-            num = len(self.way.nodes)
-
-        if i>0:
-            start_v = self.way.nodes[i-1].co
-        else:
-            if closed:
-                start_v = self.way.nodes[num-1].co
-            else:
-                start_v = self.way.nodes[i].co
-                
-        if i<num-1:
-            end_v = self.way.nodes[i+1].co
-        else:
-            if closed:
-                end_v = self.way.nodes[0].co
-            else:
-                end_v = self.way.nodes[i].co
-
-        return (start_v-end_v).normalized().cross(upvector)
-    
 
 class Building(Geometry):
-    height = None
-    levels = 0
+    __slots__ = ('height','levels','footprint','shared')
 
     def __init__(self,way):
         super(Building,self).__init__(way)
         self.levels = None
         self.height = None
+        self.footprint = None
+        self.shared = None
         self.setHeight()
         
     def setHeight(self):
         material = self.way.getMaterial()
 
-        if 'height' in self.way.tags:
-            self.height = self.way.osm.getMeters(self.way.tags['height'].value)
+        if self.way.hasTag('height'):
+            self.height = self.way.osm.getMeters(self.way.getTag('height'))
             self.levels = self.height/material.osm.building_level_height
         else:
             self.levels = material.osm.building_default_levels
             self.height = self.levels*material.osm.building_level_height
             
-    def generate(self,rebuild):
-        super(Building,self).generate(rebuild)
-
-        self.createFacade(rebuild)
-
-        roof_mat = self.way.getMaterial(1)
-        
-        if roof_mat:
-            roof_type = roof_mat.osm.building_part
-
-            if roof_type=='flat_roof':
-                self.createFlatRoof(rebuild)
-            elif roof_type=='sloped_roof':
-                self.createSlopedRoof(rebuild)
+    # Buildings with the same footprint up to translation and rotation, the same height and materials share one mesh.
+    def createMesh(self):
+        self.footprint = None
+        self.shared = None
+        if self.way.osm.share_meshes and len(self.way.nodes)>3:
+            self.footprint = self.getFootprint()
+            self.shared = self.way.osm.getSharedMesh(self.footprint)
+            if self.shared:
+                return self.shared[0]
+        return super(Building,self).createMesh()
+
+    # Returns the footprint of the building as a signature of everything but the corners, the center of the corners
+    # and the corners counterclockwise around the center.
+    def getFootprint(self):
+        coords = self.way.osm.store.getCoords(self.way.nodes)[:-1]
+        if self.way.isClockwise():
+            coords.reverse()
+        num = len(coords)
+        center = (sum([co[0] for co in coords])/num,sum([co[1] for co in coords])/num)
+        coords = [(co[0]-center[0],co[1]-center[1]) for co in coords]
+        signature = '%d:%r:%r:%s:%s' % (num,self.height,self.levels,self.getRoofShape(),self.way.osm.getMaterialFingerprint(self.way.materials))
+        return (signature,center,coords)
+
+    def prepare(self,rebuild):
+        if self.footprint:
+            # shared meshes are built around the center of the footprint
+            center = self.footprint[1]
+            object = self.way.object
+            object.location = Vector((center[0],center[1],object.location[2]))
+            if self.shared:
+                object.rotation_euler[2] = self.shared[1]
+                return super(Building,self).prepare(rebuild)
+
+        super(Building,self).prepare(rebuild)
 
-    def createFacade(self,rebuild):
         material = self.way.getMaterial()
-
-        num = len(self.way.nodes)-1 # first and last are at the same location, so we do not need the last node
-        v_num = num*2
-        mesh = self.way.object.data
-
-        if rebuild==False:
-            mesh.vertices.add(v_num)
-            mesh.edges.add(num*3)
-            mesh.faces.add(num)
-
-        # TODO: we have to reverse node order if direction is counter clockwise.
-        clockwise = self.way.isClockwise()
-        if clockwise:
-            self.way.nodes.reverse()
-
-        for i in range(0,num):
-            # bottom
-            mesh.vertices[i].co = self.way.nodes[i].co-self.way.object.location
-            if rebuild==False:
-                mesh.edges[i].vertices = [i,(i+1) % num]
-
-            # top
-            mesh.vertices[i+num].co = self.way.nodes[i].co.copy()-self.way.object.location
-            if rebuild==False:
-                mesh.edges[i+num].vertices = [i+num,((i+1) % num)+num]
-
-            mesh.vertices[i+num].co[2]+=self.height
-
-            # joining edge
-            if rebuild==False:
-                mesh.edges[v_num+i].vertices = [i,i+num]
-
-            # wall
-            if rebuild==False:
-                if i==num-1: # last one needs inverted direction
-                    mesh.faces[i].vertices_raw = [i,0,num,v_num-1]
-                else:
-                    mesh.faces[i].vertices_raw = [i,i+1,(i+num+1) % v_num,(i+num) % v_num]
-
-            if rebuild==False:
-                mesh.faces[i].use_smooth = True
-                mesh.faces[i].material_index = 0
-
-        # create uvs
-        if rebuild:
-            uv_texture = mesh.uv_textures[0]
+        coords = self.way.osm.store.getCoords(self.way.nodes)
+        roof_type = self.getRoofType()
+        if roof_type=='flat_roof':
+            roof = 'flat'
+        elif roof_type=='sloped_roof':
+            roof = self.getRoofShape()
         else:
-            uv_texture = mesh.uv_textures.new()
-
-        # facade uvs
-        uv_x = 0.0
-
-        # uv factors
-        level_height = material.osm.building_level_height
-        texture_levels = material.osm.building_levels
-        height = self.levels/texture_levels
-
-        for i in range(0,num):
-            uv_face = uv_texture.data[i]
-            mesh_face = mesh.faces[i]
-            # calculate width of uv face using face area and height
-            face_width = mesh_face.area/self.height
-            width = face_width/(level_height*texture_levels)
-
-            uv = []
-            uv.append((uv_x,height))
-            uv.append((uv_x+width,height))
-            uv.append((uv_x+width,0.0))
-            uv.append((uv_x,0.0))
-
-            # set uvs
-            uv_face.uv_raw = (uv[3][0],uv[3][1],uv[2][0],uv[2][1],uv[1][0],uv[1][1],uv[0][0],uv[0][1])
-
-            uv_x+=width
-
-    def createFlatRoof(self,rebuild):
-        material = self.way.getMaterial(1)
-        mesh = self.way.object.data
-        num = len(self.way.nodes)-1
-
-        from mathutils import geometry
-
-        if rebuild==False:
-            # roof
-            veclist = []
-            for i in range(num,num*2):
-                veclist.append(mesh.vertices[i].co)
-
-            fill_vecs = geometry.tesselate_polygon([veclist])
-
-            # add new edges and faces
-            mesh.faces.add(len(fill_vecs))
-            mesh.edges.add(len(fill_vecs)*3)
-            for i in range(0,len(fill_vecs)):
-                v1 = fill_vecs[i][0]+num
-                v2 = fill_vecs[i][1]+num
-                v3 = fill_vecs[i][2]+num
-                mesh.faces[i+num].vertices = [v3,v2,v1]
-                mesh.faces[i+num].use_smooth = True
-                mesh.faces[i+num].material_index = 1 # roof material
-                mesh.edges[i+(num*3)].vertices = [v1,v2]
-                mesh.edges[i+(num*3)+1].vertices = [v2,v3]
-                mesh.edges[i+(num*3)+2].vertices = [v3,v1]
-
-            mesh.validate()
-
-        # roof uvs
-        uv_texture = mesh.uv_textures[0]
-
-        # get roof angle
-        roof_normal = Vector((0.0,0.0,0.0))
-        for i in range(0,num):
-            roof_normal+=self.normals[i]
-        roof_normal = roof_normal/num
-        rot = roof_normal.to_track_quat('X','Z').to_euler()
-
-        for i in range(num,len(mesh.faces)):
-            uv_face = uv_texture.data[i]
-            mesh_face = mesh.faces[i]
-
-            v1 = mesh.vertices[mesh_face.vertices[0]].co.copy()
-            v2 = mesh.vertices[mesh_face.vertices[1]].co.copy()
-            v3 = mesh.vertices[mesh_face.vertices[2]].co.copy()
-            if len(mesh_face.vertices)==4:
-                v4 = mesh.vertices[mesh_face.vertices[3]].co.copy()
-            else:
-                v4 = Vector((0.0,0.0,0.0))
+            roof = None
 
-            v1.rotate(rot)
-            v2.rotate(rot)
-            v3.rotate(rot)
-            v4.rotate(rot)
+        # buildings prepared later on may share the mesh before it is uploaded
+        if self.footprint:
+            self.way.osm.addSharedMesh(self.footprint,self.way.object.data)
 
-            uv_face.uv_raw = (v1[0],v1[1],v2[0],v2[1],v3[0],v3[1],v4[0],v4[1])
+        return (osm_geometry.buildBuilding,(coords,tuple(self.way.object.location),self.height,self.levels,material.osm.building_level_height,material.osm.building_levels,roof,self.getRoofSlope()))
 
-    def createSlopedRoof(self,rebuild):
-        self.createFlatRoof(rebuild)
-        num = len(self.way.nodes)-1
+    def upload(self,rebuild,data):
+        if data is None:
+            return
 
         mesh = self.way.object.data
+        if rebuild and (len(mesh.vertices)!=data.getNumVertices() or len(mesh.faces)!=data.getNumFaces()):
+            # the skeleton of a sloped roof changes with its shape, the old mesh is replaced by one with the new number of faces
+            mesh = bpy.data.meshes.new(self.way.name)
+            for material in self.way.object.data.materials:
+                mesh.materials.append(material)
+            self.way.object.data = mesh
+            rebuild = False
+
+        data.write(mesh,rebuild)
+
+    # Returns the building part of the roof material, None without a roof material.
+    def getRoofType(self):
+        roof_mat = self.way.getMaterial(1)
+        if roof_mat:
+            return roof_mat.osm.building_part
+        return None
 
-        # select roof faces
-        roof_faces = []
-        for i in range(num,len(mesh.faces)):
-            roof_faces.append(mesh.faces[i])
-
-        material = self.way.getMaterial(1)
-        height = material.osm.building_levels*material.osm.building_level_height
-
-        self.do_inset(mesh, roof_faces, 100, height*10, True, True)
-
-        # roof uvs
-        uv_texture = mesh.uv_textures[0]
-
-        # get roof angle
-        roof_normal = Vector((0.0,0.0,0.0))
-        for i in range(0,num):
-            roof_normal+=self.normals[i]
-        roof_normal = roof_normal/num
-        rot = roof_normal.to_track_quat('X','Z').to_euler()
-        
-        for i in range(num,len(mesh.faces)):
-            uv_face = uv_texture.data[i]
-            mesh_face = mesh.faces[i]
-
-            v1 = mesh.vertices[mesh_face.vertices[0]].co.copy()
-            v2 = mesh.vertices[mesh_face.vertices[1]].co.copy()
-            v3 = mesh.vertices[mesh_face.vertices[2]].co.copy()
-            if len(mesh_face.vertices)==4:
-                v4 = mesh.vertices[mesh_face.vertices[3]].co.copy()
-            else:
-                v4 = Vector((0.0,0.0,0.0))
-
-            #rot = mesh_face.normal.copy().to_track_quat('Y','X').to_euler()
-
-            v1.rotate(rot)
-            v2.rotate(rot)
-            v3.rotate(rot)
-            v4.rotate(rot)
-
-            uv_face.uv_raw = (v1[0],v1[1],v2[0],v2[1],v3[0],v3[1],v4[0],v4[1])
-
-    def do_inset(self, mesh, faces, amount, height, region, as_percent):
-        from mesh_inset import geom
-        from mesh_inset import model
-        from mesh_inset import offset
-        from mesh_inset import triquad
+    # Returns the shape of a sloped roof, the roof:shape tag of the way or else the shape of the roof material.
+    def getRoofShape(self):
+        if self.way.hasTag('roof:shape') and self.way.getTag('roof:shape') in ('hipped','gabled'):
+            return self.way.getTag('roof:shape')
+        roof_mat = self.way.getMaterial(1)
+        if roof_mat and roof_mat.osm.building_part=='sloped_roof':
+            return roof_mat.osm.roof_shape
+        return None
 
-        if amount <= 0.0:
-            return
-        pitch = math.atan(height / amount)
-        selfaces = []
-        selface_indices = []
-        for face in faces:
-            selfaces.append(face)
-            selface_indices.append(face.index)
-        m = geom.Model()
-        # if add all mesh.vertices, coord indices will line up
-        # Note: not using Points.AddPoint which does dup elim
-        # because then would have to map vertices in and out
-        m.points.pos = [v.co.to_tuple() for v in mesh.vertices]
-        for f in selfaces:
-            m.faces.append(list(f.vertices))
-            m.face_data.append(f.index)
-        orig_numv = len(m.points.pos)
-        orig_numf = len(m.faces)
-        model.BevelSelectionInModel(m, amount, pitch, True, region, as_percent)
-        if len(m.faces) == orig_numf:
-            # something went wrong with Bevel - just treat as no-op
-            return
-        # blender_faces: newfaces but all 4-tuples and no 0
-        # in 4th position if a 4-sided poly
-        blender_faces = []
-        blender_old_face_index = []
-        for i in range(orig_numf, len(m.faces)):
-            f = m.faces[i]
-            if len(f) == 3:
-                blender_faces.append(list(f) + [0])
-                blender_old_face_index.append(m.face_data[i])
-            elif len(f) == 4:
-                if f[3] == 0:
-                    blender_faces.append([f[3], f[0], f[1], f[2]])
-                else:
-                    blender_faces.append(f)
-                blender_old_face_index.append(m.face_data[i])
-        num_new_vertices = len(m.points.pos) - orig_numv
-        mesh.vertices.add(num_new_vertices)
-        for i in range(orig_numv, len(m.points.pos)):
-            mesh.vertices[i].co = mathutils.Vector(m.points.pos[i])
-        start_faces = len(mesh.faces)
-        mesh.faces.add(len(blender_faces))
-        for i, newf in enumerate(blender_faces):
-            mesh.faces[start_faces + i].vertices_raw = newf
-            # copy face attributes from old face that it was derived from
-            bfi = blender_old_face_index[i]
-            if bfi and 0 <= bfi < start_faces:
-                bfacenew = mesh.faces[start_faces + i]
-                bface = mesh.faces[bfi]
-                bfacenew.material_index = bface.material_index
-                bfacenew.use_smooth = bface.use_smooth
-        mesh.update(calc_edges=True)
-        #TODO: remove original faces
+    # Returns the rise of a sloped roof per unit of run, the roof rises by the height of the levels of the roof material every 10 units.
+    def getRoofSlope(self):
+        roof_mat = self.way.getMaterial(1)
+        if roof_mat and roof_mat.osm.building_part=='sloped_roof':
+            return roof_mat.osm.building_levels*roof_mat.osm.building_level_height/10.0
+        return 0.0
 
 
 class Trafficway(Geometry):
-    width = 0.0
-    lanes = 1
+    __slots__ = ('width','lanes')
 
     def __init__(self,way):
         super(Trafficway,self).__init__(way)
@@ -1194,42 +1872,40 @@ class Trafficway(Geometry):
     def setWidth(self):
         material = self.way.getMaterial()
 
-        if 'lanes' in self.way.tags:
-            self.lanes = int(self.way.tags['lanes'].value)
+        if self.way.hasTag('lanes'):
+            self.lanes = int(self.way.getTag('lanes'))
         self.width = material.osm.lane_width*self.lanes
 
-    def generate(self,rebuild):
-        super(Trafficway,self).generate(rebuild)
+    def prepare(self,rebuild):
+        super(Trafficway,self).prepare(rebuild)
 
         material = self.way.getMaterial()
+        if material and material.osm.base_type=='trafficway':
+            texture_lanes = material.osm.lanes
+        else:
+            texture_lanes = 2
 
-        from mathutils import Euler
+        coords = self.way.osm.store.getCoords(self.way.nodes)
+        return (osm_geometry.buildTrafficway,(coords,tuple(self.way.object.location),self.width,self.lanes,texture_lanes,self.getEnds()))
 
+    # Method: getEnds
+    # Returns the normals and widths of the endpoints, which are aligned with other trafficways sharing them, see <buildTrafficway>.
+    def getEnds(self):
+        ends = {}
         num = len(self.way.nodes)
-        v_num = len(self.way.nodes)*2
-
-        mesh = self.way.object.data
-        
-        if rebuild==False:
-            mesh.vertices.add(v_num)
-            mesh.faces.add(num-1)
-            mesh.edges.add(num+num+num-2)
-
-#        prev_normal = None
-
         for i in range(0,num):
             width = self.width
 
             # If an endpoint is shared with other ways we have to align it and create width transitions
-            if i==0 or i==num-1 and len(self.way.nodes[i].ways)>1:
+            if i==0 or i==num-1 and len(self.way.osm.getSharedWays(self.way.nodes[i]))>1:
                 node = self.way.nodes[i]
                 node_normal = self.normals[i]
                 normal = node_normal.copy()
                 num_shared = 1
                 
-                for shared_way in self.way.nodes[i].ways:
+                for shared_way in self.way.osm.getSharedWays(node):
                     if shared_way!=self.way and shared_way.type==self.way.type: # only use shared nodes from other trafficways
-                        shared_index = node.getIndexInWay(shared_way)
+                        shared_index = shared_way.nodes.index(node)
 
                         # found an endpoint
                         if shared_index==0 or shared_index==len(shared_way.nodes)-1: # only use endpoints
@@ -1247,143 +1923,26 @@ class Trafficway(Geometry):
                             if width>shared_way.geometry.width:
                                 width = shared_way.geometry.width
                 
-                normal = normal/num_shared
-            else:
-                normal = self.normals[i]
-
-            # TODO: on 90° turns or more we have to switch normal direction, maybe keep last normal and check if we switched from <0 to >0?
-
-            # be sure to make the z-axis of the normal 0
-            normal[2] = 0
-
-            offset = normal*(width/2)
-
-            # position vertices
-            ii = i*2
-
-            mesh.vertices[ii].co = self.way.nodes[i].co+offset-self.way.object.location # left
-            mesh.vertices[ii+1].co = self.way.nodes[i].co-offset-self.way.object.location # right
-
-            # joining edge
-            if rebuild==False:
-                mesh.edges[i].vertices = [ii,ii+1]
-
-                if i<num-1: # ignore last node, as it has no side edges
-                    # left edge
-                    mesh.edges[i+num].vertices = [ii,ii+2]
-                    # right edge
-                    mesh.edges[i+(num*2)-1].vertices = [ii+1,ii+3]
-
-                    # face
-                    mesh.faces[i].vertices_raw = [ii,ii+1,ii+3,ii+2]
-                    mesh.faces[i].use_smooth = True
-
-#            prev_normal = normal
-
-        if rebuild==False:
-            mesh.validate()
-
-        # create uvs
-        if rebuild:
-            uv_texture = mesh.uv_textures[0]
-        else:
-            uv_texture = mesh.uv_textures.new()
-
-        uv_y = 0.0
-
-        if material and material.osm.base_type=='trafficway':
-            texture_lanes = material.osm.lanes
-        else:
-            texture_lanes = 2
-
-        # uv height factors
-        width = self.lanes/texture_lanes
-        hf = 1/(self.width/self.lanes)
-
-        for i in range(0,len(uv_texture.data)):
-            uv_face = uv_texture.data[i]
-            mesh_face = mesh.faces[i]
-            
-            face_length = self.getNodeDistance(self.way.nodes[i],self.way.nodes[i+1])
-            height = hf*face_length
-
-            # set uvs
-            uv_face.uv_raw = (0.0,uv_y,width,uv_y,width,uv_y+height,0.0,uv_y+height)
-
-            uv_y+=height
-
-    def getNodeDistance(self,node_a,node_b):
-        return (node_a.co-node_b.co).magnitude
+                # TODO: on 90° turns or more we have to switch normal direction, maybe keep last normal and check if we switched from <0 to >0?
+                ends[i] = (tuple(normal/num_shared),width)
+        return ends
 
 
 class Area(Geometry):
+    __slots__ = ()
+
     def __init__(self,way):
         super(Area,self).__init__(way)
 
-    def generate(self,rebuild):
-        super(Area,self).generate(rebuild)
-
-        material = self.way.getMaterial()
-
-        num = len(self.way.nodes)-1 # first and last are at the same location, so we do not need the last node
-        mesh = self.way.object.data
-
-        if rebuild==False:
-            mesh.vertices.add(num)
-            mesh.edges.add(num)
-
-            for i in range(0,num):
-                mesh.vertices[i].co = self.way.nodes[i].co.copy()-self.way.object.location
-                mesh.edges[i].vertices = [i,(i+1) % num]
-
-            # fill
-            veclist = []
-            for i in range(0,num):
-                veclist.append(mesh.vertices[i].co)
-
-            fill_vecs = geometry.tesselate_polygon([veclist])
-
-            # add new edges and faces
-            mesh.faces.add(len(fill_vecs))
-            mesh.edges.add(len(fill_vecs)*3)
-            for i in range(0,len(fill_vecs)):
-                v1 = fill_vecs[i][0]
-                v2 = fill_vecs[i][1]
-                v3 = fill_vecs[i][2]
-                mesh.faces[i].vertices = [v3,v2,v1]
-                mesh.faces[i].use_smooth = True
-                mesh.edges[i].vertices = [v1,v2]
-                mesh.edges[i+1].vertices = [v2,v3]
-                if len(mesh.edges)>=i+2:
-                    mesh.edges[i+2].vertices = [v3,v1]
-
-            mesh.validate()
-
-            # create uvs
-            uv_texture = mesh.uv_textures.new()
-        else:
-            uv_texture = mesh.uv_textures[0]
-
-        for i in range(0,len(mesh.faces)):
-            uv_face = uv_texture.data[i]
-            mesh_face = mesh.faces[i]
-            v1 = mesh.vertices[mesh_face.vertices[0]].co.copy()
-            v2 = mesh.vertices[mesh_face.vertices[1]].co.copy()
-            if len(mesh_face.vertices)>=3:
-                v3 = mesh.vertices[mesh_face.vertices[2]].co.copy()
-            else:
-                v3 = (0.0,0.0)
-            if len(mesh_face.vertices)==4:
-                v4 = mesh.vertices[mesh_face.vertices[3]].co.copy()
-            else:
-                v4 = (0.0,0.0)
+    def prepare(self,rebuild):
+        super(Area,self).prepare(rebuild)
 
-            uv_face.uv_raw = (v1[0],v1[1],v2[0],v2[1],v3[0],v3[1],v4[0],v4[1])
+        coords = self.way.osm.store.getCoords(self.way.nodes)
+        return (osm_geometry.buildArea,(coords,tuple(self.way.object.location)))
 
 
 class Barrier(Geometry):
-    height = None
-    width = 0.0
+    __slots__ = ('height','width')
 
     def __init__(self,way):
         super(Barrier,self).__init__(way)
@@ -1394,54 +1953,45 @@ class Barrier(Geometry):
         material = self.way.getMaterial()
         self.width = material.osm.barrier_width
 
-    def generate(self,rebuild):
-        super(Barrier,self).generate(rebuild)
+    def prepare(self,rebuild):
+        return super(Barrier,self).prepare(rebuild)
 
 
+# A tagged node, which may become an object. Its coordinates are kept in the node store of the OSM instance.
 class Node():
-    id = None
-    lat = 0.0
-    lon = 0.0
-    ele = 0.0
-    co = Vector((0.0,0.0,0.0))
-    tags = {}
-    type = None
-    osm = None
-    object = None
-    name = None
-    level = 0
-    ways = []
-
-    def __init__(self,xml,osm):
+    __slots__ = ('id','index','tags','type','osm','object','name','level')
+
+    def __init__(self,element,index,osm):
         self.osm = osm
-        self.id = xml.attributes['id'].value
-        self.lat = float(xml.attributes['lat'].value)
-        self.lon = float(xml.attributes['lon'].value)
+        self.id = int(element.attributes['id'])
+        self.index = index
+        self.type = None
         self.object = None
         self.name = None
         self.level = 0
-        self.ways = []
-
-        if 'ele' in xml.attributes:
-            self.ele = float(xml.attributes['ele'].value)
-
-        self.co = self.osm.getCoordinates((self.lat,self.lon,self.ele))
-        self.tags = self.osm.getTags(xml)
+        self.tags = self.osm.getTags(element)
         self.setLevel()
 
     def setLevel(self):
-        if 'level' in self.tags:
+        if self.hasTag('level'):
             try:
-                self.level = char(int(self.tags['level'].value))
+                self.level = char(int(self.getTag('level')))
             except:
                 self.level = -1
 
+    # Returns the value of a tag or default if the node has no such tag.
+    def getTag(self,name,default = None):
+        return self.osm.tags.get(self.tags,name,default)
+
+    def hasTag(self,name):
+        return self.osm.tags.has(self.tags,name)
+
     def setName(self):
         if self.type:
-            if 'name' in self.tags:
-                self.name = self.tags['name'].value
+            if self.hasTag('name'):
+                self.name = self.getTag('name')
             else:
-                self.name = self.type+'_'+self.id
+                self.name = self.type+'_'+str(self.id)
 
     def generate(self,rebuild, object = None):
          if len(self.tags)>0 and self.level>=0:
@@ -1454,25 +2004,51 @@ class Node():
     def createObject(self,rebuild, object):
         if rebuild==False:
             self.object = bpy.data.objects.new(self.name,None)
-            self.object.osm.id = self.id
+            self.object.osm.id = str(self.id)
             self.object.osm.name = self.name
-            for tag in self.tags:
+            for (name,value) in self.osm.tags.items(self.tags):
                 obj_tag = self.object.osm.tags.add()
-                obj_tag.name = self.tags[tag].name
-                obj_tag.value = self.tags[tag].value
+                obj_tag.name = name
+                obj_tag.value = value
                 
             #self.osm.scene.objects.link(self.object)
         elif object:
             self.object = object
-        
+
+        if self.object:
+            self.object.osm.fingerprint = self.getFingerprint()
+            self.object.osm.material_fingerprint = self.getGroupName()
+
+    # Returns the fingerprint of the coordinates and tags, see <getFingerprint>.
+    def getFingerprint(self):
+        store = self.osm.store
+        return getFingerprint(array('d',(store.lat[self.index],store.lon[self.index],store.ele[self.index])),self.osm.tags.items(self.tags),self.osm.settings_fingerprint)
+
+    # Returns True if an object was built from the same coordinates, tags and group.
+    def isUnchanged(self,object):
+        return object.osm.fingerprint==self.getFingerprint() and object.osm.material_fingerprint==self.getGroupName()
+
+    def getGroupName(self):
+        group = self.getGroup()
+        if group:
+            return group.name
+        return ''
+
     def create(self,rebuild):
-        self.object.location = self.co
+        self.object.location = Vector(self.osm.store.getCo(self.index))
+        group = self.getGroup()
+
+        if group:
+            self.object.dupli_type = 'GROUP'
+            self.object.dupli_group = group
+
+    # Returns the group with the highest priority matching the tags or None.
+    def getGroup(self):
         group = None
         priority = -1
         
-        for name in self.tags:
-            tag = self.tags[name]
-            tag_configs = self.osm.getTagConfig(tag.name,tag.value)
+        for (name,value) in self.osm.tags.idItems(self.tags):
+            tag_configs = self.osm.getTagConfigByIds(name,value)
             if len(tag_configs)>0:
                 for tag_config in tag_configs:
                     for tag_group in tag_config.groups:
@@ -1484,18 +2060,13 @@ class Node():
                             mandatory = getMandatoryTags(tag_group)
                             found = 0
                             for i in range(0,len(mandatory)):
-                                if mandatory[i].name in self.tags:
-                                    if mandatory[i].value=='' or self.tags[mandatory[i].name].value==mandatory[i].value:
+                                mandatory_value = self.getTag(mandatory[i].name)
+                                if mandatory_value is not None:
+                                    if mandatory[i].value=='' or mandatory_value==mandatory[i].value:
                                         found+=1
 
                             if found==len(mandatory):
                                 group = tag_group
                                 priority = tag_priority
 
-        if group:
-            self.object.dupli_type = 'GROUP'
-            self.object.dupli_group = group
-
-    def getIndexInWay(self,way):
-        from operator import indexOf
-        return indexOf(way.nodes,self)
\ No newline at end of file
+        return group
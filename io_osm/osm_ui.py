@@ -20,11 +20,17 @@ class SCENE_PT_OSM(bpy.types.Panel):
         if osm.file!='':
             row = layout.row()
             row.label('File: '+path.basename(osm.file))
+            if len(osm.merge_files)>0:
+                row.label('+ %d merged' % len(osm.merge_files))
             row = layout.row()
             row.operator('scene.remove_osm')
             row = layout.row()
             if path.exists(osm.file):
                 row.operator('scene.rebuild_osm')
+                row.operator('scene.update_osm')
+                if len(osm.change_files)>0:
+                    row = layout.row()
+                    row.label('Changes applied: %d' % len(osm.change_files))
             else:
                 row.label('Warning: Cannot rebuild because OSM file has been removed!')
                 
@@ -32,6 +38,37 @@ class SCENE_PT_OSM(bpy.types.Panel):
         row.prop(osm,'traffic_direction')
         row = layout.row()
         row.prop(osm,'offset_step')
+        row = layout.row()
+        row.prop(osm,'two_pass')
+        row = layout.row()
+        row.prop(osm,'use_cache')
+        row = layout.row()
+        row.prop(osm,'merge_meshes')
+        row = layout.row()
+        row.prop(osm,'share_meshes')
+        row = layout.row()
+        row.prop(osm,'workers')
+        row = layout.row()
+        row.prop(osm,'import_types')
+        row = layout.row()
+        row.prop(osm,'projection')
+        row = layout.row()
+        row.prop(osm,'tile_size')
+        if osm.tile_size>0 and osm.file!='':
+            row = layout.row()
+            row.label('Tiles: %d x %d' % (osm.tile_grid[0],osm.tile_grid[1]))
+            row = layout.row()
+            row.prop(osm,'tile')
+            row = layout.row()
+            row.operator('scene.load_osm_tile')
+            row.operator('scene.unload_osm_tile')
+        row = layout.row()
+        row.prop(osm,'clip')
+        if osm.clip!='none':
+            row = layout.row()
+            row.prop(osm,'clip_lat')
+            row = layout.row()
+            row.prop(osm,'clip_lon')
 
         row = layout.row()
         row.label('Geo-Bounds')
@@ -59,6 +96,8 @@ class MATERIAL_PT_OSM(bpy.types.Panel):
         box.prop(osm,'base_type')
         if osm.base_type=='building':
             box.prop(osm,'building_part')
+            if osm.building_part=='sloped_roof':
+                box.prop(osm,'roof_shape')
             if osm.building_part in ('facade','sloped_roof'):
                 box.prop(osm,'building_levels')
                 box.prop(osm,'building_level_height')
@@ -120,6 +159,10 @@ class OBJECT_PT_OSM(bpy.types.Panel):
             row = layout.row()
             row.label('Name: '+osm.name)
 
+        if len(osm.parts)>0:
+            row = layout.row()
+            row.label('Merged ways: %d' % len(osm.parts))
+
         if len(osm.tags)>0:
             row = layout.row()
             row.label('Tags')
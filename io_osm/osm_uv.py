@@ -0,0 +1,143 @@
+import math
+from array import array
+
+# NumPy is not shipped with every Blender build, UVs are computed in plain Python without it
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# below this number of faces plain Python is faster than setting up NumPy arrays
+NUMPY_MIN_FACES = 64
+
+# Function: segmentLengths
+# Returns the distances between consecutive coordinates.
+#
+# Parameters:
+#   list coords - (x,y,z) tuples.
+#   bool closed - Adds the distance from the last to the first coordinate.
+#   int dimensions - 2 measures in the xy plane only, 3 includes z.
+#
+# Returns:
+#   list - One distance per segment.
+def segmentLengths(coords,closed = False,dimensions = 2):
+    num = len(coords)
+    if closed:
+        ends = [coords[(i+1) % num] for i in range(0,num)]
+    else:
+        ends = coords[1:]
+
+    if numpy and num>=NUMPY_MIN_FACES:
+        a = numpy.array(coords[:len(ends)],dtype=numpy.float64)[:,:dimensions]
+        b = numpy.array(ends,dtype=numpy.float64)[:,:dimensions]
+        return numpy.sqrt(((b-a)**2).sum(axis=1)).tolist()
+
+    lengths = []
+    for i in range(0,len(ends)):
+        a = coords[i]
+        b = ends[i]
+        if dimensions==2:
+            lengths.append(math.sqrt((b[0]-a[0])**2+(b[1]-a[1])**2))
+        else:
+            lengths.append(math.sqrt((b[0]-a[0])**2+(b[1]-a[1])**2+(b[2]-a[2])**2))
+    return lengths
+
+# Function: stripUVs
+# Sets the UVs of quads following each other like the walls of a facade or the segments of a trafficway.
+# Every quad is as long as its segment times scale and continues where the previous one ended, across it spans size.
+# The UVs are given in the order of the quad vertices: start bottom, end bottom, end top, start top.
+#
+# Parameters:
+#   MeshData data - The mesh buffers.
+#   int first - Index of the first quad.
+#   list lengths - Length of every segment.
+#   float scale - UV length per unit of segment length.
+#   float size - UV size across the strip.
+#   string along - 'u' if the strip runs along u, 'v' if it runs along v.
+def stripUVs(data,first,lengths,scale,size,along = 'u'):
+    num = len(lengths)
+    if numpy and num>=NUMPY_MIN_FACES:
+        end = numpy.cumsum(numpy.array(lengths,dtype=numpy.float64)*scale)
+        start = numpy.concatenate(([0.0],end[:-1]))
+        zero = numpy.zeros(num)
+        across = numpy.full(num,size)
+        if along=='u':
+            uv = numpy.stack((start,zero,end,zero,end,across,start,across),axis=1)
+        else:
+            uv = numpy.stack((zero,start,across,start,across,end,zero,end),axis=1)
+        data.uv[first*8:(first+num)*8] = array('f',uv.astype(numpy.float32).tobytes())
+        return
+
+    uv = data.uv
+    offset = 0.0
+    for i in range(0,num):
+        length = lengths[i]*scale
+        j = (first+i)*8
+        if along=='u':
+            uv[j:j+8] = array('f',(offset,0.0,offset+length,0.0,offset+length,size,offset,size))
+        else:
+            uv[j:j+8] = array('f',(0.0,offset,size,offset,size,offset+length,0.0,offset+length))
+        offset+=length
+
+# Function: planarUVs
+# Sets the UVs of faces to the x and y coordinates of their vertices, optionally rotated first, like a roof or an area seen from above.
+# The fourth UV of a triangle is 0.
+#
+# Parameters:
+#   MeshData data - The mesh buffers.
+#   int first - Index of the first face.
+#   int last - Index after the last face, by default the last face of the mesh.
+#   tuple rows - First and second row of a rotation matrix, see <getRotationRows>.
+def planarUVs(data,first = 0,last = None,rows = None):
+    if last is None:
+        last = data.getNumFaces()
+    if last<=first:
+        return
+
+    if numpy and last-first>=NUMPY_MIN_FACES:
+        indices = numpy.frombuffer(data.faces,dtype=numpy.intc)[first*4:last*4].reshape(-1,4)
+        co = numpy.frombuffer(data.co,dtype=numpy.float32).astype(numpy.float64).reshape(-1,3)[indices]
+        if rows:
+            uv = numpy.dot(co,numpy.array(rows,dtype=numpy.float64).T)
+        else:
+            uv = co[:,:,:2].copy()
+        uv[indices[:,3]==0,3] = 0.0
+        data.uv[first*8:last*8] = array('f',uv.astype(numpy.float32).tobytes())
+        return
+
+    co = data.co
+    faces = data.faces
+    uv = data.uv
+    if rows:
+        (rx,ry) = rows
+    for f in range(first,last):
+        for i in range(0,4):
+            v = faces[f*4+i]*3
+            j = f*8+i*2
+            if i==3 and v==0:
+                uv[j] = 0.0
+                uv[j+1] = 0.0
+            elif rows:
+                uv[j] = rx[0]*co[v]+rx[1]*co[v+1]+rx[2]*co[v+2]
+                uv[j+1] = ry[0]*co[v]+ry[1]*co[v+1]+ry[2]*co[v+2]
+            else:
+                uv[j] = co[v]
+                uv[j+1] = co[v+1]
+
+# Function: getRotationRows
+# Returns the first two rows of the rotation matrix of an Euler rotation, which give the x and y coordinates of rotated vectors.
+# The axes are rotated with Vector.rotate, so the result matches rotating every vertex on its own.
+#
+# Parameters:
+#   Euler rotation - The rotation.
+#
+# Returns:
+#   tuple - The two rows as (x,y,z) tuples.
+def getRotationRows(rotation):
+    from mathutils import Vector
+    axes = []
+    for axis in ((1.0,0.0,0.0),(0.0,1.0,0.0),(0.0,0.0,1.0)):
+        v = Vector(axis)
+        v.rotate(rotation)
+        axes.append(v)
+    return ((axes[0][0],axes[1][0],axes[2][0]),(axes[0][1],axes[1][1],axes[2][1]))
@@ -0,0 +1,74 @@
+import os
+import sys
+
+import pytest
+
+# the add-on is imported as the io_osm package, like Blender does, its modules for parsing and geometry do not need bpy
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# a small extract with every kind of element, nodes and ways are sorted by id like in files of the OSM API
+SAMPLE = '''<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6" generator="tests">
+ <bounds minlat="50.0000000" minlon="8.0000000" maxlat="50.0010000" maxlon="8.0020000"/>
+ <node id="1" lat="50.0000000" lon="8.0000000" version="1"/>
+ <node id="2" lat="50.0000000" lon="8.0010000" version="1"/>
+ <node id="3" lat="50.0010000" lon="8.0010000" version="1">
+  <tag k="natural" v="tree"/>
+ </node>
+ <node id="4" lat="50.0010000" lon="8.0000000" version="2" ele="12.5"/>
+ <way id="10" version="3">
+  <nd ref="1"/>
+  <nd ref="2"/>
+  <nd ref="3"/>
+  <nd ref="4"/>
+  <nd ref="1"/>
+  <tag k="building" v="yes"/>
+  <tag k="name" v="Fish &amp; Chips"/>
+ </way>
+ <way id="11" version="1">
+  <nd ref="2"/>
+  <nd ref="3"/>
+  <tag k="highway" v="residential"/>
+ </way>
+ <relation id="20" version="1">
+  <member type="way" ref="10" role="outer"/>
+  <member type="node" ref="3" role=""/>
+  <tag k="type" v="multipolygon"/>
+ </relation>
+</osm>
+'''
+
+# Function: writeFile
+# Fixture returning a function which writes text or bytes to a file in the temporary directory of a test and returns its path.
+@pytest.fixture
+def writeFile(tmp_path):
+    def write(name,content):
+        path = str(tmp_path/name)
+        file = open(path,'wb')
+        try:
+            file.write(content.encode('utf-8') if isinstance(content,str) else content)
+        finally:
+            file.close()
+        return path
+    return write
+
+# Function: sampleFile
+# Fixture writing <SAMPLE> to sample.osm.
+@pytest.fixture
+def sampleFile(writeFile):
+    return writeFile('sample.osm',SAMPLE)
+
+# Function: summarize
+# Returns the parts of elements the tests compare: name, id, version, coordinates, tags, node references and members.
+def summarize(elements):
+    result = []
+    for element in elements:
+        attributes = element.attributes
+        item = [element.name,str(attributes.get('id')),str(attributes.get('version','0'))]
+        if element.name=='node':
+            item.append((round(float(attributes['lat']),7),round(float(attributes['lon']),7)))
+        item.append(list(element.tags))
+        item.append([int(ref) for ref in element.refs])
+        item.append([tuple(member) for member in element.members])
+        result.append(item)
+    return result
@@ -0,0 +1,86 @@
+import os
+
+from io_osm import osm_cache
+from io_osm.osm_cache import OSMCache, OSMCacheWriter, getCachePath
+from io_osm.osm_parser import OSMParser, openParser
+
+from conftest import summarize
+from test_osm_parser import EXPECTED
+
+# Writes the cache of a file by reading all elements through the writer.
+def writeCache(filepath):
+    writer = OSMCacheWriter(OSMParser(filepath))
+    writer.readHeader()
+    elements = summarize(writer.elements())
+    assert writer.written
+    return elements
+
+def testRoundtrip(sampleFile):
+    assert writeCache(sampleFile)==EXPECTED
+    assert os.path.exists(getCachePath(sampleFile))
+
+    cache = OSMCache(sampleFile)
+    assert cache.isValid()
+    cache.readHeader()
+    assert cache.attributes=={'version':'0.6','generator':'tests'}
+    assert cache.bounds=={'minlat':50.0,'minlon':8.0,'maxlat':50.001,'maxlon':8.002}
+    assert summarize(cache.elements())==EXPECTED
+
+def testElevation(sampleFile):
+    writeCache(sampleFile)
+    nodes = [element for element in OSMCache(sampleFile).elements() if element.name=='node']
+    assert nodes[3].attributes['ele']==12.5
+    assert 'ele' not in nodes[0].attributes
+
+def testClose(sampleFile):
+    writeCache(sampleFile)
+    cache = OSMCache(sampleFile)
+    cache.readHeader()
+    assert cache.map is not None
+    list(cache.elements())
+    assert (cache.map,cache.view,cache.file,cache.arrays)==(None,None,None,{})
+
+    # a generator which is not read to the end closes the cache as well
+    elements = cache.elements()
+    next(elements)
+    elements.close()
+    assert cache.map is None
+
+    # reading again maps the cache again
+    assert summarize(cache.elements())==EXPECTED
+
+def testWriterReadsCacheAgain(sampleFile):
+    writer = OSMCacheWriter(OSMParser(sampleFile))
+    writer.readHeader()
+    list(writer.elements())
+    # the second pass of a two pass import reads the cache
+    assert summarize(writer.elements())==EXPECTED
+
+def testInvalidAfterChange(sampleFile):
+    writeCache(sampleFile)
+    file = open(sampleFile,'a')
+    try:
+        file.write('\n')
+    finally:
+        file.close()
+    assert not OSMCache(sampleFile).isValid()
+
+def testInvalidWithoutCache(sampleFile):
+    assert not OSMCache(sampleFile).isValid()
+
+def testVerifiedOnce(sampleFile,monkeypatch):
+    writeCache(sampleFile)
+    assert OSMCache(sampleFile).isValid()
+
+    # once the content matched, unchanged files are not hashed again
+    def getFileHash(filepath):
+        raise AssertionError('hashed again')
+    monkeypatch.setattr(osm_cache,'getFileHash',getFileHash)
+    assert OSMCache(sampleFile).isValid()
+
+def testOpenParser(sampleFile):
+    assert isinstance(openParser(sampleFile),OSMParser)
+    parser = openParser(sampleFile,True)
+    assert isinstance(parser,OSMCacheWriter)
+    list(parser.elements())
+    assert isinstance(openParser(sampleFile,True),OSMCache)
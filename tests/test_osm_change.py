@@ -0,0 +1,71 @@
+from io_osm.osm_change import OSMChange, ChangedParser
+from io_osm.osm_parser import OSMParser, openParser
+
+from conftest import summarize
+from test_osm_parser import EXPECTED
+
+CHANGE = '''<?xml version="1.0" encoding="UTF-8"?>
+<osmChange version="0.6" generator="tests">
+ <modify>
+  <node id="2" lat="50.0005000" lon="8.0010000" version="2"/>
+  <way id="11" version="2"><nd ref="2"/><nd ref="3"/><tag k="highway" v="service"/></way>
+  <way id="12" version="4"><nd ref="1"/><nd ref="4"/></way>
+ </modify>
+ <create>
+  <node id="-1" lat="50.0002000" lon="8.0002000" version="1"/>
+  <node id="-2" lat="50.0003000" lon="8.0002000" version="1"/>
+  <way id="-5" version="1"><nd ref="-1"/><nd ref="-2"/><tag k="barrier" v="fence"/></way>
+ </create>
+ <delete>
+  <node id="3" version="2"/>
+  <relation id="20" version="2"/>
+ </delete>
+</osmChange>
+'''
+
+def testRead(writeFile):
+    change = OSMChange([writeFile('change.osc',CHANGE)])
+    assert len(change)==8
+    assert sorted(change.nodes)==[-2,-1,2,3]
+    assert change.nodes[3] is None
+    assert change.nodes[2].attributes['lat']=='50.0005000'
+    assert sorted(change.ways)==[-5,11,12]
+    assert change.relations=={20:None}
+
+def testLaterFilesWin(writeFile):
+    first = writeFile('first.osc',CHANGE)
+    second = writeFile('second.osc','<osmChange version="0.6"><create><node id="3" lat="1.0" lon="2.0" version="3"/></create>'
+                                    '<delete><way id="-5"/></delete></osmChange>')
+    change = OSMChange([first,second])
+    assert change.nodes[3].attributes['version']=='3'
+    assert change.ways[-5] is None
+
+def testChangedParser(sampleFile,writeFile):
+    parser = ChangedParser(OSMParser(sampleFile),OSMChange([writeFile('change.osc',CHANGE)]))
+    parser.readHeader()
+    assert parser.bounds['minlat']=='50.0000000'
+    assert parser.filepath==sampleFile
+    # modified elements replace the ones of the file, created ones and modified ones missing in the file
+    # follow the elements of their type, ordered by id
+    assert summarize(parser.elements())==[
+        EXPECTED[0],
+        ['node','2','2',(50.0005,8.001),[],[],[]],
+        EXPECTED[3],
+        ['node','-2','1',(50.0003,8.0002),[],[],[]],
+        ['node','-1','1',(50.0002,8.0002),[],[],[]],
+        EXPECTED[4],
+        ['way','11','2',[('highway','service')],[2,3],[]],
+        ['way','-5','1',[('barrier','fence')],[-1,-2],[]],
+        ['way','12','4',[],[1,4],[]]]
+
+def testChangesWithoutData(writeFile):
+    # created elements are added even if the file has no elements of their type or none at all
+    path = writeFile('nodes.osm','<osm version="0.6"><node id="1" lat="0" lon="0"/></osm>')
+    change = OSMChange([writeFile('change.osc',CHANGE)])
+    elements = list(ChangedParser(OSMParser(path),change).elements())
+    assert [(element.name,int(element.attributes['id'])) for element in elements]==[('node',1),('node',-2),('node',-1),('node',2),('way',-5),('way',11),('way',12)]
+
+def testOpenParser(sampleFile,writeFile):
+    parser = openParser(sampleFile,False,1,[writeFile('change.osc',CHANGE)])
+    assert isinstance(parser,ChangedParser)
+    assert len(list(parser.elements()))==9
@@ -0,0 +1,134 @@
+import pytest
+
+from io_osm.osm_geometry import getNormals, isClockwise, buildBuilding, buildTrafficway, buildArea, runJob, buildBatch
+
+SQUARE = [(0.0,0.0,0.0),(10.0,0.0,0.0),(10.0,10.0,0.0),(0.0,10.0,0.0),(0.0,0.0,0.0)]
+RECTANGLE = [(0.0,0.0,0.0),(10.0,0.0,0.0),(10.0,6.0,0.0),(0.0,6.0,0.0),(0.0,0.0,0.0)]
+
+# Returns the vertex coordinates of the faces of buffers.
+def getFaces(data):
+    return [[data.getVertex(i) for i in data.getFace(f)] for f in range(0,data.getNumFaces())]
+
+# Returns the normal of a face, not normalized.
+def getNormal(face):
+    (a,b,c) = face[0:3]
+    u = (b[0]-a[0],b[1]-a[1],b[2]-a[2])
+    v = (c[0]-a[0],c[1]-a[1],c[2]-a[2])
+    return (u[1]*v[2]-u[2]*v[1],u[2]*v[0]-u[0]*v[2],u[0]*v[1]-u[1]*v[0])
+
+# Returns the coordinates of a list of tuples in one list, for pytest.approx.
+def flatten(items):
+    return [value for item in items for value in item]
+
+# Returns the area of a face projected on the xy plane, positive if it faces upwards.
+def getArea(face):
+    return sum([face[k-1][0]*face[k][1]-face[k][0]*face[k-1][1] for k in range(0,len(face))])/2
+
+def testNormals():
+    normals = getNormals([(0.0,0.0,0.0),(10.0,0.0,0.0),(10.0,10.0,0.0)],False)
+    assert flatten(normals)==pytest.approx([0.0,1.0,0.0,-0.7071068,0.7071068,0.0,-1.0,0.0,0.0])
+    # the normals of a closed way take the last node as neighbour of the first one
+    assert getNormals(SQUARE,True)[0]==pytest.approx((0.7071068,0.7071068,0.0))
+    assert getNormals([(0.0,0.0,0.0),(0.0,0.0,0.0)],False)==[(0.0,0.0,0.0),(0.0,0.0,0.0)]
+
+def testClockwise():
+    assert not isClockwise(SQUARE)
+    assert isClockwise(SQUARE[::-1])
+
+@pytest.mark.parametrize('coords',[SQUARE,SQUARE[::-1]])
+def testBuilding(coords):
+    data = buildBuilding(coords,(5.0,5.0,1.0),6.0,2,3.0,4)
+    assert data.getNumVertices()==8
+    assert data.getVertex(0)==(-5.0,-5.0,-1.0)
+    assert list(data.material_index)==[0,0,0,0,1,1]
+
+    faces = getFaces(data)
+    # walls face outwards, whichever direction the way runs
+    for face in faces[0:4]:
+        normal = getNormal(face)
+        center = [sum([co[i] for co in face])/4 for i in range(0,3)]
+        assert normal[2]==pytest.approx(0.0)
+        assert normal[0]*center[0]+normal[1]*center[1]>0
+        assert max([co[2] for co in face])==5.0
+    # the roof covers the footprint once, at the top of the walls, facing upwards
+    assert sum([getArea(face) for face in faces[4:]])==pytest.approx(100.0)
+    assert [co[2] for face in faces[4:] for co in face]==[5.0]*6
+
+    # walls are 10 long, a texture of 4 levels of 3 spans 12, the 2 levels of the building half of it
+    assert list(data.uv[0:8])==pytest.approx([0.0,0.0,10/12,0.0,10/12,0.5,0.0,0.5])
+    assert list(data.uv[24:32])==pytest.approx([30/12,0.0,40/12,0.0,40/12,0.5,30/12,0.5])
+
+def testBuildingWithoutRoof():
+    data = buildBuilding(SQUARE,(0.0,0.0,0.0),6.0,2,3.0,4,None)
+    assert data.getNumFaces()==4
+
+def testHippedRoof():
+    data = buildBuilding(RECTANGLE,(0.0,0.0,0.0),6.0,2,3.0,4,'hipped',0.5)
+    # two ridge nodes, the hips are triangles and the sides quads of two triangles
+    assert data.getNumVertices()==10
+    assert flatten(sorted([data.getVertex(i) for i in (8,9)]))==pytest.approx([3.0,3.0,7.5,7.0,3.0,7.5])
+    assert list(data.material_index)==[0]*4+[1]*6
+    faces = getFaces(data)
+    assert sum([getArea(face) for face in faces[4:]])==pytest.approx(60.0)
+    for face in faces[4:]:
+        assert getNormal(face)[2]>0
+
+def testGabledRoof():
+    data = buildBuilding(RECTANGLE,(0.0,0.0,0.0),6.0,2,3.0,4,'gabled',0.5)
+    # the ridge reaches the short walls, which get upright gables of the facade material
+    assert flatten(sorted([data.getVertex(i) for i in (8,9)]))==pytest.approx([0.0,3.0,7.5,10.0,3.0,7.5])
+    assert list(data.material_index)==[0]*4+[1]*4+[0]*2
+    faces = getFaces(data)
+    assert sum([getArea(face) for face in faces[4:8]])==pytest.approx(60.0)
+    for face in faces[8:]:
+        assert [co[0] for co in face] in ([0.0]*3,[10.0]*3)
+        assert sorted([co[2] for co in face])==[6.0,6.0,7.5]
+    # gables continue the facade of their wall upwards, the wall from corner 1 to 2 spans 6 and starts at 10
+    gable = [data.uv[i] for i in range(8*8,8*8+6)]
+    assert flatten(sorted(zip(gable[0::2],gable[1::2])))==pytest.approx([10/12,0.5,13/12,0.625,16/12,0.5])
+
+def testSlopedRoofFallback():
+    # without a valid skeleton, here because of the zero length wall, the roof is flat
+    coords = [(0.0,0.0,0.0),(10.0,0.0,0.0),(10.0,0.0,0.0),(10.0,6.0,0.0),(0.0,6.0,0.0),(0.0,0.0,0.0)]
+    data = buildBuilding(coords,(0.0,0.0,0.0),6.0,2,3.0,4,'hipped',0.5)
+    assert data.getNumVertices()==10
+    faces = getFaces(data)
+    assert [co[2] for face in faces[5:] for co in face]==[6.0]*(len(faces)-5)*3
+    assert sum([getArea(face) for face in faces[5:]])==pytest.approx(60.0)
+
+def testTrafficway():
+    coords = [(0.0,0.0,0.0),(10.0,0.0,0.0),(20.0,0.0,1.0)]
+    data = buildTrafficway(coords,(0.0,0.0,0.0),4.0,2,4)
+    assert data.getNumVertices()==6
+    # the normal of the middle node is tilted by the rising end and shortened by dropping its z
+    y = 2.0*20/401**0.5
+    assert flatten([data.getVertex(i) for i in range(0,4)])==pytest.approx([0.0,2.0,0.0,0.0,-2.0,0.0,10.0,y,0.0,10.0,-y,0.0])
+    assert list(data.faces)==[0,1,3,2,2,3,5,4]
+    # v runs along the trafficway, a lane is 2 wide and the texture has 4
+    assert list(data.uv[0:8])==pytest.approx([0.0,0.0,0.5,0.0,0.5,5.0,0.0,5.0])
+    assert data.uv[13]==pytest.approx(5.0+(101**0.5)/2)
+
+    # ends replace normal and width of nodes
+    data = buildTrafficway(coords,(0.0,0.0,0.0),4.0,2,4,{0:((1.0,0.0,0.0),2.0)})
+    assert [data.getVertex(i) for i in range(0,2)]==[(1.0,0.0,0.0),(-1.0,0.0,0.0)]
+
+def testArea():
+    hole = [(4.0,4.0,0.0),(4.0,6.0,0.0),(6.0,6.0,0.0),(6.0,4.0,0.0),(4.0,4.0,0.0)]
+    data = buildArea(SQUARE,(1.0,1.0,0.0),[hole])
+    assert data.getNumVertices()==8
+    assert data.getNumFaces()==8
+    faces = getFaces(data)
+    assert sum([getArea(face) for face in faces])==pytest.approx(96.0)
+    for face in faces:
+        assert getArea(face)>0
+    # uvs are the coordinates relative to the location
+    assert list(data.uv[0:6])==[data.getVertex(i)[j] for i in data.getFace(0) for j in (0,1)]
+
+def testJobs():
+    assert runJob(None) is None
+    job = (buildArea,(SQUARE,(0.0,0.0,0.0)))
+    data = runJob(job)
+    assert data.getNumFaces()==2
+    results = buildBatch([job,None,(buildTrafficway,(SQUARE[0:2],(0.0,0.0,0.0),4.0,2,4))])
+    assert [result.getNumFaces() if result else None for result in results]==[2,None,1]
+    assert results[0].faces==data.faces
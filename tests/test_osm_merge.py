@@ -0,0 +1,72 @@
+import pytest
+
+from io_osm.osm_merge import MergedParser, getVersion
+from io_osm.osm_parser import OSMParser, Element, openParser
+
+WEST = '''<osm version="0.6" generator="west">
+ <bounds minlat="50.0" minlon="8.0" maxlat="50.01" maxlon="8.01"/>
+ <node id="1" lat="50.001" lon="8.001" version="1"/>
+ <node id="2" lat="50.001" lon="8.009" version="1"/>
+ <node id="3" lat="50.002" lon="8.012" version="2"/>
+ <way id="10" version="1"><nd ref="1"/><nd ref="2"/></way>
+ <way id="11" version="1"><nd ref="2"/><nd ref="3"/><tag k="highway" v="service"/></way>
+</osm>
+'''
+
+EAST = '''<osm version="0.6" generator="east">
+ <bounds minlat="49.99" minlon="8.01" maxlat="50.005" maxlon="8.02"/>
+ <node id="2" lat="50.001" lon="8.009" version="1"/>
+ <node id="3" lat="50.002" lon="8.012" version="1"/>
+ <node id="4" lat="50.003" lon="8.015" version="1"/>
+ <way id="11" version="2"><nd ref="2"/><nd ref="3"/><nd ref="4"/><tag k="highway" v="residential"/></way>
+ <relation id="20" version="1"><member type="way" ref="11" role=""/></relation>
+</osm>
+'''
+
+def getItems(elements):
+    return [(element.name,element.attributes['id'],element.attributes.get('version')) for element in elements]
+
+def testMerge(writeFile):
+    parser = MergedParser([OSMParser(writeFile('west.osm',WEST)),OSMParser(writeFile('east.osm',EAST))])
+    parser.readHeader()
+    assert parser.bounds=={'minlat':49.99,'minlon':8.0,'maxlat':50.01,'maxlon':8.02}
+    assert parser.attributes['generator']=='west'
+
+    elements = list(parser.elements())
+    # every element once, copies in both files are passed on with the highest version
+    assert getItems(elements)==[('node','1','1'),('node','2','1'),('node','3','2'),('node','4','1'),
+                                ('way','10','1'),('way','11','2'),('relation','20','1')]
+    assert elements[5].refs==['2','3','4']
+    assert parser.duplicates==3
+
+def testMergeWithoutBounds(writeFile):
+    west = writeFile('west.osm',WEST)
+    east = writeFile('east.osm','<osm version="0.6"><node id="5" lat="50.0" lon="8.0"/></osm>')
+    parser = MergedParser([OSMParser(east),OSMParser(west)])
+    parser.readHeader()
+    assert parser.bounds=={'minlat':50.0,'minlon':8.0,'maxlat':50.01,'maxlon':8.01}
+    assert [item[1] for item in getItems(parser.elements())]==['1','2','3','5','10','11']
+
+def testUnsortedInput(writeFile):
+    west = writeFile('west.osm',WEST)
+    unsorted = writeFile('unsorted.osm','<osm version="0.6"><node id="7" lat="0" lon="0"/><node id="6" lat="0" lon="0"/></osm>')
+    parser = MergedParser([OSMParser(west),OSMParser(unsorted)])
+    parser.readHeader()
+    with pytest.raises(IOError) as error:
+        list(parser.elements())
+    assert 'unsorted.osm' in str(error.value)
+
+    # ways before nodes are not sorted by type either
+    unsorted = writeFile('types.osm','<osm version="0.6"><way id="1"/><node id="2" lat="0" lon="0"/></osm>')
+    with pytest.raises(IOError):
+        list(MergedParser([OSMParser(west),OSMParser(unsorted)]).elements())
+
+def testVersion():
+    assert getVersion(Element('node',{'version':'3'}))==3
+    assert getVersion(Element('node',{}))==0
+    assert getVersion(Element('node',{'version':'x'}))==0
+
+def testOpenParser(writeFile):
+    paths = [writeFile('west.osm',WEST),writeFile('east.osm',EAST)]
+    assert isinstance(openParser(paths),MergedParser)
+    assert isinstance(openParser(paths[:1]),OSMParser)
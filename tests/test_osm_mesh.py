@@ -0,0 +1,47 @@
+from array import array
+
+import pytest
+
+from io_osm.osm_mesh import MeshData
+
+def testAddFace():
+    data = MeshData()
+    for co in ((0.0,0.0,0.0),(1.0,0.0,0.0),(1.0,1.0,0.0),(0.0,1.0,0.0)):
+        data.addVertex(co)
+    assert data.getNumVertices()==4
+    assert data.getVertex(2)==(1.0,1.0,0.0)
+
+    data.addFace((0,1,2,3),1,False,((0,0),(1,0),(1,1),(0,1)))
+    # the third index of a triangle must not be 0, the triangle and its uvs are rotated
+    data.addFace((2,3,0),0,True,((1,1),(0,1),(0,0)))
+    assert data.getNumFaces()==2
+    assert data.faces==array('i',[0,1,2,3,0,2,3,0])
+    assert data.getFace(0)==array('i',[0,1,2,3])
+    assert data.getFace(1)==array('i',[0,2,3])
+    assert data.uv==array('f',[0,0,1,0,1,1,0,1,0,0,1,1,0,1,0,0])
+    assert data.material_index==array('i',[1,0])
+    assert data.smooth==[False,True]
+
+def testAddTriangles():
+    data = MeshData()
+    data.addTriangles(array('i',[1,2,0,0,1,2]),0,2)
+    assert data.faces==array('i',[0,1,2,0,0,1,2,0])
+    data.addTriangles(array('i',[0,1,2]),3)
+    assert data.getFace(2)==array('i',[3,4,5])
+    assert data.material_index==array('i',[2,2,0])
+    assert len(data.uv)==24
+
+def testExtend():
+    data = MeshData()
+    data.addVertex((0.0,0.0,0.0))
+    other = MeshData()
+    for co in ((0.0,0.0,0.0),(1.0,0.0,0.0),(1.0,1.0,0.0),(0.0,1.0,0.0)):
+        other.addVertex(co)
+    other.addFace((1,2,0))
+    other.addFace((0,1,2,3),1)
+    data.extend(other,(10.0,0.0,1.0))
+    assert data.getNumVertices()==5
+    assert data.getVertex(4)==pytest.approx((10.0,1.0,1.0))
+    # triangles keep their 0 marker
+    assert data.faces==array('i',[1,2,3,0,1,2,3,4])
+    assert data.material_index==array('i',[0,1])
@@ -0,0 +1,85 @@
+import multiprocessing
+
+import pytest
+
+from io_osm import osm_parallel
+from io_osm.osm_parallel import ParallelOSMParser, findElementStart, splitFile, parseChunk, chunkElements, getWorkers
+from io_osm.osm_projection import mercX, mercY
+
+from conftest import SAMPLE, summarize
+from test_osm_parser import EXPECTED
+
+def testFindElementStart(sampleFile):
+    data = SAMPLE.encode('utf-8')
+    end = data.index(b'</osm>')
+    file = open(sampleFile,'rb')
+    try:
+        assert findElementStart(file,0,end)==data.index(b'<node id="1"')
+        # positions inside an element find the next one, nd and member tags are not split at
+        assert findElementStart(file,data.index(b'<node id="3"')+1,end)==data.index(b'<node id="4"')
+        assert findElementStart(file,data.index(b'<nd ref="2"'),end)==data.index(b'<way id="11"')
+        assert findElementStart(file,data.index(b'<member'),end)==end
+    finally:
+        file.close()
+
+def testSplitFile(sampleFile):
+    data = SAMPLE.encode('utf-8')
+    starts = [data.index(tag) for tag in (b'<node id="1"',b'<node id="2"',b'<node id="3"',b'<node id="4"',b'<way id="10"',b'<way id="11"',b'<relation')]
+    for num in range(1,20):
+        chunks = splitFile(sampleFile,num)
+        assert chunks[0][0]==starts[0]
+        assert chunks[-1][1]==data.index(b'</osm>')
+        for i in range(0,len(chunks)):
+            assert chunks[i][0] in starts
+            if i>0:
+                assert chunks[i][0]==chunks[i-1][1]
+        assert 1<=len(chunks)<=num
+
+def testParseChunks(sampleFile):
+    origin = (mercX(8.0),mercY(50.0))
+    for num in (1,3,7):
+        elements = []
+        for (start,end) in splitFile(sampleFile,num):
+            elements.extend(chunkElements(parseChunk(sampleFile,start,end,origin)))
+        assert summarize(elements)==EXPECTED
+
+        # nodes are projected relative to the origin
+        assert elements[0].co==pytest.approx((0.0,0.0),abs=1e-6)
+        assert elements[2].co==pytest.approx((mercX(8.001)-origin[0],mercY(50.001)-origin[1]))
+        assert elements[3].attributes['ele']==12.5
+        assert 'ele' not in elements[0].attributes
+
+def testParallelParser(sampleFile):
+    parser = ParallelOSMParser(sampleFile,2)
+    # many more chunks than workers
+    parser.chunk_bytes = 64
+    parser.readHeader()
+    assert parser.bounds['maxlat']=='50.0010000'
+    assert summarize(parser.elements())==EXPECTED
+
+def testWorkers(monkeypatch):
+    assert getWorkers(0)==1
+    assert getWorkers(1)==1
+
+    monkeypatch.setattr(multiprocessing,'get_start_method',lambda: 'fork')
+    assert getWorkers(4)==4
+
+    # spawned processes need a Python interpreter
+    executables = []
+    monkeypatch.setattr(multiprocessing,'get_start_method',lambda: 'spawn')
+    monkeypatch.setattr(multiprocessing,'set_executable',executables.append)
+    monkeypatch.setattr(osm_parallel,'getPythonExecutable',lambda: '/usr/bin/python3')
+    assert getWorkers(4)==4
+    assert executables==['/usr/bin/python3']
+
+    monkeypatch.setattr(osm_parallel,'getPythonExecutable',lambda: None)
+    assert getWorkers(4)==1
+
+def testPythonExecutable(monkeypatch):
+    import sys
+    monkeypatch.setattr(sys,'executable','/usr/bin/python3.11')
+    assert osm_parallel.getPythonExecutable()=='/usr/bin/python3.11'
+    # Blender itself can not run the workers and without bpy there is no bundled Python
+    monkeypatch.setattr(sys,'executable','/opt/blender/blender')
+    monkeypatch.setitem(sys.modules,'bpy',None)
+    assert osm_parallel.getPythonExecutable() is None
@@ -0,0 +1,76 @@
+from io_osm.osm_parser import OSMParser, Element, openParser, getCompression
+
+from conftest import SAMPLE, summarize
+
+EXPECTED = [
+    ['node','1','1',(50.0,8.0),[],[],[]],
+    ['node','2','1',(50.0,8.001),[],[],[]],
+    ['node','3','1',(50.001,8.001),[('natural','tree')],[],[]],
+    ['node','4','2',(50.001,8.0),[],[],[]],
+    ['way','10','3',[('building','yes'),('name','Fish & Chips')],[1,2,3,4,1],[]],
+    ['way','11','1',[('highway','residential')],[2,3],[]],
+    ['relation','20','1',[('type','multipolygon')],[],[('way','10','outer'),('node','3','')]]]
+
+def testReadHeader(sampleFile):
+    parser = OSMParser(sampleFile)
+    parser.readHeader()
+    assert parser.attributes=={'version':'0.6','generator':'tests'}
+    assert parser.bounds=={'minlat':'50.0000000','minlon':'8.0000000','maxlat':'50.0010000','maxlon':'8.0020000'}
+
+def testElements(sampleFile):
+    parser = OSMParser(sampleFile)
+    parser.readHeader()
+    assert summarize(parser.elements())==EXPECTED
+
+def testElementsWithoutHeader(sampleFile):
+    # the bounds element is only returned by readHeader
+    assert summarize(OSMParser(sampleFile).elements())==EXPECTED
+
+def testElevation(sampleFile):
+    nodes = [element for element in OSMParser(sampleFile).elements() if element.name=='node']
+    assert nodes[3].attributes['ele']=='12.5'
+    assert 'ele' not in nodes[0].attributes
+
+def testChunkBoundaryInsideElement(sampleFile):
+    # elements and attributes cut by the chunks are completed by expat
+    for size in (1,7,64,len(SAMPLE)-1):
+        parser = OSMParser(sampleFile)
+        parser.chunk_size = size
+        parser.readHeader()
+        assert parser.bounds['maxlon']=='8.0020000'
+        assert summarize(parser.elements())==EXPECTED
+
+def testHeaderWithoutBounds(writeFile):
+    path = writeFile('nobounds.osm','<osm version="0.6"><node id="1" lat="1.0" lon="2.0"/><way id="2"><nd ref="1"/></way></osm>')
+    parser = OSMParser(path)
+    parser.readHeader()
+    assert parser.bounds is None
+    # the first data element read by readHeader is not lost
+    assert [element.name for element in parser.elements()]==['node','way']
+
+def testAction(writeFile):
+    path = writeFile('change.osc','<osmChange version="0.6"><create><node id="-1" lat="1" lon="2"/></create>'
+                                  '<delete><way id="5"/></delete><node id="7" lat="1" lon="2"/></osmChange>')
+    assert [(element.name,element.action) for element in OSMParser(path).elements()]==[('node','create'),('way','delete'),('node',None)]
+
+def testElementDefaults():
+    element = Element('node',{'id':'1'})
+    assert (element.tags,element.refs,element.members,element.co,element.action)==([],[],[],None,None)
+
+def testOpenParser(sampleFile):
+    parser = openParser(sampleFile)
+    assert isinstance(parser,OSMParser)
+    assert getCompression(sampleFile) is None
+
+def testCompressedFiles(writeFile):
+    import gzip
+    import bz2
+    import lzma
+    for (name,compress,module) in (('sample.osm.gz',gzip.compress,'gzip'),('sample.osm.bz2',bz2.compress,'bz2'),('sample.osm.xz',lzma.compress,'lzma')):
+        path = writeFile(name,compress(SAMPLE.encode('utf-8')))
+        assert getCompression(path)==module
+        parser = openParser(path)
+        parser.chunk_size = 100
+        parser.readHeader()
+        assert parser.bounds['minlat']=='50.0000000'
+        assert summarize(parser.elements())==EXPECTED
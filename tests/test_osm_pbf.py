@@ -0,0 +1,163 @@
+import zlib
+import struct
+from array import array
+
+import pytest
+
+from io_osm.osm_pbf import PBFParser, readVarint, zigzag, toSigned, getBlockBounds
+from io_osm.osm_parser import openParser
+
+from conftest import summarize
+
+# A minimal protobuf and PBF writer, just enough to encode the test files.
+
+def varint(value):
+    if value<0:
+        value+=1<<64
+    data = bytearray()
+    while True:
+        b = value & 0x7f
+        value>>=7
+        if value:
+            data.append(b | 0x80)
+        else:
+            data.append(b)
+            return bytes(data)
+
+def sint(value):
+    return (value<<1) ^ (value>>63)
+
+def field(number,value):
+    if isinstance(value,int):
+        return varint(number<<3)+varint(value)
+    return varint((number<<3) | 2)+varint(len(value))+value
+
+def packed(number,values):
+    return field(number,b''.join([varint(value) for value in values]))
+
+def delta(values):
+    last = 0
+    result = []
+    for value in values:
+        result.append(sint(value-last))
+        last = value
+    return result
+
+def blob(type,data):
+    content = field(2,len(data))+field(3,zlib.compress(data))
+    header = field(1,type.encode('ascii'))+field(3,len(content))
+    return struct.pack('>I',len(header))+header+content
+
+def header(bbox = None):
+    data = b''
+    if bbox:
+        (minlat,minlon,maxlat,maxlon) = [int(round(value*1e9)) for value in bbox]
+        data+=field(1,field(1,sint(minlon))+field(2,sint(maxlon))+field(3,sint(maxlat))+field(4,sint(minlat)))
+    data+=field(4,b'OsmSchema-V0.6')+field(4,b'DenseNodes')+field(16,b'tests')
+    return blob('OSMHeader',data)
+
+# Encodes a block. Nodes are (id,lat,lon,version,tags) tuples, dense nodes unless plain is set,
+# ways (id,version,refs,tags) and relations (id,tags,members) tuples. Coordinates are given in units of the granularity of 100 nanodegrees.
+def block(nodes = (),ways = (),relations = (),plain = False,lat_offset = 0):
+    strings = ['']
+    def string(value):
+        if value not in strings:
+            strings.append(value)
+        return strings.index(value)
+
+    groups = b''
+    if nodes and plain:
+        group = b''
+        for (id,lat,lon,version,tags) in nodes:
+            group+=field(1,field(1,sint(id))+packed(2,[string(k) for (k,v) in tags])+packed(3,[string(v) for (k,v) in tags])+field(4,field(1,version))+field(8,sint(lat))+field(9,sint(lon)))
+        groups+=field(2,group)
+    elif nodes:
+        keys_vals = []
+        for node in nodes:
+            for (k,v) in node[4]:
+                keys_vals.extend((string(k),string(v)))
+            keys_vals.append(0)
+        dense = packed(1,delta([node[0] for node in nodes]))+field(5,packed(1,[node[3] for node in nodes]))
+        dense+=packed(8,delta([node[1] for node in nodes]))+packed(9,delta([node[2] for node in nodes]))+packed(10,keys_vals)
+        groups+=field(2,field(2,dense))
+    group = b''
+    for (id,version,refs,tags) in ways:
+        group+=field(3,field(1,id)+packed(2,[string(k) for (k,v) in tags])+packed(3,[string(v) for (k,v) in tags])+field(4,field(1,version))+packed(8,delta(refs)))
+    for (id,tags,members) in relations:
+        roles = [string(role) for (type,ref,role) in members]
+        types = [('node','way','relation').index(type) for (type,ref,role) in members]
+        group+=field(4,field(1,id)+packed(2,[string(k) for (k,v) in tags])+packed(3,[string(v) for (k,v) in tags])+packed(8,roles)+packed(9,delta([ref for (type,ref,role) in members]))+packed(10,types))
+    if group:
+        groups+=field(2,group)
+
+    table = field(1,b''.join([field(1,value.encode('utf-8')) for value in strings]))
+    data = table+groups+field(17,100)
+    if lat_offset:
+        data+=field(19,lat_offset)
+    return blob('OSMData',data)
+
+NODES = [(1,500000000,80000000,1,[]),(2,500000000,80010000,1,[]),(3,500010000,80010000,1,[('natural','tree')]),(4,500010000,80000000,2,[])]
+WAYS = [(10,3,[1,2,3,4,1],[('building','yes')]),(11,1,[2,3],[('highway','residential')])]
+RELATIONS = [(20,[('type','multipolygon')],[('way',10,'outer'),('node',3,'')])]
+
+EXPECTED = [
+    ['node','1','1',(50.0,8.0),[],[],[]],
+    ['node','2','1',(50.0,8.001),[],[],[]],
+    ['node','3','1',(50.001,8.001),[('natural','tree')],[],[]],
+    ['node','4','2',(50.001,8.0),[],[],[]],
+    ['way','10','3',[('building','yes')],[1,2,3,4,1],[]],
+    ['way','11','1',[('highway','residential')],[2,3],[]],
+    ['relation','20','0',[('type','multipolygon')],[],[('way','10','outer'),('node','3','')]]]
+
+def testVarints():
+    assert readVarint(b'\x96\x01',0)==(150,2)
+    assert readVarint(b'\x00\x7f',1)==(127,2)
+    assert [zigzag(value) for value in (0,1,2,3,4)]==[0,-1,1,-2,2]
+    assert toSigned(0xffffffffffffffff)==-1
+    assert toSigned(5)==5
+
+def testElements(writeFile):
+    path = writeFile('sample.osm.pbf',header((50.0,8.0,50.001,8.002))+block(NODES[:2])+block(NODES[2:],WAYS,RELATIONS))
+    parser = PBFParser(path)
+    parser.readHeader()
+    assert parser.attributes=={'version':'0.6','generator':'tests'}
+    assert parser.bounds==pytest.approx({'minlat':50.0,'minlon':8.0,'maxlat':50.001,'maxlon':8.002})
+    elements = list(parser.elements())
+    assert summarize(elements)==EXPECTED
+    assert isinstance(elements[4].refs,array) and elements[4].refs.typecode=='q'
+
+def testPlainNodes(writeFile):
+    path = writeFile('plain.osm.pbf',header((50.0,8.0,50.001,8.002))+block(NODES,plain=True))
+    parser = PBFParser(path)
+    parser.readHeader()
+    assert summarize(parser.elements())==EXPECTED[:4]
+
+def testBoundsWithoutBoundingBox(writeFile):
+    # the bounds are read from the nodes of all blocks, plain and dense ones
+    path = writeFile('nobbox.osm.pbf',header()+block(NODES[:2],plain=True)+block(NODES[2:],WAYS)+block((),(),RELATIONS))
+    parser = PBFParser(path)
+    parser.readHeader()
+    assert parser.bounds==pytest.approx({'minlat':50.0,'minlon':8.0,'maxlat':50.001,'maxlon':8.001})
+    assert summarize(parser.elements())[:6]==EXPECTED[:6]
+
+def testBlockBoundsWithOffset():
+    data = block([(1,-100,200,0,[]),(2,300,-400,0,[])],lat_offset=1000000000)
+    bounds = getBlockBounds(data[4+struct.unpack('>I',data[:4])[0]:])
+    assert bounds==pytest.approx((1.0-1e-5,-4e-5,1.0+3e-5,2e-5))
+
+def testBlockBoundsWithoutNodes():
+    data = block((),WAYS)
+    assert getBlockBounds(data[4+struct.unpack('>I',data[:4])[0]:]) is None
+
+def testNoBoundingBoxAndNoNodes(writeFile):
+    path = writeFile('empty.osm.pbf',header()+block((),WAYS))
+    parser = PBFParser(path)
+    with pytest.raises(IOError):
+        parser.readHeader()
+
+def testWorkers(writeFile):
+    path = writeFile('sample.osm.pbf',header((50.0,8.0,50.001,8.002))+block(NODES[:2])+block(NODES[2:])+block((),WAYS,RELATIONS))
+    parser = openParser(path,False,2)
+    assert isinstance(parser,PBFParser)
+    parser.readHeader()
+    assert summarize(parser.elements())==EXPECTED
@@ -0,0 +1,45 @@
+import pytest
+
+from io_osm import osm_projection
+from io_osm.osm_projection import getProjection, mercX, mercY, projectMercator, LocalTangentPlane, MercatorProjection
+
+# Function: setNumpy
+# Takes the numpy code path if numpy is True, which is skipped without numpy, otherwise the pure Python one.
+def setNumpy(numpy,monkeypatch):
+    if numpy:
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(osm_projection,'numpy',None)
+
+def testMercator():
+    assert mercX(0.0)==0.0
+    assert mercX(180.0)==pytest.approx(20037508.342789244)
+    assert mercY(0.0)==pytest.approx(0.0,abs=1e-6)
+    assert mercY(50.0)==pytest.approx(6413524.594163,abs=1e-3)
+    # latitudes are clamped below the poles
+    assert mercY(90.0)==mercY(89.5)
+
+@pytest.mark.parametrize('numpy',[True,False])
+def testProjectMercator(numpy,monkeypatch):
+    setNumpy(numpy,monkeypatch)
+    lat = [0.0,50.0,-33.9,89.9]
+    lon = [0.0,8.0,151.2,-180.0]
+    (x,y) = projectMercator(lat,lon,(100.0,200.0))
+    assert list(x)==pytest.approx([mercX(value)-100.0 for value in lon])
+    assert list(y)==pytest.approx([mercY(value)-200.0 for value in lat])
+
+@pytest.mark.parametrize('numpy',[True,False])
+def testLocalTangentPlane(numpy,monkeypatch):
+    setNumpy(numpy,monkeypatch)
+    projection = getProjection('local',50.0,8.0)
+    assert isinstance(projection,LocalTangentPlane)
+    assert projection.projectPoint(50.0,8.0)==pytest.approx((0.0,0.0),abs=1e-6)
+    # a thousandth of a degree is about 111 m north and 72 m east at 50 degrees, parallels curve away from the plane
+    (x,y) = projection.project([50.001,50.0],[8.0,8.001],(1.0,2.0))
+    assert list(x)==pytest.approx([-1.0,71.6957536-1.0],abs=1e-6)
+    assert list(y)==pytest.approx([111.2290736-2.0,0.0004793-2.0],abs=1e-6)
+
+def testGetProjection():
+    projection = getProjection('mercator',50.0,8.0)
+    assert isinstance(projection,MercatorProjection)
+    assert projection.projectPoint(50.0,8.0)==pytest.approx((mercX(8.0),mercY(50.0)))
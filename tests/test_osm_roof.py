@@ -0,0 +1,81 @@
+import math
+
+import pytest
+
+from io_osm.osm_roof import getSkeleton, addGables, getArea
+
+SQUARE = [(0.0,0.0),(10.0,0.0),(10.0,10.0),(0.0,10.0)]
+RECTANGLE = [(0.0,0.0,3.0),(10.0,0.0,3.0),(10.0,6.0,3.0),(0.0,6.0,3.0)]
+# two squares joined by a narrow corridor, its reflex corners split the ring
+DUMBBELL = [(0.0,0.0),(4.0,0.0),(4.0,1.5),(6.0,1.5),(6.0,0.0),(10.0,0.0),(10.0,4.0),(6.0,4.0),(6.0,2.5),(4.0,2.5),(4.0,4.0),(0.0,4.0)]
+H_SHAPE = [(0.0,0.0),(4.0,0.0),(4.0,4.0),(6.0,4.0),(6.0,0.0),(10.0,0.0),(10.0,10.0),(6.0,10.0),(6.0,6.0),(4.0,6.0),(4.0,10.0),(0.0,10.0)]
+
+# Returns the coordinates of a list of nodes in one list, for pytest.approx.
+def flatten(nodes):
+    return [value for node in nodes for value in node]
+
+# Checks the properties every straight skeleton has: the face of an edge starts with the edge, every node of it is as far from
+# the line of the edge as its time and the faces cover the ring once.
+def checkSkeleton(ring):
+    (nodes,faces) = getSkeleton(ring)
+    num = len(ring)
+    assert len(faces)==num
+    for k in range(0,num):
+        face = faces[k]
+        assert face[0:2]==[k,(k+1) % num]
+        (a,b) = (ring[k],ring[(k+1) % num])
+        length = math.sqrt((b[0]-a[0])**2+(b[1]-a[1])**2)
+        for i in face:
+            (x,y,time) = nodes[i]
+            assert ((b[0]-a[0])*(y-a[1])-(b[1]-a[1])*(x-a[0]))/length==pytest.approx(time,abs=1e-6)
+        assert getArea([nodes[i] for i in face])>0
+    assert sum([getArea([nodes[i] for i in face]) for face in faces])==pytest.approx(getArea(ring))
+    return (nodes,faces)
+
+def testSquare():
+    (nodes,faces) = checkSkeleton(SQUARE)
+    assert nodes[4]==pytest.approx([5.0,5.0,5.0])
+    assert faces==[[0,1,4],[1,2,4],[2,3,4],[3,0,4]]
+
+def testRectangle():
+    (nodes,faces) = checkSkeleton(RECTANGLE)
+    # z is ignored, the ridge is as high as half the width
+    assert flatten(sorted([nodes[i] for i in range(4,6)]))==pytest.approx([3.0,3.0,3.0,7.0,3.0,3.0])
+    assert [len(face) for face in faces]==[4,3,4,3]
+
+def testSplitEvents():
+    (nodes,faces) = checkSkeleton(DUMBBELL)
+    # the corridor is 1 wide, its ridge 0.5 high, the squares get pyramids of 2
+    assert flatten(sorted([node for node in nodes[12:] if node[2]==pytest.approx(0.5)]))==pytest.approx([3.5,2.0,0.5,6.5,2.0,0.5])
+    assert flatten(sorted([node for node in nodes[12:] if node[2]==pytest.approx(2.0)]))==pytest.approx([2.0,2.0,2.0,8.0,2.0,2.0])
+    checkSkeleton(H_SHAPE)
+
+def testConcave():
+    checkSkeleton([(0.0,0.0),(2.0,0.0),(2.0,1.0),(1.0,1.0),(1.0,2.0),(0.0,2.0)])
+    checkSkeleton([(0.0,0.0),(10.0,0.0),(10.0,4.0),(5.0,1.0),(0.0,4.0)])
+
+def testCollinearCorner():
+    (nodes,faces) = checkSkeleton([(0.0,0.0),(5.0,0.0),(10.0,0.0),(10.0,10.0),(0.0,10.0)])
+    assert len(nodes)==6
+    assert nodes[5]==pytest.approx([5.0,5.0,5.0])
+
+def testDegenerated():
+    assert getSkeleton([(0.0,0.0),(1.0,0.0)]) is None
+    # zero length edge
+    assert getSkeleton([(0.0,0.0),(10.0,0.0),(10.0,0.0),(10.0,10.0),(0.0,10.0)]) is None
+    # no area
+    assert getSkeleton([(0.0,0.0),(10.0,0.0),(5.0,0.0)]) is None
+    # clockwise
+    assert getSkeleton(SQUARE[::-1]) is None
+
+def testGables():
+    (nodes,faces) = getSkeleton(RECTANGLE)
+    assert addGables(nodes,faces)==[1,3]
+    # the ends of the ridge are moved onto the short edges
+    assert flatten(sorted([nodes[i] for i in range(4,6)]))==pytest.approx([0.0,3.0,3.0,10.0,3.0,3.0])
+
+def testNoGables():
+    # triangles next to each other would be distorted
+    (nodes,faces) = getSkeleton(SQUARE)
+    assert addGables(nodes,faces)==[]
+    assert nodes[4]==pytest.approx([5.0,5.0,5.0])
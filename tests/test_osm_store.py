@@ -0,0 +1,112 @@
+import math
+from array import array
+
+import pytest
+
+from io_osm import osm_store
+from io_osm.osm_store import NodeStore, toIds
+from io_osm.osm_projection import MercatorProjection, mercX, mercY
+
+# Function: setNumpy
+# Takes the numpy code path if numpy is True, which is skipped without numpy, otherwise the pure Python one.
+def setNumpy(numpy,monkeypatch):
+    if numpy:
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(osm_store,'numpy',None)
+
+def testAdd():
+    store = NodeStore()
+    assert store.add(5,50.0,8.0)==0
+    assert store.add(7,50.001,8.001,12.5)==1
+    assert len(store)==2
+    assert list(store.ids)==[5,7]
+    assert store.getCo(1)[2]==12.5
+    assert store.ordered
+    assert store.unprojected==2
+    assert math.isnan(store.x[0])
+
+def testProject():
+    projection = MercatorProjection()
+    origin = projection.projectPoint(50.0,8.0)
+    store = NodeStore()
+    store.add(1,50.0,8.0)
+    store.add(2,50.001,8.001)
+    store.project(projection,origin)
+    assert store.projected==2
+    assert store.getCo(0)==pytest.approx((0.0,0.0,0.0),abs=1e-6)
+    assert store.getCo(1)==pytest.approx((mercX(8.001)-origin[0],mercY(50.001)-origin[1],0.0))
+
+    # only the nodes added since are projected, coordinates of the parser are kept
+    store.add(3,50.002,8.002,0.0,(1.0,2.0))
+    store.add(4,50.002,8.0)
+    store.project(projection,origin)
+    assert store.getCoords([2,3])==pytest.approx([(1.0,2.0,0.0),(0.0,mercY(50.002)-origin[1],0.0)])
+    assert store.unprojected==0
+
+def testToIds():
+    ids = array('q',[1,2])
+    assert toIds(ids) is ids
+    assert toIds(['3','4'])==array('q',[3,4])
+
+@pytest.mark.parametrize('numpy',[True,False])
+def testLookup(numpy,monkeypatch):
+    setNumpy(numpy,monkeypatch)
+    store = NodeStore()
+    for id in (10,20,30,40):
+        store.add(id,0.0,0.0)
+    (indices,missing) = store.lookup(array('q',[30,10,25,40,10,99]))
+    assert list(indices)==[2,0,3,0]
+    assert missing==[25,99]
+    assert store.getIndex(20)==1
+    assert store.getIndex(21) is None
+
+    # nodes added later are found, unordered ids are sorted once
+    store.add(5,0.0,0.0)
+    store.add(2**40,0.0,0.0)
+    assert not store.ordered
+    (indices,missing) = store.lookup(toIds(['5',str(2**40),'40','6']))
+    assert list(indices)==[4,5,3]
+    assert missing==[6]
+    assert list(store.sorted_ids)==[5,10,20,30,40,2**40]
+
+@pytest.mark.parametrize('numpy',[True,False])
+def testLookupMerged(numpy,monkeypatch):
+    setNumpy(numpy,monkeypatch)
+    store = NodeStore()
+    for id in (30,10,20):
+        store.add(id,0.0,0.0)
+    assert list(store.lookup(array('q',[10,20,30]))[0])==[1,2,0]
+
+    # the nodes added since are merged into the index, duplicate ids resolve to the first node like a full sort
+    for id in (25,5,10,40,1):
+        store.add(id,0.0,0.0)
+    (indices,missing) = store.lookup(array('q',[1,5,10,20,25,30,40,15]))
+    assert list(indices)==[7,4,1,2,3,0,6]
+    assert missing==[15]
+    assert list(store.sorted_ids)==[1,5,10,10,20,25,30,40]
+    assert list(store.order)==[7,4,1,5,2,3,0,6]
+
+    # an ordered index is merged with nodes out of order
+    store = NodeStore()
+    for id in (10,20,30):
+        store.add(id,0.0,0.0)
+    store.lookup(array('q',[10]))
+    store.add(15,0.0,0.0)
+    assert store.getIndex(15)==3
+    assert list(store.order)==[0,3,1,2]
+
+@pytest.mark.parametrize('numpy',[True,False])
+def testLookupEmpty(numpy,monkeypatch):
+    setNumpy(numpy,monkeypatch)
+    store = NodeStore()
+    assert store.lookup(array('q',[1]))==(array('i'),[1])
+    store.add(1,0.0,0.0)
+    assert store.lookup(array('q'))==(array('i'),[])
+
+def testSortedIds():
+    ids = osm_store.sortedIds([5,3,5,1])
+    assert ids==array('q',[1,3,5])
+    assert osm_store.containsId(ids,3)
+    assert not osm_store.containsId(ids,4)
+    assert not osm_store.containsId(ids,6)
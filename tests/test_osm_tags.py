@@ -0,0 +1,34 @@
+from array import array
+
+from io_osm.osm_tags import TagDictionary
+
+def testIntern():
+    tags = TagDictionary()
+    assert tags.intern('building')==0
+    assert tags.intern('yes')==1
+    assert tags.intern('building')==0
+    assert len(tags)==2
+    assert tags.getString(1)=='yes'
+
+def testPack():
+    tags = TagDictionary()
+    pairs = tags.pack([('building','yes'),('name','yes'),('building','house')])
+    # a repeated key keeps its place and the last value
+    assert pairs==array('i',[0,3,2,1])
+    assert list(tags.items(pairs))==[('building','house'),('name','yes')]
+    assert list(tags.idItems(pairs))==[(0,3),(2,1)]
+    assert tags.pack([])==array('i')
+
+def testGet():
+    tags = TagDictionary()
+    pairs = tags.pack([('highway','residential'),('lanes','2')])
+    other = tags.pack([('building','yes')])
+    assert tags.get(pairs,'lanes')=='2'
+    assert tags.get(pairs,'building') is None
+    assert tags.get(pairs,'width','3')=='3'
+    # a value is not a key
+    assert tags.get(pairs,'residential') is None
+    assert tags.has(pairs,'highway')
+    assert not tags.has(pairs,'building')
+    assert tags.has(other,'building')
+    assert not tags.has(pairs,'unknown')
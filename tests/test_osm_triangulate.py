@@ -0,0 +1,76 @@
+from array import array
+
+import pytest
+
+from io_osm.osm_triangulate import triangulate
+
+SQUARE = [(0.0,0.0),(10.0,0.0),(10.0,10.0),(0.0,10.0)]
+L_SHAPE = [(0.0,0.0),(2.0,0.0),(2.0,1.0),(1.0,1.0),(1.0,2.0),(0.0,2.0)]
+
+# Returns the signed areas of the triangles, positive if counterclockwise.
+def getAreas(triangles,corners):
+    areas = []
+    for t in range(0,len(triangles),3):
+        (a,b,c) = [corners[i] for i in triangles[t:t+3]]
+        areas.append(((b[0]-a[0])*(c[1]-a[1])-(b[1]-a[1])*(c[0]-a[0]))/2)
+    return areas
+
+# Checks that the triangles of a polygon are counterclockwise, cover its area and use each corner.
+def checkPolygon(rings,num,area):
+    (triangles,offsets) = triangulate([rings])
+    corners = [co for ring in rings for co in ring]
+    areas = getAreas(triangles,corners)
+    assert len(areas)==num
+    assert list(offsets)==[0,num]
+    assert min(areas)>0
+    assert sum(areas)==pytest.approx(area)
+    assert sorted(set(triangles))==list(range(0,len(corners)))
+
+def testConvex():
+    (triangles,offsets) = triangulate([[SQUARE]])
+    assert triangles==array('i',[0,1,2,0,2,3])
+    assert offsets==array('i',[0,2])
+
+def testClockwise():
+    (triangles,offsets) = triangulate([[SQUARE[::-1]]])
+    assert min(getAreas(triangles,SQUARE[::-1]))>0
+
+def testConcave():
+    checkPolygon([L_SHAPE],4,3.0)
+    checkPolygon([L_SHAPE[::-1]],4,3.0)
+
+def testCollinearCorners():
+    ring = [(0.0,0.0),(5.0,0.0),(10.0,0.0),(10.0,10.0),(5.0,10.0),(5.0,5.0),(0.0,10.0)]
+    (triangles,offsets) = triangulate([[ring]])
+    areas = getAreas(triangles,ring)
+    assert min(areas)>=0
+    assert sum(areas)==pytest.approx(87.5)
+
+def testHole():
+    hole = [(4.0,4.0),(6.0,4.0),(6.0,6.0),(4.0,6.0)]
+    # triangles of a polygon with n corners and h holes: n+2h-2
+    checkPolygon([SQUARE,hole],8,96.0)
+    checkPolygon([SQUARE,hole[::-1]],8,96.0)
+
+def testHoles():
+    holes = [[(1.0,1.0),(3.0,1.0),(3.0,3.0),(1.0,3.0)],[(5.0,5.0),(9.0,5.0),(7.0,9.0)],[(6.0,1.0),(9.0,1.0),(9.0,2.0),(6.0,2.0)]]
+    checkPolygon([SQUARE]+holes,4+11+6-2,100.0-4.0-8.0-3.0)
+
+def testHoleInConcavePolygon():
+    outer = [(0.0,0.0),(10.0,0.0),(10.0,10.0),(6.0,10.0),(6.0,4.0),(4.0,4.0),(4.0,10.0),(0.0,10.0)]
+    hole = [(1.0,1.0),(3.0,1.0),(3.0,3.0),(1.0,3.0)]
+    checkPolygon([outer,hole],8+4+2-2,100.0-12.0-4.0)
+
+def testSeveralPolygons():
+    moved = [(x+20.0,y,5.0) for (x,y) in L_SHAPE]
+    (triangles,offsets) = triangulate([[SQUARE],[[(0.0,0.0),(1.0,0.0)]],[moved]])
+    assert offsets==array('i',[0,2,2,6])
+    # corners are numbered through all polygons, z is ignored
+    corners = SQUARE+[(0.0,0.0),(1.0,0.0)]+moved
+    assert min(triangles[6:])==6
+    assert sum(getAreas(triangles[6:],corners))==pytest.approx(3.0)
+
+def testDegenerateHole():
+    (triangles,offsets) = triangulate([[SQUARE,[(1.0,1.0),(2.0,2.0)]]])
+    assert len(triangles)==6
+    assert max(triangles)<4
@@ -0,0 +1,156 @@
+import pytest
+
+# building the scene needs Blender, e.g. blender -b --python-expr "import pytest; pytest.main(['tests'])"
+bpy = pytest.importorskip('bpy')
+
+import io_osm
+from io_osm import import_osm
+from io_osm.osm_parser import openParser
+from io_osm.osm_types import OSM
+
+# two buildings with their nodes clockwise, the walls are built counterclockwise
+CLOCKWISE = '''<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6" generator="tests">
+ <bounds minlat="50.0000000" minlon="8.0000000" maxlat="50.0010000" maxlon="8.0020000"/>
+ <node id="1" lat="50.0000000" lon="8.0000000" version="1"/>
+ <node id="2" lat="50.0000000" lon="8.0005000" version="1"/>
+ <node id="3" lat="50.0005000" lon="8.0005000" version="1"/>
+ <node id="4" lat="50.0005000" lon="8.0000000" version="1"/>
+ <node id="5" lat="50.0000000" lon="8.0010000" version="1"/>
+ <node id="6" lat="50.0000000" lon="8.0020000" version="1"/>
+ <node id="7" lat="50.0005000" lon="8.0020000" version="1"/>
+ <node id="8" lat="50.0005000" lon="8.0010000" version="1"/>
+ <way id="10" version="1">
+  <nd ref="1"/>
+  <nd ref="4"/>
+  <nd ref="3"/>
+  <nd ref="2"/>
+  <nd ref="1"/>
+  <tag k="building" v="yes"/>
+ </way>
+ <way id="11" version="1">
+  <nd ref="5"/>
+  <nd ref="8"/>
+  <nd ref="7"/>
+  <nd ref="6"/>
+  <nd ref="5"/>
+  <tag k="building" v="yes"/>
+  <tag k="height" v="12"/>
+ </way>
+</osm>
+'''
+
+# a tree, which matches the group of the scene fixture, a bench matching nothing and a tree referenced by a way
+NODES = '''<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6" generator="tests">
+ <bounds minlat="50.0000000" minlon="8.0000000" maxlat="50.0010000" maxlon="8.0020000"/>
+ <node id="1" lat="50.0000000" lon="8.0000000" version="1"/>
+ <node id="2" lat="50.0000000" lon="8.0010000" version="1">
+  <tag k="natural" v="tree"/>
+ </node>
+ <node id="3" lat="50.0005000" lon="8.0005000" version="1">
+  <tag k="natural" v="tree"/>
+ </node>
+ <node id="4" lat="50.0005000" lon="8.0015000" version="1">
+  <tag k="amenity" v="bench"/>
+ </node>
+ <way id="10" version="1">
+  <nd ref="1"/>
+  <nd ref="2"/>
+  <tag k="barrier" v="wall"/>
+ </way>
+</osm>
+'''
+
+# Class: Options
+# Import options as set by the import operator, see <io_osm.osm_ops.ImportOSM>.
+class Options(object):
+    def __init__(self,**options):
+        self.create_tag_list = False
+        self.two_pass = False
+        self.use_cache = False
+        self.merge_meshes = False
+        self.share_meshes = False
+        self.workers = 1
+        self.import_types = {'building','area','trafficway','barrier','object'}
+        self.projection = 'mercator'
+        self.tile_size = 0.0
+        self.tile = (0,0)
+        self.clip = 'none'
+        self.clip_lat = (0.0,0.0)
+        self.clip_lon = (0.0,0.0)
+        for name in options:
+            setattr(self,name,options[name])
+
+# Function: scene
+# Fixture with a facade and a flat roof material for buildings, a material for walls and a group for trees, removes the imported objects, the materials and the group afterwards.
+@pytest.fixture
+def scene():
+    if not hasattr(bpy.types.Scene,'osm'):
+        io_osm.register()
+    materials = []
+    for (name,base_type,part,tag_name,tag_value) in (('facade','building','facade','building','yes'),('roof','building','flat_roof','building','yes'),('wall','barrier','facade','barrier','wall')):
+        material = bpy.data.materials.new(name)
+        material.osm.base_type = base_type
+        material.osm.building_part = part
+        tag = material.osm.tags.add()
+        tag.name = tag_name
+        tag.value = tag_value
+        materials.append(material)
+    group = bpy.data.groups.new('tree')
+    tag = group.osm.tags.add()
+    tag.name = 'natural'
+    tag.value = 'tree'
+    yield bpy.context.scene
+    import_osm.remove_osm(bpy.context)
+    for material in materials:
+        bpy.data.materials.remove(material)
+    bpy.data.groups.remove(group)
+
+# Function: getNodes
+# Parses a file with the import options of the scene set to options and returns the ids of the nodes which got a <Node> instance.
+def getNodes(scene,path,**options):
+    settings = Options(**options)
+    scene.osm.two_pass = settings.two_pass
+    scene.osm.import_types = settings.import_types
+    scene.osm.tile_size = settings.tile_size
+    scene.osm.clip = settings.clip
+    scene.osm.clip_lat = settings.clip_lat
+    scene.osm.clip_lon = settings.clip_lon
+    osm = OSM(openParser([path]))
+    osm.parse()
+    return sorted(osm.nodes)
+
+def testMergedClockwiseUnchanged(scene,writeFile):
+    path = writeFile('clockwise.osm',CLOCKWISE)
+    import_osm.load_osm(path,Options(merge_meshes = True),bpy.context)
+    merged = [object for object in scene.objects if len(object.osm.parts)>0]
+    assert len(merged)==1
+    assert sorted([part.id for part in merged[0].osm.parts])==['10','11']
+
+    # a second pass over the same file keeps the merged object
+    assert import_osm.rebuild_osm(path,bpy.context)==2
+    assert [object for object in scene.objects if len(object.osm.parts)>0]==merged
+
+def testClockwiseUnchanged(scene,writeFile):
+    path = writeFile('clockwise.osm',CLOCKWISE)
+    import_osm.load_osm(path,Options(),bpy.context)
+    assert sorted([object.osm.id for object in scene.objects if object.osm.id!=''])==['10','11']
+    assert import_osm.rebuild_osm(path,bpy.context)==2
+
+def testNodeFilter(scene,writeFile):
+    path = writeFile('nodes.osm',NODES)
+    assert getNodes(scene,path)==[2,3]
+    assert getNodes(scene,path,two_pass = True)==[2,3]
+    assert getNodes(scene,path,clip = 'box',clip_lat = (49.9,50.1),clip_lon = (7.9,8.1))==[2,3]
+
+def testNodeTypeMask(scene,writeFile):
+    path = writeFile('nodes.osm',NODES)
+    assert getNodes(scene,path,import_types = {'building','area','trafficway','barrier'})==[]
+    assert getNodes(scene,path,two_pass = True,import_types = {'building','area','trafficway','barrier'})==[]
+
+def testNodeClip(scene,writeFile):
+    path = writeFile('nodes.osm',NODES)
+    # the wall crosses the edge of the box, the tree at its end outside the box is no object
+    assert getNodes(scene,path,clip = 'box',clip_lat = (49.9,50.1),clip_lon = (7.9,8.0005))==[3]
+    assert getNodes(scene,path,clip = 'box',clip_lat = (49.9,50.1),clip_lon = (8.0008,8.1))==[2]
@@ -0,0 +1,142 @@
+import math
+from array import array
+
+import pytest
+
+from io_osm import osm_uv
+from io_osm.osm_uv import segmentLengths, stripUVs, planarUVs
+from io_osm.osm_mesh import MeshData
+from io_osm.osm_geometry import getNormals, isClockwise, buildBuilding, buildTrafficway
+
+# Function: setNumpy
+# Takes the numpy code path if numpy is True, which is skipped without numpy, otherwise the pure Python one.
+def setNumpy(numpy,monkeypatch):
+    if numpy:
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(osm_uv,'numpy',None)
+
+# Returns buffers with a strip of quads along x, every quad is a unit square, and a triangle on top of each quad.
+def getStrip(num):
+    data = MeshData()
+    for i in range(0,num+1):
+        data.addVertex((float(i),0.0,0.0))
+        data.addVertex((float(i),1.0,0.5))
+    for i in range(0,num):
+        data.addFace((i*2,i*2+2,i*2+3,i*2+1))
+    for i in range(0,num):
+        data.addFace((i*2+1,i*2+3,i*2+2))
+    return data
+
+# Returns the facade uvs of a building face by face, like the walls were textured before the uvs were batched.
+def getOldFacadeUVs(coords,levels,level_height,texture_levels):
+    if isClockwise(coords):
+        coords = coords[::-1]
+    num = len(coords)-1
+    height = levels/texture_levels
+    uv = []
+    uv_x = 0.0
+    for i in range(0,num):
+        a = coords[i]
+        b = coords[(i+1) % num]
+        width = math.sqrt((b[0]-a[0])**2+(b[1]-a[1])**2)/(level_height*texture_levels)
+        uv.extend((uv_x,0.0,uv_x+width,0.0,uv_x+width,height,uv_x,height))
+        uv_x+=width
+    return uv
+
+# Returns the uvs of the flat roof faces of a building face by face, every vertex is rotated around z towards the averaged normal of the corners.
+def getOldRoofUVs(data,coords,first):
+    num = len(coords)-1
+    normals = getNormals(coords,True)
+    angle = math.atan2(sum([normals[i][1] for i in range(0,num)])/num,sum([normals[i][0] for i in range(0,num)])/num)
+    uv = []
+    for i in range(first,data.getNumFaces()):
+        face = data.getFace(i)
+        for v in face:
+            co = data.getVertex(v)
+            uv.extend((co[0]*math.cos(angle)-co[1]*math.sin(angle),co[0]*math.sin(angle)+co[1]*math.cos(angle)))
+        if len(face)==3:
+            uv.extend((0.0,0.0))
+    return uv
+
+# Returns the uvs of a trafficway face by face, v runs along the way by the length of the segments.
+def getOldTrafficwayUVs(coords,width,lanes,texture_lanes):
+    u = lanes/texture_lanes
+    hf = 1/(width/lanes)
+    uv = []
+    uv_y = 0.0
+    for i in range(0,len(coords)-1):
+        a = coords[i]
+        b = coords[i+1]
+        height = hf*math.sqrt((b[0]-a[0])**2+(b[1]-a[1])**2+(b[2]-a[2])**2)
+        uv.extend((0.0,uv_y,u,uv_y,u,uv_y+height,0.0,uv_y+height))
+        uv_y+=height
+    return uv
+
+def testSegmentLengths():
+    coords = [(0.0,0.0,0.0),(3.0,4.0,12.0),(3.0,0.0,12.0)]
+    assert segmentLengths(coords)==pytest.approx([5.0,4.0])
+    assert segmentLengths(coords,True)==pytest.approx([5.0,4.0,3.0])
+    assert segmentLengths(coords,False,3)==pytest.approx([13.0,4.0])
+
+@pytest.mark.parametrize('numpy',[True,False])
+def testSegmentLengthsLong(numpy,monkeypatch):
+    setNumpy(numpy,monkeypatch)
+    coords = [(float(i*i),0.0,float(i)) for i in range(0,100)]
+    assert segmentLengths(coords,True)==pytest.approx([float(2*i+1) for i in range(0,99)]+[9801.0])
+    assert segmentLengths(coords,False,3)[0]==pytest.approx(2**0.5)
+
+@pytest.mark.parametrize('numpy',[True,False])
+@pytest.mark.parametrize('num',[3,100])
+def testStripUVs(numpy,num,monkeypatch):
+    setNumpy(numpy,monkeypatch)
+    data = getStrip(num)
+    lengths = [float(i+1) for i in range(0,num)]
+    stripUVs(data,0,lengths,0.5,2.0,'u')
+    # quads continue where the previous one ended
+    assert list(data.uv[0:16])==[0.0,0.0,0.5,0.0,0.5,2.0,0.0,2.0, 0.5,0.0,1.5,0.0,1.5,2.0,0.5,2.0]
+    end = sum(lengths)*0.5
+    assert list(data.uv[(num-1)*8:num*8])==pytest.approx([end-num*0.5,0.0,end,0.0,end,2.0,end-num*0.5,2.0])
+
+    stripUVs(data,1,[2.0],1.0,3.0,'v')
+    assert list(data.uv[8:16])==[0.0,0.0,3.0,0.0,3.0,2.0,0.0,2.0]
+
+@pytest.mark.parametrize('numpy',[True,False])
+@pytest.mark.parametrize('num',[3,100])
+def testPlanarUVs(numpy,num,monkeypatch):
+    setNumpy(numpy,monkeypatch)
+    data = getStrip(num)
+    planarUVs(data)
+    assert list(data.uv[8:16])==[1.0,0.0,2.0,0.0,2.0,1.0,1.0,1.0]
+    # the fourth uv of a triangle is 0
+    assert list(data.uv[num*8:num*8+8])==[0.0,1.0,1.0,1.0,1.0,0.0,0.0,0.0]
+
+    # rows rotate the coordinates, here by 90 degrees with z added to v
+    planarUVs(data,num,num*2,((0.0,1.0,0.0),(-1.0,0.0,1.0)))
+    assert list(data.uv[8:16])==[1.0,0.0,2.0,0.0,2.0,1.0,1.0,1.0]
+    assert list(data.uv[num*8:num*8+8])==[1.0,0.5,1.0,-0.5,0.0,-1.0,0.0,0.0]
+
+def testPlanarUVsEmptyRange():
+    data = getStrip(2)
+    planarUVs(data,2,2)
+    planarUVs(data,3,1)
+    assert data.uv==array('f',[0.0])*32
+
+@pytest.mark.parametrize('numpy',[True,False])
+@pytest.mark.parametrize('clockwise',[False,True])
+def testBuildingUVsAsBefore(numpy,clockwise,monkeypatch):
+    setNumpy(numpy,monkeypatch)
+    coords = [(0.0,0.0,1.0),(12.0,0.0,1.0),(9.0,6.0,1.0),(4.0,7.0,1.0),(1.0,4.0,1.0),(0.0,0.0,1.0)]
+    if clockwise:
+        coords.reverse()
+    data = buildBuilding(coords,(1.0,2.0,0.0),9.0,3.0,3.0,2)
+    num = len(coords)-1
+    assert list(data.uv[0:num*8])==pytest.approx(getOldFacadeUVs(coords,3.0,3.0,2))
+    assert list(data.uv[num*8:])==pytest.approx(getOldRoofUVs(data,coords,num))
+
+@pytest.mark.parametrize('numpy',[True,False])
+def testTrafficwayUVsAsBefore(numpy,monkeypatch):
+    setNumpy(numpy,monkeypatch)
+    coords = [(0.0,0.0,0.0),(10.0,5.0,1.0),(20.0,5.0,1.5),(24.0,-3.0,0.5)]
+    data = buildTrafficway(coords,(5.0,0.0,0.0),6.0,2,3)
+    assert list(data.uv)==pytest.approx(getOldTrafficwayUVs(coords,6.0,2,3))